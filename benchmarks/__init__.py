@@ -0,0 +1 @@
+"""Benchmarks which are run by hand, e.g. `python -m benchmarks.bench_db_profile`"""
@@ -0,0 +1,93 @@
+"""
+Compare library listing and save latency of the engine profiles.
+
+Usage:
+    python -m benchmarks.bench_db_profile --tracks 2000 --time-stamps 50
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from models.db_setup import ENGINE_PROFILES, create_db_engine
+from models.migrations import init_db
+from models.models import AudioModel, TimeStampModel
+from models.session_manager import AudioSessionChanges
+
+
+def populate(session_factory, tracks: int, time_stamps: int) -> None:
+    with session_factory.begin() as session:
+        session.execute(
+            insert(AudioModel),
+            [
+                {"id": i, "name": f"track_{i}.mp3", "file_path": f"/audio/{i}.mp3"}
+                for i in range(1, tracks + 1)
+            ],
+        )
+        session.execute(
+            insert(TimeStampModel),
+            [
+                {"audio_id": i, "position": float(p)}
+                for i in range(1, tracks + 1)
+                for p in range(time_stamps)
+            ],
+        )
+
+
+def list_library(session_factory) -> int:
+    with session_factory.begin() as session:
+        rows = session.execute(
+            select(AudioModel.id, AudioModel.name, AudioModel.file_path).order_by(
+                AudioModel.added
+            )
+        ).all()
+        session.execute(select(TimeStampModel.audio_id, TimeStampModel.position)).all()
+        return len(rows)
+
+
+def save(session_factory, step: int) -> None:
+    changes = AudioSessionChanges(1, fields={"spend_time": step})
+    changes.add_time_stamp(10_000.0 + step)
+    with session_factory.begin() as session:
+        changes.apply(session)
+
+
+def measure(func, repeat: int) -> float:
+    """Return the median duration of the function in milliseconds."""
+    durations = []
+    for step in range(repeat):
+        start = time.perf_counter()
+        func(step)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=2000)
+    parser.add_argument("--time-stamps", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'list [ms]':>12}{'save [ms]':>12}")
+    for name, profile in ENGINE_PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_db_engine(
+                f"sqlite:///{Path(tmp_dir) / 'bench.db'}", profile
+            )
+            init_db(engine)
+            session_factory = sessionmaker(bind=engine)
+            populate(session_factory, args.tracks, args.time_stamps)
+
+            list_ms = measure(lambda _: list_library(session_factory), args.repeat)
+            save_ms = measure(lambda step: save(session_factory, step), args.repeat)
+            engine.dispose()
+        print(f"{name:<10}{list_ms:>12.2f}{save_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measure the import of a large folder of short WAV files.
+
+Usage:
+    python -m benchmarks.bench_import --files 5000
+"""
+import argparse
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.importer import import_folder
+from models.migrations import init_db
+
+
+def make_folder(directory: Path, files: int, seconds: float) -> None:
+    sample_rate = 8000
+    for i in range(files):
+        subdirectory = directory / f"album_{i // 100}"
+        subdirectory.mkdir(exist_ok=True)
+        with wave.open(str(subdirectory / f"track_{i}.wav"), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            # the index in the first sample makes the content of every file unique
+            wav.writeframes(
+                i.to_bytes(4, "little") + bytes(int(sample_rate * seconds) * 2 - 4)
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        folder, store = tmp_dir / "folder", tmp_dir / "store"
+        folder.mkdir()
+        make_folder(folder, args.files, args.seconds)
+        engine = create_engine(f"sqlite:///{tmp_dir / 'bench.db'}")
+        init_db(engine)
+        session_factory = sessionmaker(engine)
+
+        for run in ("first import", "second import"):
+            start = time.perf_counter()
+            progress = import_folder(folder, session_factory, store=store)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{run:<14} {elapsed:6.2f} s  "
+                f"imported {progress.imported}, skipped {progress.skipped}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare parsing the kv files of the screens with loading them from the cache.
+
+Usage:
+    python -m benchmarks.bench_kv_cache --repeat 20
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from kivy.lang.parser import Parser
+
+from ui.screens import KIVY_FILE
+from utils.kv_cache import parse_kv
+
+KV_FILES = (
+    "main_screen.kv",
+    "file_chooser.kv",
+    "play_audio_screen.kv",
+    "read_file_screen.kv",
+)
+
+
+def _best(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    total_parsed = total_cached = 0.0
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in KV_FILES:
+            path = KIVY_FILE / name
+            content = path.read_text(encoding="utf8")
+            parsed = _best(
+                lambda: Parser(content=content, filename=str(path)), args.repeat
+            )
+            parse_kv(path, Path(cache_dir))  # fill the cache
+            cached = _best(lambda: parse_kv(path, Path(cache_dir)), args.repeat)
+            total_parsed += parsed
+            total_cached += cached
+            print(
+                f"{name:<22} parse {parsed * 1000:6.2f} ms  "
+                f"cached {cached * 1000:6.2f} ms"
+            )
+    print(
+        f"{'total':<22} parse {total_parsed * 1000:6.2f} ms  "
+        f"cached {total_cached * 1000:6.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
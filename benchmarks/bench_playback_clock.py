@@ -0,0 +1,94 @@
+"""
+Compare the CPU time of the playback callbacks over a long session.
+
+The old loops read the position in three interval callbacks and format the
+time label on every progress tick. The playback clock reads it once per tick,
+formats the label once per second and leaves the segment end to a timer.
+
+Usage:
+    python -m benchmarks.bench_playback_clock --minutes 60
+"""
+import argparse
+import time
+
+from kivy.uix.label import Label
+from kivy.uix.slider import Slider
+
+from utils.playback_clock import PlaybackClock
+from utils.tools import format_time
+
+TICK = 0.1
+
+
+class FakePlayer:
+    """Position of the sound advances by one tick on every read of the clock."""
+
+    def __init__(self):
+        self.position = 0.0
+        self.reads = 0
+
+    def get_position(self) -> float:
+        self.reads += 1
+        return self.position
+
+
+def polling_loops(player: FakePlayer, ticks: int) -> None:
+    progress_bar, current_time = Slider(max=ticks * TICK), Label()
+    spend_time = 0
+    end = ticks * TICK
+    for tick in range(ticks):
+        player.position = tick * TICK
+        # update_progress_bar every 0.1 s
+        position = player.get_position()
+        progress_bar.value = position
+        current_time.text = format_time(position)
+        # control_time every 0.1 s
+        if player.get_position() >= end:
+            break
+        # count_duration every 1 s
+        if tick % 10 == 0:
+            spend_time += 1
+
+
+def playback_clock(player: FakePlayer, ticks: int) -> None:
+    progress_bar, current_time = Slider(max=ticks * TICK), Label()
+    shown_second = None
+
+    def show_position(position):
+        nonlocal shown_second
+        progress_bar.value = position
+        if int(position) != shown_second:
+            shown_second = int(position)
+            current_time.text = format_time(position)
+
+    clock = PlaybackClock(player.get_position)
+    clock.subscribe(show_position)
+    clock.subscribe(lambda position: clock.take_played_seconds())
+    clock.start()
+    for tick in range(ticks):
+        player.position = tick * TICK
+        clock.tick()
+    clock.stop()
+
+
+def measure(func, ticks: int):
+    player = FakePlayer()
+    start = time.process_time()
+    func(player, ticks)
+    return (time.process_time() - start) * 1000, player.reads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=int, default=60)
+    args = parser.parse_args()
+    ticks = int(args.minutes * 60 / TICK)
+
+    print(f"{'loop':<16}{'cpu [ms]':>12}{'position reads':>16}")
+    for name, func in (("polling", polling_loops), ("playback clock", playback_clock)):
+        cpu, reads = measure(func, ticks)
+        print(f"{name:<16}{cpu:>12.1f}{reads:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measure the review queue of a library with many segments.
+
+Usage:
+    python -m benchmarks.bench_review_queue --tracks 2000 --segments 100
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+
+from models.db_setup import create_db_engine, get_engine_profile
+from models.migrations import init_db
+from models.models import AudioModel, ReviewModel, TimeStampModel
+from models.review import GOOD, count_due, due_segments, grade_review, utc_now
+
+
+def populate(session_factory, tracks: int, segments: int) -> None:
+    """Add the time stamps, the triggers schedule them, then spread the dues."""
+    with session_factory.begin() as session:
+        session.execute(
+            insert(AudioModel),
+            [
+                {"id": i, "name": f"track_{i}.mp3", "file_path": f"/audio/{i}.mp3"}
+                for i in range(1, tracks + 1)
+            ],
+        )
+        session.execute(
+            insert(TimeStampModel),
+            [
+                {"audio_id": i, "position": p * 5.0}
+                for i in range(1, tracks + 1)
+                for p in range(segments)
+            ],
+        )
+    rng = random.Random(0)
+    now = utc_now()
+    with session_factory.begin() as session:
+        session.execute(
+            update(ReviewModel),
+            [
+                {"id": i, "due": now + timedelta(days=rng.uniform(-30, 30))}
+                for i in range(1, tracks * segments + 1)
+            ],
+        )
+
+
+def measure(func, repeat: int = 50) -> float:
+    """Return the mean duration of the function in milliseconds."""
+    begin = time.perf_counter()
+    for step in range(repeat):
+        func(step)
+    return (time.perf_counter() - begin) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=2000)
+    parser.add_argument("--segments", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_db_engine(
+            f"sqlite:///{Path(tmp_dir) / 'bench.db'}", get_engine_profile()
+        )
+        init_db(engine)
+        session_factory = sessionmaker(bind=engine)
+        begin = time.perf_counter()
+        populate(session_factory, args.tracks, args.segments)
+        print(
+            f"schedule {args.tracks * args.segments} segments: "
+            f"{time.perf_counter() - begin:.2f} s"
+        )
+
+        with session_factory() as session:
+            due = measure(lambda _: due_segments(session, args.limit))
+            count = measure(lambda _: count_due(session), repeat=5)
+        with session_factory.begin() as session:
+            ids = [segment.id for segment in due_segments(session, 50)]
+            grade = measure(lambda step: grade_review(session, ids[step], GOOD))
+        engine.dispose()
+    print(f"next {args.limit} due segments: {due:.2f} ms")
+    print(f"count of due segments: {count:.2f} ms")
+    print(f"grade a review: {grade:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
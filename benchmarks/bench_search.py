@@ -0,0 +1,67 @@
+"""
+Measure the library search latency.
+
+Usage:
+    python -m benchmarks.bench_search --tracks 100000
+"""
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_db_profile import measure
+from models.db_setup import ENGINE_PROFILES, create_db_engine
+from models.migrations import init_db
+from models.models import AudioModel
+from models.search import search_audio
+
+WORDS = (
+    "lesson podcast interview news story dialogue chapter episode grammar "
+    "travel business kitchen weather museum station hospital market"
+).split()
+QUERIES = ("lesson", "kitchen 42", "chaptr", "busines travel", "ep")
+
+
+def populate(session_factory, tracks: int) -> None:
+    rng = random.Random(0)
+    with session_factory.begin() as session:
+        session.execute(
+            insert(AudioModel),
+            [
+                {
+                    "name": f"{' '.join(rng.sample(WORDS, 3))} {i}.mp3",
+                    "file_path": f"/audio/{rng.choice(WORDS)}/{i}.mp3",
+                }
+                for i in range(tracks)
+            ],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_db_engine(
+            f"sqlite:///{Path(tmp_dir) / 'bench.db'}", ENGINE_PROFILES["tuned"]
+        )
+        init_db(engine)
+        session_factory = sessionmaker(bind=engine)
+        populate(session_factory, args.tracks)
+
+        print(f"{'query':<16}{'results':>8}{'median [ms]':>14}")
+        for query in QUERIES:
+            with session_factory() as session:
+                results = len(search_audio(session, query))
+                duration = measure(lambda _: search_audio(session, query), args.repeat)
+            print(f"{query!r:<16}{results:>8}{duration:>14.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
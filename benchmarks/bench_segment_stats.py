@@ -0,0 +1,108 @@
+"""
+Measure saving batched segment practice and the segment statistics queries.
+
+Every practice event of a segment is counted in the audio session and only the
+sums are written, so the events cost one upsert per segment and flush.
+
+Usage:
+    python -m benchmarks.bench_segment_stats --tracks 2000 --segments 200
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from models.db_setup import create_db_engine, get_engine_profile
+from models.library import segment_heatmap, weakest_segments
+from models.migrations import init_db
+from models.models import AudioModel
+from models.session_manager import AudioSessionChanges, SegmentPractice
+
+
+def populate(session_factory, tracks: int) -> None:
+    with session_factory.begin() as session:
+        session.execute(
+            insert(AudioModel),
+            [
+                {"id": i, "name": f"track_{i}.mp3", "file_path": f"/audio/{i}.mp3"}
+                for i in range(1, tracks + 1)
+            ],
+        )
+
+
+def save_events(
+    session_factory, tracks: int, segments: int, events: int, flush_every: int
+) -> float:
+    """Count random practice events and flush them, return the seconds spent."""
+    rng = random.Random(0)
+    spent = 0.0
+    changes = {}
+    for event in range(1, events + 1):
+        audio_id = rng.randint(1, tracks)
+        start = float(rng.randrange(segments) * 5)
+        journal = changes.setdefault(audio_id, AudioSessionChanges(audio_id))
+        journal.add_segment_practice(
+            start, SegmentPractice(end=start + 5, plays=1, dwell=rng.randint(1, 5))
+        )
+        if event % flush_every == 0 or event == events:
+            begin = time.perf_counter()
+            with session_factory.begin() as session:
+                for journal in changes.values():
+                    journal.apply(session)
+            spent += time.perf_counter() - begin
+            changes = {}
+    return spent
+
+
+def measure(func, repeat: int = 20) -> float:
+    """Return the mean duration of the function in milliseconds."""
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - begin) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=2000)
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--flush-every", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_db_engine(
+            f"sqlite:///{Path(tmp_dir) / 'bench.db'}", get_engine_profile()
+        )
+        init_db(engine)
+        session_factory = sessionmaker(bind=engine)
+        populate(session_factory, args.tracks)
+
+        spent = save_events(
+            session_factory, args.tracks, args.segments, args.events, args.flush_every
+        )
+        print(f"save {args.events} events: {spent:.2f} s")
+
+        with session_factory.begin() as session:
+            # give every segment a score, as if it had a recorded take
+            session.connection().exec_driver_sql(
+                "UPDATE segment_stats SET scored_takes = 1, score = (id * 7919) % 100"
+            )
+        with session_factory() as session:
+            heatmap = measure(
+                lambda: segment_heatmap(session, 1, args.segments * 5, bins=100)
+            )
+            library = measure(lambda: weakest_segments(session, limit=20))
+            audio = measure(lambda: weakest_segments(session, 1, limit=20))
+        engine.dispose()
+    print(f"heatmap of one audio: {heatmap:.2f} ms")
+    print(f"weakest of the library: {library:.2f} ms")
+    print(f"weakest of one audio: {audio:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measure the cold start of the app: the import of `main` and the first frame.
+
+Every run starts a new interpreter, so nothing is cached between the runs.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).parent.parent
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from kivy.clock import Clock
+app = main.ShadowApp()
+def first_frame(dt):
+    print(json.dumps({
+        "import": imported - start,
+        "first_frame": time.perf_counter() - start,
+        "modules": sorted(sys.modules),
+    }))
+    app.stop()
+Clock.schedule_once(first_frame, 0)
+app.run()
+"""
+
+
+def measure_startup() -> Dict:
+    """Start the app in a new interpreter and return its startup times."""
+    result = subprocess.run(  # nosec B603
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure_startup() for _ in range(args.runs)]
+    for phase in ("import", "first_frame"):
+        times = [run[phase] * 1000 for run in runs]
+        print(
+            f"{phase:<12} median {statistics.median(times):7.1f} ms  "
+            f"min {min(times):7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure how fast segments are time-stretched and how fast they come from the cache.
+
+Usage:
+    python -m benchmarks.bench_time_stretch --seconds 5 --sample-rate 44100
+"""
+import argparse
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from utils.pcm_cache import PcmCache
+
+
+def make_wav(path: Path, seconds: float, sample_rate: int) -> Path:
+    """Write a harmonic tone with a changing pitch, like a voice."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    phase = 2 * np.pi * np.cumsum(150 * (1 + 0.2 * np.sin(t))) / sample_rate
+    samples = 0.3 * sum(np.sin(k * phase) / k for k in range(1, 6))
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((samples * 32767).astype("<i2").tobytes())
+    return path
+
+
+def measure(func, repeat: int = 5) -> float:
+    """Return the mean duration of the function in milliseconds."""
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - begin) * 1000 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = make_wav(Path(tmp_dir) / "voice.wav", args.seconds, args.sample_rate)
+        cache = PcmCache(path, directory=Path(tmp_dir) / "pcm")
+        cache.decode()
+        for rate in (0.5, 0.75, 1.0, 1.25, 1.5):
+
+            def render():
+                cache._segments.clear()
+                cache.segment(0, args.seconds, rate)
+
+            rendered = measure(render)
+            cached = measure(lambda: cache.segment(0, args.seconds, rate), 1000)
+            print(
+                f"{rate:g}x segment of {args.seconds:g} s: "
+                f"render {rendered:.1f} ms, cached {cached:.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,96 @@
-"""Application starting point"""
-from typing import Optional
+"""
+Application starting point
+
+Worker processes started with "spawn" import this module, so nothing which
+opens a window (kivy.core.window, the screens) may be imported at module level.
+
+Only the main screen is built before the first frame. The other screens, their
+kv rules and the database are loaded on first navigation, and the schema is
+checked on a background thread in the meantime.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib import import_module
+from typing import TYPE_CHECKING, Optional
 
 from kivy.app import App
-from kivy.core.window import Window
-from kivy.uix.screenmanager import ScreenManager
+from kivy.uix.screenmanager import Screen
+
+if TYPE_CHECKING:
+    from models.session_manager import AudioSession
+    from models.write_behind import WriteBehindQueue
+    from utils.kivy_extensions import LazyScreenManager
+    from utils.player_pool import PlayerPool
+
+# screens created on first navigation: name -> (module, class)
+LAZY_SCREENS = {
+    "file_chooser_screen": ("ui.screens.file_chooser", "FileChooser"),
+    "play_audio_screen": ("ui.screens.play_audio_screen", "PlayAudioScreen"),
+    "read_file_screen": ("ui.screens.read_file_screen", "ReadFileScreen"),
+}
+
+STARTUP_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup")
+
 
-from models.db_setup import Base, engine
-from models.models import AudioModel  # noqa: F401
-from models.session_manager import AudioSession
-from ui.screens.file_chooser import FileChooser
-from ui.screens.main_screen import MainScreen
-from ui.screens.play_audio_screen import PlayAudioScreen
-from ui.screens.read_file_screen import ReadFileScreen
+def prepare_database() -> "WriteBehindQueue":
+    """Bring the schema up to date and start saving the audio sessions."""
+    from models.migrations import init_db
+    from models.write_behind import WriteBehindQueue
 
-Window.size = (900, 800)
+    init_db()
+    write_behind = WriteBehindQueue()
+    write_behind.start()
+    return write_behind
 
 
 class ShadowApp(App):
-    AUDIO_SESSION: Optional[AudioSession] = None
+    AUDIO_SESSION: Optional["AudioSession"] = None
+    WRITE_BEHIND: Optional["WriteBehindQueue"] = None
+    PLAYER_POOL: Optional["PlayerPool"] = None
+    LIBRARY_REVISION: int = 0
+    # the play screen reviews the due segments instead of the chosen audio
+    REVIEW_MODE: bool = False
+    DATABASE_READY: Optional[Future] = None
 
-    def build(self) -> ScreenManager:
-        Base.metadata.create_all(bind=engine)
+    def build(self) -> "LazyScreenManager":
+        from kivy.core.window import Window
 
-        sm = ScreenManager()
+        from ui.screens.main_screen import MainScreen
+        from utils.kivy_extensions import LazyScreenManager
+
+        Window.size = (900, 800)
+        self.DATABASE_READY = STARTUP_EXECUTOR.submit(prepare_database)
+
+        sm = LazyScreenManager()
         sm.add_widget(MainScreen(name="main_screen"))
-        sm.add_widget(FileChooser(name="file_chooser_screen"))
-        sm.add_widget(PlayAudioScreen(name="play_audio_screen"))
-        sm.add_widget(ReadFileScreen(name="read_file_screen"))
+        for name in LAZY_SCREENS:
+            sm.register(name, self.create_screen)
         sm.current = "main_screen"
         return sm
 
+    def wait_for_database(self) -> None:
+        """Block until the schema is checked, screens other than main need it."""
+        if self.WRITE_BEHIND is None and self.DATABASE_READY is not None:
+            self.WRITE_BEHIND = self.DATABASE_READY.result()
+
+    def create_screen(self, name: str) -> Screen:
+        from utils.player_pool import PlayerPool
+
+        self.wait_for_database()
+        if self.PLAYER_POOL is None:
+            self.PLAYER_POOL = PlayerPool()
+        module, class_name = LAZY_SCREENS[name]
+        return getattr(import_module(module), class_name)(name=name)
+
+    def on_stop(self):
+        """Save the changes of the current audio session before exit."""
+        self.wait_for_database()
+        if self.WRITE_BEHIND is not None:
+            if self.AUDIO_SESSION:
+                self.WRITE_BEHIND.submit(self.AUDIO_SESSION.pop_changes())
+            self.WRITE_BEHIND.stop()
+        if self.PLAYER_POOL is not None:
+            self.PLAYER_POOL.clear()
+
 
 if __name__ == "__main__":
     ShadowApp().run()
@@ -1,12 +1,90 @@
-"""DB configuration"""
-from sqlalchemy import create_engine
+"""
+DB configuration
+
+The database and the engine profile can be selected with environment variables:
+    SHADOWING_DATABASE_URL: SQLAlchemy URL of the database.
+    SHADOWING_DB_PROFILE: name of the profile from `ENGINE_PROFILES`.
+    SHADOWING_DB_ECHO: set to 1 to log every SQL statement.
+"""
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 # Database URL
-DATABASE_URL = "sqlite:///shadowing.db"
+DATABASE_URL = os.environ.get("SHADOWING_DATABASE_URL", "sqlite:///shadowing.db")
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """SQLite settings applied to every connection opened by the engine."""
+
+    echo: bool = False
+    foreign_keys: bool = True
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    mmap_size: Optional[int] = None  # in bytes
+    cache_size: Optional[int] = None  # in pages, or in KiB when negative
+    # connections kept open and shared by all threads, the SQLAlchemy default
+    # pool when None
+    pool_size: Optional[int] = None
+
+    def pragmas(self) -> dict:
+        pragmas = {
+            "foreign_keys": "ON" if self.foreign_keys else "OFF",
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+        }
+        return {name: value for name, value in pragmas.items() if value is not None}
+
+
+ENGINE_PROFILES = {
+    # SQLite defaults
+    "default": EngineProfile(),
+    # WAL lets the write-behind thread commit while the UI reads and
+    # synchronous=NORMAL is still safe against corruption in WAL mode
+    "tuned": EngineProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-16 * 1024,
+        pool_size=8,  # the UI and the background threads
+    ),
+}
+
+
+def get_engine_profile() -> EngineProfile:
+    profile = ENGINE_PROFILES[os.environ.get("SHADOWING_DB_PROFILE", "tuned")]
+    if os.environ.get("SHADOWING_DB_ECHO") == "1":
+        profile = replace(profile, echo=True)
+    return profile
+
+
+def create_db_engine(url: str, profile: EngineProfile) -> Engine:
+    """Create the engine and configure its connections with the profile pragmas."""
+    options = {}
+    if profile.pool_size is not None:
+        options = {"poolclass": QueuePool, "pool_size": profile.pool_size}
+    db_engine = create_engine(url, echo=profile.echo, **options)
+    pragmas = profile.pragmas()
+
+    @event.listens_for(db_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return db_engine
+
 
 # Create the database engine
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_db_engine(DATABASE_URL, get_engine_profile())
 
 # Create a sessionfactory
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
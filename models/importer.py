@@ -0,0 +1,169 @@
+"""
+Import of whole folders of audio into the library.
+
+Files are hashed, stored and probed in a thread pool, and every chunk of new
+audio is inserted with a single INSERT in one transaction. Audio already in
+the library is recognised by its digest, so an interrupted import continues
+where it stopped when it is started again.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from utils.file import DEFAULT_AUDIO_KEEPER, file_digest, source_path, store_file
+from utils.pcm import AudioDecodeError, probe_duration
+
+from .db_setup import SessionLocal
+from .models import AudioModel
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg")
+
+# runs the imports started from the UI, one at a time
+IMPORT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import")
+
+
+@dataclass
+class ImportProgress:
+    total: int = 0
+    done: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: List[Tuple[Path, str]] = field(default_factory=list)
+    cancelled: bool = False
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+
+def find_audio_files(directory: Path) -> List[Path]:
+    """Return the audio files in the directory tree in a stable order."""
+    return sorted(
+        path
+        for path in Path(directory).rglob("*")
+        if path.suffix.lower() in AUDIO_EXTENSIONS and path.is_file()
+    )
+
+
+def _chunks(items: List[Path], size: int) -> Iterable[List[Path]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _store(path: Path, digest: str, store: Path, root: Optional[Path]) -> dict:
+    stored_path = store_file(path, to=store, digest=digest)
+    try:
+        duration = round(probe_duration(stored_path))
+    except AudioDecodeError as e:
+        logger.warning(f"Could not probe duration of {path}: {e}")
+        duration = 0
+    return {
+        "name": path.name,
+        "file_path": str(stored_path),
+        "source_path": source_path(path, root),
+        "digest": digest,
+        "duration": duration,
+    }
+
+
+def _try(func, *args):
+    try:
+        return func(*args), None
+    except OSError as e:
+        return None, str(e)
+
+
+def _existing_digests(
+    session_factory: sessionmaker, digests: Iterable[str]
+) -> Set[str]:
+    with session_factory() as session:
+        return set(
+            session.scalars(
+                select(AudioModel.digest).where(AudioModel.digest.in_(list(digests)))
+            )
+        )
+
+
+def import_folder(directory: Path, *args, **kwargs) -> ImportProgress:
+    """Import all audio files from the directory tree, see `import_files`."""
+    kwargs.setdefault("root", Path(directory))
+    return import_files(find_audio_files(directory), *args, **kwargs)
+
+
+def import_files(
+    files: List[Path],
+    session_factory: sessionmaker = SessionLocal,
+    store: Path = DEFAULT_AUDIO_KEEPER,
+    on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    workers: int = 8,
+    chunk_size: int = 200,
+    root: Optional[Path] = None,
+) -> ImportProgress:
+    """
+    Import the audio files, skipping those already in the library.
+
+    Args:
+        root: The imported folder, the source paths are kept relative to it.
+        on_progress: Called from the importing thread after every file.
+        cancel: When set, the import stops after the current chunk.
+    """
+    progress = ImportProgress(total=len(files))
+
+    def report(path: Path, error: Optional[str] = None, imported: bool = False):
+        progress.done += 1
+        if error is not None:
+            progress.failed.append((path, error))
+        elif imported:
+            progress.imported += 1
+        else:
+            progress.skipped += 1
+        if on_progress:
+            on_progress(progress)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(files, chunk_size):
+            if cancel is not None and cancel.is_set():
+                progress.cancelled = True
+                break
+
+            hashed = pool.map(lambda path: _try(file_digest, path), chunk)
+            digests = {}
+            for path, (digest, error) in zip(chunk, hashed):
+                if error is not None:
+                    report(path, error)
+                elif digest in digests:
+                    report(path)  # the same content is earlier in the chunk
+                else:
+                    digests[digest] = path
+
+            for digest in _existing_digests(session_factory, digests):
+                report(digests.pop(digest))
+
+            rows, imported = [], []
+            stored = pool.map(
+                lambda item: _try(_store, item[1], item[0], store, root),
+                digests.items(),
+            )
+            for path, (row, error) in zip(digests.values(), stored):
+                if error is not None:
+                    report(path, error)
+                else:
+                    rows.append(row)
+                    imported.append(path)
+
+            if rows:
+                with session_factory.begin() as session:
+                    session.execute(insert(AudioModel), rows)
+            for path in imported:
+                report(path, imported=True)
+
+    return progress
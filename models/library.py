@@ -0,0 +1,369 @@
+"""
+Queries of the audio library which don't depend on the user interface.
+
+They are shared by the screens and the `shadowing` command line tool, and the
+ones returning the whole library read it in keyset pages, so they stream even
+very large libraries with constant memory.
+"""
+import bisect
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Engine, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import (
+    TIME_STAMP_TOLERANCE,
+    AudioModel,
+    RecordingModel,
+    SegmentStatsModel,
+    TimeStampModel,
+)
+from .search import OPTIMIZE_SEARCH_INDEX, has_search_index
+from .session_manager import AudioSummary
+
+
+@dataclass(frozen=True)
+class AudioStats:
+    """Practice statistics of one audio."""
+
+    id: int
+    name: str
+    added: datetime
+    duration: int
+    spend_time: int
+    finished_times: int
+    time_stamps: int
+    scored_takes: int
+    timing_score: Optional[float]
+    intonation_score: Optional[float]
+
+
+@dataclass(frozen=True)
+class Recording:
+    """Take of the learner's voice for a segment of the audio."""
+
+    id: int
+    start: float
+    end: Optional[float]
+    file_path: str
+    duration: float
+    added: datetime
+
+
+@dataclass(frozen=True)
+class SegmentStats:
+    """Practice statistics of one segment of an audio."""
+
+    audio_id: int
+    start: float
+    end: Optional[float]
+    plays: int
+    dwell: int
+    last_practiced: Optional[datetime]
+    scored_takes: int
+    score: Optional[float]
+
+
+@dataclass(frozen=True)
+class HeatmapBin:
+    """Practice of one part of the audio timeline."""
+
+    start: float
+    end: float
+    plays: float
+    dwell: float
+
+
+_SEGMENT_STATS_COLUMNS = (
+    SegmentStatsModel.audio_id,
+    SegmentStatsModel.start,
+    SegmentStatsModel.end,
+    SegmentStatsModel.plays,
+    SegmentStatsModel.dwell,
+    SegmentStatsModel.last_practiced,
+    SegmentStatsModel.scored_takes,
+    SegmentStatsModel.score,
+)
+
+
+def list_audio_page(
+    session: Session, after: Optional[AudioSummary] = None, limit: int = 50
+) -> List[AudioSummary]:
+    """
+    Return the next page of the library ordered by the date it was added.
+
+    The page starts right after the `after` audio, so the cost of each page
+    doesn't depend on the number of audios before it.
+    """
+    stmt = (
+        select(AudioModel.id, AudioModel.name, AudioModel.added)
+        .order_by(AudioModel.added, AudioModel.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(AudioModel.added, AudioModel.id) > (after.added, after.id)
+        )
+    return [AudioSummary(*row) for row in session.execute(stmt)]
+
+
+def iter_library(session: Session, page_size: int = 500) -> Iterator[AudioSummary]:
+    """Yield every audio of the library ordered by the date it was added."""
+    after = None
+    while page := list_audio_page(session, after, page_size):
+        yield from page
+        after = page[-1]
+
+
+def iter_audio_stats(session: Session, page_size: int = 500) -> Iterator[AudioStats]:
+    """Yield statistics of every audio ordered by its id."""
+    time_stamps = (
+        select(func.count(TimeStampModel.id))
+        .where(TimeStampModel.audio_id == AudioModel.id)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            AudioModel.id,
+            AudioModel.name,
+            AudioModel.added,
+            AudioModel.duration,
+            AudioModel.spend_time,
+            AudioModel.finished_times,
+            time_stamps,
+            AudioModel.scored_takes,
+            AudioModel.timing_score,
+            AudioModel.intonation_score,
+        )
+        .order_by(AudioModel.id)
+        .limit(page_size)
+    )
+    last_id = 0
+    while rows := session.execute(stmt.where(AudioModel.id > last_id)).all():
+        for row in rows:
+            yield AudioStats(*row)
+        last_id = rows[-1].id
+
+
+def get_audio_paths(
+    session: Session, audio_ids: Optional[Iterable[int]] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (id, file_path) of the given audios, or of every audio which has
+    no time stamps yet when no ids are given.
+    """
+    stmt = select(AudioModel.id, AudioModel.file_path).order_by(AudioModel.id)
+    if audio_ids is not None:
+        stmt = stmt.where(AudioModel.id.in_(list(audio_ids)))
+    else:
+        stmt = stmt.where(
+            ~select(TimeStampModel.id)
+            .where(TimeStampModel.audio_id == AudioModel.id)
+            .exists()
+        )
+    yield from session.execute(stmt)
+
+
+def add_time_stamps(
+    session: Session,
+    audio_id: int,
+    positions: Iterable[float],
+    tolerance: float = TIME_STAMP_TOLERANCE,
+) -> int:
+    """
+    Add the time stamps which the audio doesn't have yet, return their number.
+    Like in `TimeStampManager`, positions within `tolerance` seconds of an
+    existing or an added time stamp are duplicates.
+    """
+    existing = session.scalars(
+        select(TimeStampModel.position)
+        .where(TimeStampModel.audio_id == audio_id)
+        .order_by(TimeStampModel.position)
+    ).all()
+
+    def is_near_existing(position: float) -> bool:
+        index = bisect.bisect_left(existing, position)
+        return any(
+            abs(existing[i] - position) <= tolerance
+            for i in (index - 1, index)
+            if 0 <= i < len(existing)
+        )
+
+    added: List[float] = []
+    for position in sorted(positions):
+        if not is_near_existing(position) and (
+            not added or position - added[-1] > tolerance
+        ):
+            added.append(position)
+    if not added:
+        return 0
+    values = [{"audio_id": audio_id, "position": position} for position in added]
+    session.connection().execute(insert(TimeStampModel), values)
+    return len(added)
+
+
+def add_recording(
+    session: Session,
+    audio_id: int,
+    start: float,
+    end: Optional[float],
+    file_path: str,
+    duration: float,
+) -> int:
+    """Index the recorded take and return its id."""
+    return session.scalar(
+        insert(RecordingModel)
+        .values(
+            audio_id=audio_id,
+            start=start,
+            end=end,
+            file_path=file_path,
+            duration=duration,
+        )
+        .returning(RecordingModel.id)
+    )
+
+
+def list_recordings(
+    session: Session, audio_id: int, start: Optional[float] = None
+) -> List[Recording]:
+    """Return the takes of the audio, or of its segment, the newest first."""
+    stmt = (
+        select(
+            RecordingModel.id,
+            RecordingModel.start,
+            RecordingModel.end,
+            RecordingModel.file_path,
+            RecordingModel.duration,
+            RecordingModel.added,
+        )
+        .where(RecordingModel.audio_id == audio_id)
+        .order_by(RecordingModel.added.desc(), RecordingModel.id.desc())
+    )
+    if start is not None:
+        stmt = stmt.where(RecordingModel.start == start)
+    return [Recording(*row) for row in session.execute(stmt)]
+
+
+def save_scores(
+    session: Session, recording_id: int, timing: float, intonation: float
+) -> None:
+    """
+    Store the scores of the take and add them to the means of its audio and
+    of its segment.
+    """
+    audio_id, start, end = session.execute(
+        update(RecordingModel)
+        .where(RecordingModel.id == recording_id)
+        .values(timing_score=timing, intonation_score=intonation)
+        .returning(RecordingModel.audio_id, RecordingModel.start, RecordingModel.end)
+    ).one()
+    count = AudioModel.scored_takes
+    session.execute(
+        update(AudioModel)
+        .where(AudioModel.id == audio_id)
+        .values(
+            scored_takes=count + 1,
+            timing_score=(func.coalesce(AudioModel.timing_score, 0) * count + timing)
+            / (count + 1),
+            intonation_score=(
+                func.coalesce(AudioModel.intonation_score, 0) * count + intonation
+            )
+            / (count + 1),
+        )
+    )
+
+    score = (timing + intonation) / 2
+    count = SegmentStatsModel.scored_takes
+    session.execute(
+        sqlite_insert(SegmentStatsModel)
+        .values(audio_id=audio_id, start=start, end=end, scored_takes=1, score=score)
+        .on_conflict_do_update(
+            index_elements=[SegmentStatsModel.audio_id, SegmentStatsModel.start],
+            set_={
+                "scored_takes": count + 1,
+                "score": (func.coalesce(SegmentStatsModel.score, 0) * count + score)
+                / (count + 1),
+            },
+        )
+    )
+
+
+def list_segment_stats(session: Session, audio_id: int) -> List[SegmentStats]:
+    """Return the statistics of the practiced segments of the audio in order."""
+    stmt = (
+        select(*_SEGMENT_STATS_COLUMNS)
+        .where(SegmentStatsModel.audio_id == audio_id)
+        .order_by(SegmentStatsModel.start)
+    )
+    return [SegmentStats(*row) for row in session.execute(stmt)]
+
+
+def segment_heatmap(
+    session: Session, audio_id: int, duration: float, bins: int = 100
+) -> List[HeatmapBin]:
+    """
+    Spread the plays and the dwell time of the segments over equal parts of
+    the timeline, in proportion to how much of each segment falls into them.
+    """
+    size = duration / bins
+    edges = [i * size for i in range(bins + 1)]
+    plays, dwell = [0.0] * bins, [0.0] * bins
+    stmt = (
+        select(
+            SegmentStatsModel.start,
+            SegmentStatsModel.end,
+            SegmentStatsModel.plays,
+            SegmentStatsModel.dwell,
+        )
+        .where(
+            SegmentStatsModel.audio_id == audio_id,
+            SegmentStatsModel.start < duration,
+            or_(SegmentStatsModel.plays > 0, SegmentStatsModel.dwell > 0),
+        )
+        .order_by(SegmentStatsModel.start)
+    )
+    for start, end, segment_plays, segment_dwell in session.execute(stmt):
+        end = duration if end is None else min(end, duration)
+        length = max(end - start, 1e-9)
+        first = min(int(start / size), bins - 1)
+        last = min(int(end / size), bins - 1)
+        for i in range(first, last + 1):
+            part = (min(end, edges[i + 1]) - max(start, edges[i])) / length
+            if part > 0:
+                plays[i] += segment_plays * part
+                dwell[i] += segment_dwell * part
+    return [HeatmapBin(edges[i], edges[i + 1], plays[i], dwell[i]) for i in range(bins)]
+
+
+def weakest_segments(
+    session: Session, audio_id: Optional[int] = None, limit: int = 10
+) -> List[SegmentStats]:
+    """
+    Return the segments with the lowest mean score of their recorded takes,
+    of the whole library or of one audio. Segments without scored takes
+    aren't ranked.
+    """
+    stmt = (
+        select(*_SEGMENT_STATS_COLUMNS)
+        .where(SegmentStatsModel.score.is_not(None))
+        .order_by(SegmentStatsModel.score, SegmentStatsModel.id)
+        .limit(limit)
+    )
+    if audio_id is not None:
+        stmt = stmt.where(SegmentStatsModel.audio_id == audio_id)
+    return [SegmentStats(*row) for row in session.execute(stmt)]
+
+
+def vacuum(bind: Engine) -> None:
+    """Optimise the search index and the query planner, and rebuild the file."""
+    with bind.begin() as connection:
+        if has_search_index(connection):
+            connection.exec_driver_sql(OPTIMIZE_SEARCH_INDEX)
+        connection.exec_driver_sql("PRAGMA optimize")
+    # VACUUM can't run inside a transaction
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
@@ -0,0 +1,170 @@
+"""
+Schema migrations for databases created by older versions of the app.
+
+Every migration must be idempotent, because a fresh database is created with
+the current schema by `create_all` and only then marked as migrated.
+The number of applied migrations is kept in SQLite `PRAGMA user_version`.
+"""
+import logging
+from pathlib import Path
+
+from sqlalchemy import Connection, Engine, insert, inspect, update
+from sqlalchemy.exc import OperationalError
+
+from utils.file import file_digest
+
+from .db_setup import Base, engine
+from .models import AudioModel, TimeStampModel
+from .review import REVIEW_QUEUE_DDL
+from .search import SEARCH_INDEX_DDL
+
+logger = logging.getLogger(__name__)
+
+
+def move_time_stamps_to_table(connection: Connection) -> None:
+    """Move the comma-joined `audio.time_stamp` column to the `time_stamp` table."""
+    columns = {column["name"] for column in inspect(connection).get_columns("audio")}
+    if "time_stamp" not in columns:
+        return
+
+    rows = connection.exec_driver_sql("SELECT id, time_stamp FROM audio").all()
+    values = [
+        {"audio_id": audio_id, "position": position}
+        for audio_id, time_stamp in rows
+        if time_stamp
+        for position in {float(i) for i in time_stamp.split(",")}
+    ]
+    if values:
+        connection.execute(insert(TimeStampModel).prefix_with("OR IGNORE"), values)
+    connection.exec_driver_sql("ALTER TABLE audio DROP COLUMN time_stamp")
+
+
+def create_audio_indexes(connection: Connection) -> None:
+    """
+    Create the `audio` indexes which `create_all` skips for existing tables.
+    Indexes of columns added by later migrations are created by them.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("audio")}
+    for index in AudioModel.__table__.indexes:
+        if {column.name for column in index.columns} <= columns:
+            index.create(connection, checkfirst=True)
+
+
+def create_search_index(connection: Connection) -> None:
+    """Add the `audio.transcript` column and the full-text search index."""
+    columns = {column["name"] for column in inspect(connection).get_columns("audio")}
+    if "transcript" not in columns:
+        connection.exec_driver_sql("ALTER TABLE audio ADD COLUMN transcript VARCHAR")
+
+    try:
+        for statement in SEARCH_INDEX_DDL:
+            connection.exec_driver_sql(statement)
+    except OperationalError:
+        logger.warning("SQLite without FTS5 trigram support, search uses LIKE")
+
+
+def add_audio_digest(connection: Connection) -> None:
+    """
+    Add the `audio.digest` column and compute it for the stored files.
+
+    Audio which was copied more than once keeps the digest only on its first
+    row, the unique index doesn't allow duplicates.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("audio")}
+    if "digest" not in columns:
+        connection.exec_driver_sql("ALTER TABLE audio ADD COLUMN digest VARCHAR")
+
+    rows = connection.exec_driver_sql(
+        "SELECT id, file_path FROM audio WHERE digest IS NULL ORDER BY id"
+    ).all()
+    seen = set(
+        connection.exec_driver_sql(
+            "SELECT digest FROM audio WHERE digest IS NOT NULL"
+        ).scalars()
+    )
+    for audio_id, file_path in rows:
+        try:
+            digest = file_digest(Path(file_path))
+        except OSError:
+            logger.warning(f"Missing audio file {file_path}, digest not computed")
+            continue
+        if digest not in seen:
+            seen.add(digest)
+            connection.execute(
+                update(AudioModel)
+                .where(AudioModel.id == audio_id)
+                .values(digest=digest)
+            )
+    create_audio_indexes(connection)
+
+
+def add_scores(connection: Connection) -> None:
+    """Add the pronunciation score columns to `audio` and `recording`."""
+    new_columns = {
+        "audio": {
+            "scored_takes": "INTEGER NOT NULL DEFAULT 0",
+            "timing_score": "FLOAT",
+            "intonation_score": "FLOAT",
+        },
+        "recording": {"timing_score": "FLOAT", "intonation_score": "FLOAT"},
+    }
+    for table, definitions in new_columns.items():
+        columns = {column["name"] for column in inspect(connection).get_columns(table)}
+        for name, definition in definitions.items():
+            if name not in columns:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table} ADD COLUMN {name} {definition}"
+                )
+
+
+def create_review_queue(connection: Connection) -> None:
+    """Schedule the existing segments and keep the queue in sync with them."""
+    for statement in REVIEW_QUEUE_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def normalize_audio_added(connection: Connection) -> None:
+    """
+    Store the `audio.added` set by the SQLite default with microseconds, like
+    the dates set by SQLAlchemy, so all of them compare as the same strings.
+    """
+    connection.exec_driver_sql(
+        "UPDATE audio SET added = added || '.000000' WHERE length(added) = 19"
+    )
+
+
+def add_audio_source_path(connection: Connection) -> None:
+    """
+    Add the `audio.source_path` column. The path of the audio imported before
+    isn't known, only the stored copy is.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("audio")}
+    if "source_path" not in columns:
+        connection.exec_driver_sql("ALTER TABLE audio ADD COLUMN source_path VARCHAR")
+
+
+MIGRATIONS = (
+    move_time_stamps_to_table,
+    create_audio_indexes,
+    create_search_index,
+    add_audio_digest,
+    add_scores,
+    create_review_queue,
+    normalize_audio_added,
+    add_audio_source_path,
+)
+
+
+def run_migrations(bind: Engine = engine) -> None:
+    """Apply all migrations which haven't been applied to the database yet."""
+    with bind.begin() as connection:
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+
+def init_db(bind: Engine = engine) -> None:
+    """Create missing tables and bring the existing ones up to date."""
+    Base.metadata.create_all(bind=bind)
+    run_migrations(bind)
@@ -1,23 +1,36 @@
 """SQL models for the database."""
 
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 
-from sqlalchemy import func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .db_setup import Base
 
 
+def utc_now() -> datetime:
+    """Return the current UTC time without the time zone, as it is stored."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class AudioModel(Base):
     __tablename__ = "audio"
+    # keyset pagination of the library is ordered by (added, id)
+    __table_args__ = (Index("ix_audio_added_id", "added", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column()
+    name: Mapped[str] = mapped_column(index=True)
     file_path: Mapped[str] = mapped_column(unique=True)
-    time_stamp: Mapped[str] = mapped_column(
-        comment="This field represents the timestamp, separated by a comma"
+    source_path: Mapped[Optional[str]] = mapped_column(
+        comment="Path of the imported file relative to its folder, see source_path"
     )
-    added: Mapped[datetime] = mapped_column(server_default=func.now())
+    digest: Mapped[Optional[str]] = mapped_column(
+        index=True, unique=True, comment="Digest of the audio content"
+    )
+    # set by SQLAlchemy, so it's always stored with microseconds like the
+    # datetimes the keyset pagination compares it with
+    added: Mapped[datetime] = mapped_column(default=utc_now, server_default=func.now())
     duration: Mapped[int] = mapped_column(
         default=0, comment="Duration of the audio in seconds"
     )
@@ -27,3 +40,130 @@ class AudioModel(Base):
     finished_times: Mapped[int] = mapped_column(
         default=0, comment="Number of times the audio was finished"
     )
+    scored_takes: Mapped[int] = mapped_column(
+        default=0, server_default="0", comment="Number of scored recorded takes"
+    )
+    timing_score: Mapped[Optional[float]] = mapped_column(
+        comment="Mean timing score of the recorded takes, 0-100"
+    )
+    intonation_score: Mapped[Optional[float]] = mapped_column(
+        comment="Mean intonation score of the recorded takes, 0-100"
+    )
+    transcript: Mapped[Optional[str]] = mapped_column(
+        comment="Optional transcript of the audio, used by the search"
+    )
+
+
+# two time stamps closer than this many seconds are duplicates
+TIME_STAMP_TOLERANCE = 0.5
+
+
+class TimeStampModel(Base):
+    __tablename__ = "time_stamp"
+    __table_args__ = (
+        Index("ix_time_stamp_audio_id_position", "audio_id", "position", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    audio_id: Mapped[int] = mapped_column(ForeignKey("audio.id", ondelete="CASCADE"))
+    position: Mapped[float] = mapped_column(
+        comment="Position of the time stamp in seconds"
+    )
+
+
+class RecordingModel(Base):
+    """Take of the learner's voice recorded while a segment of the audio played."""
+
+    __tablename__ = "recording"
+    __table_args__ = (Index("ix_recording_audio_id_start", "audio_id", "start"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    audio_id: Mapped[int] = mapped_column(ForeignKey("audio.id", ondelete="CASCADE"))
+    start: Mapped[float] = mapped_column(comment="Start of the segment in seconds")
+    end: Mapped[Optional[float]] = mapped_column(
+        comment="End of the segment in seconds, empty for the end of the audio"
+    )
+    file_path: Mapped[str] = mapped_column(unique=True)
+    duration: Mapped[float] = mapped_column(comment="Duration of the take in seconds")
+    timing_score: Mapped[Optional[float]] = mapped_column(
+        comment="Timing score of the take, 0-100"
+    )
+    intonation_score: Mapped[Optional[float]] = mapped_column(
+        comment="Intonation score of the take, 0-100"
+    )
+    added: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class SegmentStatsModel(Base):
+    """
+    Practice counters of one segment of the audio, keyed by the segment start.
+
+    The counters are batched by the audio session and added with an upsert,
+    so every segment has a single row however long it is practiced.
+    """
+
+    __tablename__ = "segment_stats"
+    __table_args__ = (
+        # the timeline of one audio is read in order of the segments
+        Index("ix_segment_stats_audio_id_start", "audio_id", "start", unique=True),
+        # the weakest segments are the ones with the lowest score
+        Index("ix_segment_stats_score", "score"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    audio_id: Mapped[int] = mapped_column(ForeignKey("audio.id", ondelete="CASCADE"))
+    start: Mapped[float] = mapped_column(comment="Start of the segment in seconds")
+    end: Mapped[Optional[float]] = mapped_column(
+        comment="Last known end of the segment, empty for the end of the audio"
+    )
+    plays: Mapped[int] = mapped_column(
+        default=0, comment="Number of times the segment was played"
+    )
+    dwell: Mapped[int] = mapped_column(
+        default=0, comment="Total time the segment was played, in seconds"
+    )
+    last_practiced: Mapped[Optional[datetime]]
+    scored_takes: Mapped[int] = mapped_column(
+        default=0, comment="Number of scored recorded takes of the segment"
+    )
+    score: Mapped[Optional[float]] = mapped_column(
+        comment="Mean of the timing and intonation scores of the takes, 0-100"
+    )
+
+
+class ReviewModel(Base):
+    """
+    Spaced-repetition state of one segment, keyed by its start time stamp.
+
+    Rows are added and removed with the time stamps by triggers (see
+    `models.review`), so every segment of the library is scheduled.
+    """
+
+    __tablename__ = "review"
+    __table_args__ = (
+        Index("ix_review_audio_id_start", "audio_id", "start", unique=True),
+        # the queue of due segments is read in order of the due date
+        Index("ix_review_due_id", "due", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    audio_id: Mapped[int] = mapped_column(ForeignKey("audio.id", ondelete="CASCADE"))
+    start: Mapped[float] = mapped_column(comment="Start of the segment in seconds")
+    due: Mapped[datetime] = mapped_column(
+        server_default=func.now(), comment="When the segment should be reviewed, UTC"
+    )
+    interval: Mapped[float] = mapped_column(
+        default=0.0, server_default="0", comment="Days until the next review"
+    )
+    ease: Mapped[float] = mapped_column(
+        default=2.5, server_default="2.5", comment="SM-2 ease factor"
+    )
+    repetitions: Mapped[int] = mapped_column(
+        default=0,
+        server_default="0",
+        comment="Reviews in a row graded as recalled",
+    )
+    lapses: Mapped[int] = mapped_column(
+        default=0, server_default="0", comment="Reviews graded as forgotten"
+    )
+    last_reviewed: Mapped[Optional[datetime]]
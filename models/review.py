@@ -0,0 +1,170 @@
+"""
+Spaced-repetition scheduling of the segments of the whole library.
+
+Every time stamp starts a segment which is scheduled with the SM-2 algorithm.
+The `review` rows are added and removed with the time stamps by triggers, so
+segments made by the screens, the importer and the command line tool are all
+scheduled, and a new segment is due at once. The queue is ordered by the
+`(due, id)` index, which makes reading the next due segments a short index
+scan however big the library is.
+
+Due dates are stored in UTC, like the dates SQLite sets by default.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Collection, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from .models import AudioModel, ReviewModel, TimeStampModel, utc_now
+
+REVIEW_QUEUE_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS review_insert AFTER INSERT ON time_stamp BEGIN
+        INSERT OR IGNORE INTO review (audio_id, start) VALUES (new.audio_id, new.position);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS review_delete AFTER DELETE ON time_stamp BEGIN
+        DELETE FROM review WHERE audio_id = old.audio_id AND start = old.position;
+    END
+    """,
+    # segments made before the queue existed
+    """
+    INSERT OR IGNORE INTO review (audio_id, start)
+    SELECT audio_id, position FROM time_stamp
+    """,
+)
+
+# grades of a review, 0-5 as in SM-2
+FORGOTTEN, HARD, GOOD, EASY = 1, 3, 4, 5
+MIN_EASE = 1.3
+
+
+@dataclass(frozen=True)
+class ReviewState:
+    interval: float = 0.0  # days
+    ease: float = 2.5
+    repetitions: int = 0
+    lapses: int = 0
+
+
+@dataclass(frozen=True)
+class DueSegment:
+    """Segment waiting for a review, with the audio it belongs to."""
+
+    id: int
+    audio_id: int
+    file_path: str
+    start: float
+    end: Optional[float]
+    due: datetime
+    repetitions: int
+    digest: Optional[str] = None
+
+
+def sm2(state: ReviewState, grade: int) -> ReviewState:
+    """
+    Return the state after a review graded from 0 (blackout) to 5 (perfect).
+
+    Grades below 3 mean the segment was forgotten: it is learned from the
+    start again and reviewed the next day.
+    """
+    if not 0 <= grade <= 5:
+        raise ValueError(f"Grade must be between 0 and 5, not {grade}")
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    if grade < 3:
+        return ReviewState(1.0, ease, 0, state.lapses + 1)
+    repetitions = state.repetitions + 1
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = round(state.interval * state.ease)
+    return ReviewState(interval, ease, repetitions, state.lapses)
+
+
+def due_segments(
+    session: Session,
+    limit: int = 20,
+    now: Optional[datetime] = None,
+    exclude: Collection[int] = (),
+) -> List[DueSegment]:
+    """
+    Return the segments due at `now`, the longest overdue first.
+
+    The `exclude` ids, such as the segments already queued for the review
+    session, are skipped.
+    """
+    end = (
+        select(func.min(TimeStampModel.position))
+        .where(
+            TimeStampModel.audio_id == ReviewModel.audio_id,
+            TimeStampModel.position > ReviewModel.start,
+        )
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            ReviewModel.id,
+            ReviewModel.audio_id,
+            AudioModel.file_path,
+            ReviewModel.start,
+            end,
+            ReviewModel.due,
+            ReviewModel.repetitions,
+            AudioModel.digest,
+        )
+        .join(AudioModel, AudioModel.id == ReviewModel.audio_id)
+        .where(ReviewModel.due <= (now or utc_now()))
+        .order_by(ReviewModel.due, ReviewModel.id)
+        .limit(limit)
+    )
+    if exclude:
+        stmt = stmt.where(ReviewModel.id.not_in(list(exclude)))
+    return [DueSegment(*row) for row in session.execute(stmt)]
+
+
+def count_due(session: Session, now: Optional[datetime] = None) -> int:
+    return session.scalar(
+        select(func.count())
+        .select_from(ReviewModel)
+        .where(ReviewModel.due <= (now or utc_now()))
+    )
+
+
+def grade_review(
+    session: Session, review_id: int, grade: int, now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """
+    Schedule the next review of the segment and return its due date, or None
+    when the segment doesn't exist anymore.
+    """
+    row = session.execute(
+        select(
+            ReviewModel.interval,
+            ReviewModel.ease,
+            ReviewModel.repetitions,
+            ReviewModel.lapses,
+        ).where(ReviewModel.id == review_id)
+    ).first()
+    if row is None:
+        return None
+    now = now or utc_now()
+    state = sm2(ReviewState(*row), grade)
+    due = now + timedelta(days=state.interval)
+    session.execute(
+        update(ReviewModel)
+        .where(ReviewModel.id == review_id)
+        .values(
+            interval=state.interval,
+            ease=state.ease,
+            repetitions=state.repetitions,
+            lapses=state.lapses,
+            due=due,
+            last_reviewed=now,
+        )
+    )
+    return due
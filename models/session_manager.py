@@ -1,8 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, MutableSequence, Optional, Set
+
+from sqlalchemy import DateTime, bindparam, delete, insert, text, update
+from sqlalchemy.orm import Session
 
 from .db_setup import SessionLocal
+from .models import AudioModel, TimeStampModel, utc_now
 
 
 class DataBaseSessionManager:
@@ -22,39 +27,212 @@ class DataBaseSessionManager:
             self.session.close()
 
 
+@dataclass
+class SegmentPractice:
+    """Practice of one segment counted since the last save."""
+
+    end: Optional[float] = None
+    plays: int = 0
+    dwell: int = 0
+    last_practiced: Optional[datetime] = None
+
+    def merge(self, newer: "SegmentPractice") -> None:
+        self.end = newer.end
+        self.plays += newer.plays
+        self.dwell += newer.dwell
+        self.last_practiced = newer.last_practiced or self.last_practiced
+
+
+# the ON CONFLICT clause of SQLAlchemy can't be cached, so the upsert of the
+# counters is written in SQL and compiled only once
+_SEGMENT_UPSERT = text(
+    """
+    INSERT INTO segment_stats
+        (audio_id, start, "end", plays, dwell, last_practiced, scored_takes)
+    VALUES (:audio_id, :start, :end, :plays, :dwell, :last_practiced, 0)
+    ON CONFLICT (audio_id, start) DO UPDATE SET
+        "end" = excluded."end",
+        plays = plays + excluded.plays,
+        dwell = dwell + excluded.dwell,
+        last_practiced = coalesce(excluded.last_practiced, last_practiced)
+    """
+).bindparams(bindparam("last_practiced", type_=DateTime))
+
+
+@dataclass
+class AudioSessionChanges:
+    """Journal of the changes made to an AudioSession since the last save."""
+
+    audio_id: int
+    fields: dict = field(default_factory=dict)
+    added_time_stamps: Set[float] = field(default_factory=set)
+    removed_time_stamps: Set[float] = field(default_factory=set)
+    # segment start -> practice counted since the last save
+    segments: Dict[float, SegmentPractice] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.fields
+            or self.added_time_stamps
+            or self.removed_time_stamps
+            or self.segments
+        )
+
+    def add_time_stamp(self, position: float) -> None:
+        if position in self.removed_time_stamps:
+            self.removed_time_stamps.discard(position)
+        else:
+            self.added_time_stamps.add(position)
+
+    def remove_time_stamp(self, position: float) -> None:
+        if position in self.added_time_stamps:
+            self.added_time_stamps.discard(position)
+        else:
+            self.removed_time_stamps.add(position)
+
+    def add_segment_practice(self, start: float, practice: SegmentPractice) -> None:
+        counted = self.segments.get(start)
+        if counted is None:
+            self.segments[start] = practice
+        else:
+            counted.merge(practice)
+
+    def merge(self, newer: "AudioSessionChanges") -> None:
+        """Fold changes made after this journal into it."""
+        self.fields.update(newer.fields)
+        for position in newer.removed_time_stamps:
+            self.remove_time_stamp(position)
+        for position in newer.added_time_stamps:
+            self.add_time_stamp(position)
+        for start, practice in newer.segments.items():
+            self.add_segment_practice(start, practice)
+
+    def apply(self, session: Session) -> None:
+        """Write only the changed columns and time stamps to the database."""
+        if self.fields:
+            session.execute(
+                update(AudioModel)
+                .where(AudioModel.id == self.audio_id)
+                .values(**self.fields)
+            )
+        if self.removed_time_stamps:
+            session.execute(
+                delete(TimeStampModel).where(
+                    TimeStampModel.audio_id == self.audio_id,
+                    TimeStampModel.position.in_(self.removed_time_stamps),
+                )
+            )
+        if self.added_time_stamps:
+            session.execute(
+                insert(TimeStampModel),
+                [
+                    {"audio_id": self.audio_id, "position": position}
+                    for position in self.added_time_stamps
+                ],
+            )
+        if self.segments:
+            self._apply_segments(session)
+
+    def _apply_segments(self, session: Session) -> None:
+        """Add the counters to the segment rows, creating the missing ones."""
+        session.connection().execute(
+            _SEGMENT_UPSERT,
+            [
+                {
+                    "audio_id": self.audio_id,
+                    "start": start,
+                    "end": practice.end,
+                    "plays": practice.plays,
+                    "dwell": practice.dwell,
+                    "last_practiced": practice.last_practiced,
+                }
+                for start, practice in self.segments.items()
+            ],
+        )
+
+
+@dataclass(frozen=True)
+class AudioSummary:
+    """Lightweight projection of the audio used to list the library."""
+
+    id: int
+    name: str
+    added: datetime
+
+
 @dataclass
 class AudioSession:
+    """
+    Audio loaded from the database.
+
+    Assigning a new value to a column field, or calling `track_time_stamp_added`
+    and `track_time_stamp_removed`, is recorded in a journal of changes so that
+    saving the session writes only what has changed (see `pop_changes`).
+    """
+
+    TRACKED_FIELDS = ("name", "file_path", "duration", "spend_time", "finished_times")
+
     id: int
     name: str
     file_path: Path
-    time_stamp: List[float]
+    time_stamp: MutableSequence[float]
     duration: int
     spend_time: int
     finished_times: int
+    # digest of the file content, the key of its cached waveform and PCM
+    digest: Optional[str] = None
+    _changes: AudioSessionChanges = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._changes = AudioSessionChanges(self.id)
+
+    def __setattr__(self, name, value):
+        changes = self.__dict__.get("_changes")
+        if (
+            changes is not None
+            and name in self.TRACKED_FIELDS
+            and self.__dict__.get(name) != value
+        ):
+            changes.fields[name] = str(value) if name == "file_path" else value
+        super().__setattr__(name, value)
 
     @classmethod
     def parse_data(cls, data: dict) -> "AudioSession":
         data = data.copy()
-        time_stamp = data.pop("time_stamp", None)
-        time_stamp = [float(i) for i in time_stamp.split(",")] if time_stamp else []
+        time_stamp = sorted(data.pop("time_stamp", None) or [])
         file_path = Path(data.pop("file_path"))
         return cls(**data, time_stamp=time_stamp, file_path=file_path)
 
     def to_dict(self) -> dict:
-        audio_session = self.__dict__.copy()
-        # convert list to str
-        audio_session["time_stamp"] = ",".join(map(str, audio_session["time_stamp"]))
+        audio_session = {
+            key: value for key, value in self.__dict__.items() if key != "_changes"
+        }
+        audio_session["time_stamp"] = list(audio_session["time_stamp"])
         audio_session["file_path"] = str(audio_session["file_path"])
         return audio_session
 
-    def diff(self, other: "AudioSession") -> dict:
-        if not isinstance(other, AudioSession):
-            raise ValueError("Can only compare with another AudioSession instance.")
-        difference = {}
-        other = other.to_dict()
-        self_dict = self.to_dict()
-        for key in self_dict.keys():
-            if self_dict[key] != other[key]:
-                difference[key] = other[key]
-
-        return difference
+    @property
+    def has_changes(self) -> bool:
+        return bool(self._changes)
+
+    def track_time_stamp_added(self, position: float) -> None:
+        self._changes.add_time_stamp(position)
+
+    def track_time_stamp_removed(self, position: float) -> None:
+        self._changes.remove_time_stamp(position)
+
+    def track_segment_practice(
+        self, start: float, end: Optional[float], plays: int = 0, dwell: int = 0
+    ) -> None:
+        """Count plays and seconds of practice of the segment."""
+        self._changes.add_segment_practice(
+            start,
+            SegmentPractice(
+                end=end, plays=plays, dwell=dwell, last_practiced=utc_now()
+            ),
+        )
+
+    def pop_changes(self) -> AudioSessionChanges:
+        """Return the journal of changes and start a new, empty one."""
+        changes, self._changes = self._changes, AudioSessionChanges(self.id)
+        return changes
@@ -0,0 +1,146 @@
+"""Background persistence of the audio session changes."""
+import logging
+import threading
+from typing import Callable, ContextManager, Dict, Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .session_manager import AudioSessionChanges, DataBaseSessionManager
+
+logger = logging.getLogger(__name__)
+
+# the database is locked or unavailable for a while, the write may succeed later
+TRANSIENT_ERRORS = (OperationalError, OSError)
+
+
+class WriteBehindQueue:
+    """
+    Queue of audio session changes saved on a dedicated thread.
+
+    `submit` never touches the database, so it's safe to call from the UI thread.
+    Changes submitted for the same audio are merged until the next flush, which
+    happens every `interval` seconds, on `flush` and on `stop`. All pending
+    changes are written in one transaction, in the order they were submitted.
+    When the database is unavailable, they are kept and retried with the next
+    flush. Changes which can never be saved, such as rows breaking a constraint,
+    are logged and dropped, so they don't hold back the changes of other audios.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], ContextManager[Session]] = DataBaseSessionManager,
+        interval: float = 2.0,
+    ):
+        self.interval = interval
+        self._session_factory = session_factory
+        self._pending: Dict[int, AudioSessionChanges] = {}
+        self._writing = False
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker thread after writing all pending changes."""
+        if self.is_running:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+        self._write_pending()
+
+    def submit(self, changes: AudioSessionChanges) -> None:
+        """Queue the changes to be written with the next flush."""
+        if not changes:
+            return
+        with self._condition:
+            pending = self._pending.get(changes.audio_id)
+            if pending is None:
+                self._pending[changes.audio_id] = changes
+            else:
+                pending.merge(changes)
+
+    def has_pending(self) -> bool:
+        with self._condition:
+            return bool(self._pending) or self._writing
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write pending changes now and wait until they are saved.
+
+        Returns:
+            bool: False if the changes weren't saved before the timeout.
+        """
+        if not self.is_running:
+            return self._write_pending()
+
+        with self._condition:
+            self._wake.set()
+            return self._condition.wait_for(
+                lambda: not self._pending and not self._writing, timeout
+            )
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._write_pending()
+
+    def _write_pending(self) -> bool:
+        with self._condition:
+            if self._writing or not self._pending:
+                return not self._pending
+            batch, self._pending = self._pending, {}
+            self._writing = True
+
+        batch = self._save(batch)
+        saved = not batch
+
+        with self._condition:
+            if not saved:
+                for audio_id, changes in self._pending.items():
+                    if audio_id in batch:
+                        batch[audio_id].merge(changes)
+                    else:
+                        batch[audio_id] = changes
+                self._pending = batch
+            self._writing = False
+            self._condition.notify_all()
+        return saved
+
+    def _save(
+        self, batch: Dict[int, AudioSessionChanges]
+    ) -> Dict[int, AudioSessionChanges]:
+        """Write the batch and return the changes which should be retried."""
+        try:
+            with self._session_factory() as session:
+                for changes in batch.values():
+                    changes.apply(session)
+        except TRANSIENT_ERRORS:
+            logger.exception("Could not save audio session changes, will retry")
+            return batch
+        except Exception:
+            if len(batch) == 1:
+                logger.exception(
+                    f"Dropped changes of audio {next(iter(batch))}, they can't be saved"
+                )
+                return {}
+            # find the changes which can't be saved, the others are saved apart
+            retry = {}
+            for audio_id, changes in batch.items():
+                retry.update(self._save({audio_id: changes}))
+            return retry
+        return {}
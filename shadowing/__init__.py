@@ -0,0 +1 @@
+"""Command line tool managing the library without the user interface."""
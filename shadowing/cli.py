@@ -0,0 +1,233 @@
+"""
+Headless management of the library.
+
+Usage:
+    python -m shadowing import ~/podcasts lesson.mp3
+    python -m shadowing list
+    python -m shadowing search "shadowing lesson"
+    python -m shadowing segment           # every audio without time stamps
+    python -m shadowing export-stats --format jsonl -o stats.jsonl
+    python -m shadowing weakest --limit 20
+    python -m shadowing vacuum
+
+Only the models and utilities which don't need Kivy are imported, so the tool
+never opens a window. Results are written as they are read, one line per audio,
+so even large libraries are printed with constant memory.
+"""
+import argparse
+import csv
+import dataclasses
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, TextIO
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import sessionmaker
+
+from models.db_setup import DATABASE_URL, create_db_engine, get_engine_profile
+from models.importer import ImportProgress, find_audio_files, import_files
+from models.library import (
+    AudioStats,
+    add_time_stamps,
+    get_audio_paths,
+    iter_audio_stats,
+    iter_library,
+    vacuum,
+    weakest_segments,
+)
+from models.migrations import init_db
+from models.search import search_audio
+from models.session_manager import AudioSummary
+from utils.file import DEFAULT_AUDIO_KEEPER
+from utils.pcm import AudioDecodeError
+from utils.segmentation import SegmentationSettings, detect_boundaries
+
+# how often the import reports its progress, in files
+PROGRESS_EVERY = 100
+
+
+def _collect_files(paths: List[Path]) -> List[Path]:
+    files = []
+    for path in paths:
+        files.extend(find_audio_files(path) if path.is_dir() else [path])
+    return list(dict.fromkeys(files))
+
+
+def _print_summary(summary: AudioSummary, out: TextIO) -> None:
+    print(f"{summary.id}\t{summary.added:%Y-%m-%d %H:%M:%S}\t{summary.name}", file=out)
+
+
+def import_command(args, session_factory: sessionmaker, out: TextIO) -> int:
+    files = _collect_files(args.paths)
+
+    def report(progress: ImportProgress) -> None:
+        if progress.done % PROGRESS_EVERY == 0 or progress.done == progress.total:
+            print(f"{progress.done}/{progress.total}", file=sys.stderr)
+
+    progress = import_files(
+        files,
+        session_factory,
+        store=args.store,
+        on_progress=report,
+        workers=args.workers,
+    )
+    for path, error in progress.failed:
+        print(f"failed\t{path}\t{error}", file=sys.stderr)
+    print(
+        f"imported {progress.imported}, skipped {progress.skipped}, "
+        f"failed {len(progress.failed)}",
+        file=out,
+    )
+    return 1 if progress.failed else 0
+
+
+def list_command(args, session_factory: sessionmaker, out: TextIO) -> int:
+    with session_factory() as session:
+        for summary in iter_library(session):
+            _print_summary(summary, out)
+    return 0
+
+
+def search_command(args, session_factory: sessionmaker, out: TextIO) -> int:
+    with session_factory() as session:
+        results = search_audio(session, args.query, args.limit)
+    for summary in results:
+        _print_summary(summary, out)
+    return 0 if results else 1
+
+
+def segment_command(args, session_factory: sessionmaker, out: TextIO) -> int:
+    with session_factory() as session:
+        audios = list(get_audio_paths(session, args.ids or None))
+
+    failed = 0
+    settings = SegmentationSettings()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            (audio_id, pool.submit(detect_boundaries, Path(file_path), settings))
+            for audio_id, file_path in audios
+        ]
+        for audio_id, future in futures:
+            try:
+                boundaries = future.result()
+            except (AudioDecodeError, OSError) as e:
+                print(f"failed\t{audio_id}\t{e}", file=sys.stderr)
+                failed += 1
+                continue
+            with session_factory.begin() as session:
+                added = add_time_stamps(session, audio_id, boundaries)
+            print(f"{audio_id}\t{added}", file=out)
+    return 1 if failed else 0
+
+
+def export_stats_command(args, session_factory: sessionmaker, out: TextIO) -> int:
+    columns = [column.name for column in dataclasses.fields(AudioStats)]
+    with session_factory() as session:
+        if args.format == "csv":
+            writer = csv.writer(out)
+            writer.writerow(columns)
+            for stats in iter_audio_stats(session):
+                writer.writerow(dataclasses.astuple(stats))
+        else:
+            for stats in iter_audio_stats(session):
+                print(
+                    json.dumps(
+                        dataclasses.asdict(stats), default=str, ensure_ascii=False
+                    ),
+                    file=out,
+                )
+    return 0
+
+
+def weakest_command(args, session_factory: sessionmaker, out: TextIO) -> int:
+    with session_factory() as session:
+        segments = weakest_segments(session, args.audio, args.limit)
+    for segment in segments:
+        end = "end" if segment.end is None else f"{segment.end:.2f}"
+        print(
+            f"{segment.audio_id}\t{segment.start:.2f}\t{end}\t{segment.score:.1f}\t"
+            f"{segment.plays}\t{segment.dwell}",
+            file=out,
+        )
+    return 0
+
+
+def vacuum_command(args, engine: Engine, out: TextIO) -> int:
+    database = Path(engine.url.database) if engine.url.database else None
+    size = database.stat().st_size if database and database.exists() else None
+    vacuum(engine)
+    if size is not None:
+        print(f"{size} -> {database.stat().st_size} bytes", file=out)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="shadowing", description="Manage the Shadowing App library."
+    )
+    parser.add_argument(
+        "--database", default=DATABASE_URL, help="SQLAlchemy URL of the database"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("import", help="add audio files and folders")
+    command.add_argument("paths", nargs="+", type=Path)
+    command.add_argument("--store", type=Path, default=DEFAULT_AUDIO_KEEPER)
+    command.add_argument("--workers", type=int, default=8)
+    command.set_defaults(handler=import_command)
+
+    command = commands.add_parser("list", help="print the library")
+    command.set_defaults(handler=list_command)
+
+    command = commands.add_parser("search", help="search the library")
+    command.add_argument("query")
+    command.add_argument("--limit", type=int, default=50)
+    command.set_defaults(handler=search_command)
+
+    command = commands.add_parser(
+        "segment",
+        help="add time stamps at the pauses between sentences",
+        description="Segment the given audios, or all audios without time stamps.",
+    )
+    command.add_argument("ids", nargs="*", type=int)
+    command.add_argument("--workers", type=int, default=None)
+    command.set_defaults(handler=segment_command)
+
+    command = commands.add_parser("export-stats", help="export practice statistics")
+    command.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    command.add_argument(
+        "-o", "--output", type=argparse.FileType("w", encoding="utf-8"), default="-"
+    )
+    command.set_defaults(handler=export_stats_command)
+
+    command = commands.add_parser(
+        "weakest",
+        help="print the segments with the lowest scores",
+        description="Print audio id, start, end, score, plays and dwell seconds "
+        "of the segments whose recorded takes scored the lowest.",
+    )
+    command.add_argument("--audio", type=int, default=None, help="only this audio")
+    command.add_argument("--limit", type=int, default=10)
+    command.set_defaults(handler=weakest_command)
+
+    command = commands.add_parser("vacuum", help="optimise and compact the database")
+    command.set_defaults(handler=vacuum_command)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    engine = create_db_engine(args.database, get_engine_profile())
+    try:
+        init_db(engine)
+        out = getattr(args, "output", sys.stdout)
+        if args.handler is vacuum_command:
+            return vacuum_command(args, engine, out)
+        return args.handler(args, sessionmaker(engine), out)
+    except BrokenPipeError:
+        # the output was piped to a command which has already exited
+        return 0
+    finally:
+        engine.dispose()
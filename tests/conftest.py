@@ -0,0 +1,29 @@
+"""Run the tests against a throw-away database instead of `shadowing.db`."""
+import os
+import tempfile
+import wave
+
+import pytest
+
+os.environ.setdefault(
+    "SHADOWING_DATABASE_URL",
+    f"sqlite:///{tempfile.mkdtemp(prefix='shadowing-tests-')}/shadowing.db",
+)
+
+
+@pytest.fixture
+def make_wav(tmp_path):
+    """Return a function which writes mono float samples to a 16-bit WAV file."""
+    import numpy as np
+
+    def make_wav(samples, sample_rate=8000, name="audio.wav"):
+        path = tmp_path / name
+        pcm = (np.clip(np.asarray(samples), -1, 1) * 32767).astype("<i2")
+        with wave.open(str(path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm.tobytes())
+        return path
+
+    return make_wav
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.pool import QueuePool
+
+from models.db_setup import (
+    ENGINE_PROFILES,
+    EngineProfile,
+    create_db_engine,
+    get_engine_profile,
+)
+
+
+def test_tuned_profile_should_set_pragmas(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", ENGINE_PROFILES["tuned"]
+    )
+    with engine.connect() as connection:
+        pragma = connection.exec_driver_sql
+        assert pragma("PRAGMA journal_mode").scalar() == "wal"
+        assert pragma("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert pragma("PRAGMA foreign_keys").scalar() == 1
+        assert pragma("PRAGMA cache_size").scalar() == -16 * 1024
+    assert not engine.echo
+    engine.dispose()
+
+
+def test_tuned_profile_should_share_pooled_connections_between_threads(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", ENGINE_PROFILES["tuned"]
+    )
+
+    def query():
+        with engine.connect() as connection:
+            return connection.exec_driver_sql("SELECT 1").scalar()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        assert list(executor.map(lambda _: query(), range(50))) == [1] * 50
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.checkedin() <= ENGINE_PROFILES["tuned"].pool_size
+    engine.dispose()
+
+
+def test_profile_should_skip_unset_pragmas():
+    assert EngineProfile().pragmas() == {"foreign_keys": "ON"}
+
+
+@pytest.mark.parametrize(
+    "env, expected",
+    [
+        ({}, ENGINE_PROFILES["tuned"]),
+        ({"SHADOWING_DB_PROFILE": "default"}, ENGINE_PROFILES["default"]),
+        (
+            {"SHADOWING_DB_PROFILE": "default", "SHADOWING_DB_ECHO": "1"},
+            EngineProfile(echo=True),
+        ),
+    ],
+)
+def test_get_engine_profile_should_read_environment(monkeypatch, env, expected):
+    monkeypatch.delenv("SHADOWING_DB_PROFILE", raising=False)
+    monkeypatch.delenv("SHADOWING_DB_ECHO", raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    assert get_engine_profile() == expected
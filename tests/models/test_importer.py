@@ -0,0 +1,121 @@
+import threading
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from models.importer import find_audio_files, import_folder
+from models.migrations import init_db
+from models.models import AudioModel
+from utils.file import file_digest
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'library.db'}")
+    init_db(engine)
+    yield sessionmaker(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def store(tmp_path_factory):
+    return tmp_path_factory.mktemp("store")
+
+
+@pytest.fixture
+def folder(make_wav, tmp_path):
+    """Folder tree with 5 different audios, one copy and a file which isn't audio."""
+    for i in range(5):
+        make_wav(np.full(8000 * (i + 1), i / 10), name=f"{i}.wav")
+    root = tmp_path
+    (root / "nested").mkdir()
+    (root / "nested" / "copy.wav").write_bytes((root / "0.wav").read_bytes())
+    (root / "notes.txt").write_text("not audio")
+    return root
+
+
+def _library(session_factory):
+    with session_factory() as session:
+        return session.execute(
+            select(AudioModel.name, AudioModel.duration).order_by(AudioModel.name)
+        ).all()
+
+
+def test_find_audio_files_should_walk_directory_tree(folder):
+    names = [path.name for path in find_audio_files(folder)]
+    assert names == ["0.wav", "1.wav", "2.wav", "3.wav", "4.wav", "copy.wav"]
+
+
+def test_import_folder_should_insert_every_audio_once(folder, session_factory, store):
+    progress = import_folder(folder, session_factory, store=store)
+
+    assert (progress.total, progress.imported, progress.skipped) == (6, 5, 1)
+    assert _library(session_factory) == [(f"{i}.wav", i + 1) for i in range(5)]
+    assert len(list(store.iterdir())) == 5
+
+
+def test_import_folder_should_report_progress(folder, session_factory, store):
+    reported = []
+
+    import_folder(
+        folder,
+        session_factory,
+        store=store,
+        on_progress=lambda progress: reported.append(progress.done),
+    )
+
+    assert reported == list(range(1, 7))
+
+
+def test_import_folder_should_continue_cancelled_import(folder, session_factory, store):
+    cancel = threading.Event()
+
+    def cancel_after_first_chunk(progress):
+        if progress.done == 2:
+            cancel.set()
+
+    first = import_folder(
+        folder,
+        session_factory,
+        store=store,
+        on_progress=cancel_after_first_chunk,
+        cancel=cancel,
+        chunk_size=2,
+    )
+    second = import_folder(folder, session_factory, store=store)
+
+    assert first.cancelled and first.imported == 2
+    assert (second.imported, second.skipped) == (3, 3)
+    assert len(_library(session_factory)) == 5
+
+
+def test_import_folder_should_report_unreadable_files(folder, session_factory, store):
+    unreadable = folder / "2.wav"
+
+    def digest(path):
+        if path == unreadable:
+            raise PermissionError("Permission denied")
+        return file_digest(path)
+
+    with patch("models.importer.file_digest", side_effect=digest):
+        progress = import_folder(folder, session_factory, store=store)
+
+    assert progress.failed == [(unreadable, "Permission denied")]
+    assert progress.done == progress.total == 6
+    assert progress.imported == 4
+
+
+def test_import_folder_should_keep_source_paths(folder, session_factory, store):
+    (folder / "nested" / "5.wav").write_bytes((folder / "4.wav").read_bytes() + b"5")
+
+    import_folder(folder, session_factory, store=store)
+
+    with session_factory() as session:
+        sources = session.scalars(
+            select(AudioModel.source_path).order_by(AudioModel.source_path)
+        ).all()
+    assert sources[-1] == f"{folder.name}/nested/5.wav"
+    assert sources[:5] == [f"{folder.name}/{i}.wav" for i in range(5)]
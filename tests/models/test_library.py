@@ -0,0 +1,154 @@
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from models.library import (
+    add_recording,
+    add_time_stamps,
+    get_audio_paths,
+    iter_audio_stats,
+    iter_library,
+    list_audio_page,
+    list_recordings,
+    list_segment_stats,
+    save_scores,
+    segment_heatmap,
+    weakest_segments,
+)
+from models.migrations import init_db
+from models.models import AudioModel, RecordingModel, SegmentStatsModel
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    init_db(engine)
+    with Session(engine) as session:
+        session.execute(
+            insert(AudioModel),
+            [{"name": f"{i}.mp3", "file_path": f"/a/{i}.mp3"} for i in range(7)],
+        )
+        yield session
+    engine.dispose()
+
+
+def test_list_audio_page_should_continue_after_given_audio(session):
+    first = list_audio_page(session, limit=3)
+    second = list_audio_page(session, first[-1], limit=3)
+    assert [audio.id for audio in first + second] == [1, 2, 3, 4, 5, 6]
+
+
+def test_list_audio_page_should_not_skip_audios_added_in_same_second(session):
+    added = [audio.added for audio in list_audio_page(session)]
+    assert len({value.replace(microsecond=0) for value in added}) < len(added)
+
+    first = list_audio_page(session, limit=2)
+    rest = list_audio_page(session, first[-1])
+    assert [audio.id for audio in first + rest] == list(range(1, 8))
+
+
+def test_iter_library_should_read_all_pages(session):
+    assert [audio.id for audio in iter_library(session, page_size=3)] == list(
+        range(1, 8)
+    )
+
+
+def test_add_time_stamps_should_skip_existing_ones(session):
+    assert add_time_stamps(session, 1, [1.0, 2.5]) == 2
+    assert add_time_stamps(session, 1, [2.5, 4.0]) == 1
+
+    stats = {stats.id: stats.time_stamps for stats in iter_audio_stats(session, 2)}
+    assert stats == {1: 3, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0}
+
+
+def test_add_time_stamps_should_skip_positions_near_existing_ones(session):
+    add_time_stamps(session, 1, [0.0, 5.0])
+
+    assert add_time_stamps(session, 1, [0.3, 4.6, 7.0, 7.4, 9.0]) == 2
+
+    stats = {stats.id: stats.time_stamps for stats in iter_audio_stats(session)}
+    assert stats[1] == 4
+
+
+def test_get_audio_paths_should_default_to_audio_without_time_stamps(session):
+    add_time_stamps(session, 1, [1.0])
+
+    assert [row.id for row in get_audio_paths(session, [1, 2])] == [1, 2]
+    assert [row.id for row in get_audio_paths(session)] == [2, 3, 4, 5, 6, 7]
+
+
+def test_list_recordings_should_return_takes_of_segment(session):
+    first = add_recording(session, 1, 0.0, 2.5, "/r/1.wav", 2.5)
+    second = add_recording(session, 1, 2.5, None, "/r/2.wav", 1.0)
+    third = add_recording(session, 1, 2.5, None, "/r/3.wav", 1.5)
+    add_recording(session, 2, 2.5, None, "/r/4.wav", 1.5)
+
+    assert [take.id for take in list_recordings(session, 1)] == [third, second, first]
+    assert [take.file_path for take in list_recordings(session, 1, start=2.5)] == [
+        "/r/3.wav",
+        "/r/2.wav",
+    ]
+
+
+def test_save_scores_should_update_take_and_mean_of_audio(session):
+    first = add_recording(session, 1, 0.0, 2.5, "/r/1.wav", 2.5)
+    second = add_recording(session, 1, 0.0, 2.5, "/r/2.wav", 2.5)
+
+    save_scores(session, first, 80.0, 50.0)
+    save_scores(session, second, 60.0, 100.0)
+
+    stats = next(iter_audio_stats(session))
+    assert (stats.scored_takes, stats.timing_score, stats.intonation_score) == (
+        2,
+        70.0,
+        75.0,
+    )
+    takes = session.execute(
+        select(RecordingModel.timing_score).order_by(RecordingModel.id)
+    ).scalars()
+    assert list(takes) == [80.0, 60.0]
+
+
+def test_save_scores_should_update_mean_of_segment(session):
+    first = add_recording(session, 1, 2.5, 5.0, "/r/1.wav", 2.5)
+    second = add_recording(session, 1, 2.5, 5.0, "/r/2.wav", 2.5)
+
+    save_scores(session, first, 80.0, 60.0)
+    save_scores(session, second, 40.0, 20.0)
+
+    (segment,) = list_segment_stats(session, 1)
+    assert (segment.start, segment.end) == (2.5, 5.0)
+    assert (segment.scored_takes, segment.score) == (2, 50.0)
+
+
+def test_segment_heatmap_should_spread_segments_over_bins(session):
+    session.execute(
+        insert(SegmentStatsModel),
+        [
+            {"audio_id": 1, "start": 0.0, "end": 15.0, "plays": 3, "dwell": 30},
+            {"audio_id": 1, "start": 15.0, "end": None, "plays": 1, "dwell": 10},
+            {"audio_id": 2, "start": 0.0, "end": None, "plays": 9, "dwell": 90},
+        ],
+    )
+
+    heatmap = segment_heatmap(session, 1, duration=40.0, bins=4)
+
+    assert [(b.start, b.end) for b in heatmap][0] == (0.0, 10.0)
+    assert [b.dwell for b in heatmap] == pytest.approx([20.0, 12.0, 4.0, 4.0])
+    assert [b.plays for b in heatmap] == pytest.approx([2.0, 1.2, 0.4, 0.4])
+
+
+def test_weakest_segments_should_order_scored_segments_by_score(session):
+    session.execute(
+        insert(SegmentStatsModel),
+        [
+            {"audio_id": 1, "start": 0.0, "score": 70.0},
+            {"audio_id": 1, "start": 5.0, "score": 30.0},
+            {"audio_id": 1, "start": 9.0, "plays": 20},
+            {"audio_id": 2, "start": 0.0, "score": 10.0},
+        ],
+    )
+
+    weakest = weakest_segments(session, limit=2)
+    assert [(s.audio_id, s.start) for s in weakest] == [(2, 0.0), (1, 5.0)]
+    assert [s.start for s in weakest_segments(session, audio_id=1)] == [5.0, 0.0]
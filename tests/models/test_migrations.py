@@ -0,0 +1,202 @@
+import pytest
+from sqlalchemy import create_engine, inspect, select
+
+from models.db_setup import Base
+from models.migrations import MIGRATIONS, init_db
+from models.models import AudioModel, ReviewModel, TimeStampModel
+from utils.file import file_digest
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_init_db_should_mark_fresh_database_as_migrated(engine):
+    init_db(engine)
+
+    with engine.connect() as connection:
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+    assert version == len(MIGRATIONS)
+
+
+def test_should_move_comma_joined_time_stamps_to_table(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE audio (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "file_path VARCHAR NOT NULL UNIQUE, time_stamp VARCHAR NOT NULL, "
+            "added DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, "
+            "duration INTEGER NOT NULL, spend_time INTEGER NOT NULL, "
+            "finished_times INTEGER NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO audio VALUES "
+            "(1, 'a.mp3', '/a.mp3', '0,1.5,3.25', CURRENT_TIMESTAMP, 10, 0, 0), "
+            "(2, 'b.mp3', '/b.mp3', '', CURRENT_TIMESTAMP, 10, 0, 0)"
+        )
+
+    init_db(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(TimeStampModel.audio_id, TimeStampModel.position).order_by(
+                TimeStampModel.position
+            )
+        ).all()
+        columns = {
+            column["name"] for column in inspect(connection).get_columns("audio")
+        }
+    assert rows == [(1, 0.0), (1, 1.5), (1, 3.25)]
+    assert "time_stamp" not in columns
+
+
+def test_should_create_audio_indexes_on_existing_table(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE audio (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "file_path VARCHAR NOT NULL UNIQUE, "
+            "added DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, "
+            "duration INTEGER NOT NULL, spend_time INTEGER NOT NULL, "
+            "finished_times INTEGER NOT NULL)"
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 1")
+
+    init_db(engine)
+
+    with engine.connect() as connection:
+        indexes = {index["name"] for index in inspect(connection).get_indexes("audio")}
+    assert {"ix_audio_name", "ix_audio_added_id"} <= indexes
+
+
+def test_should_add_digest_of_stored_audio(engine, tmp_path):
+    (tmp_path / "a.mp3").write_bytes(b"audio")
+    (tmp_path / "b.mp3").write_bytes(b"audio")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE audio (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "file_path VARCHAR NOT NULL UNIQUE, "
+            "added DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, "
+            "duration INTEGER NOT NULL, spend_time INTEGER NOT NULL, "
+            "finished_times INTEGER NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO audio VALUES "
+            f"(1, 'a.mp3', '{tmp_path / 'a.mp3'}', CURRENT_TIMESTAMP, 10, 0, 0), "
+            f"(2, 'b.mp3', '{tmp_path / 'b.mp3'}', CURRENT_TIMESTAMP, 10, 0, 0), "
+            "(3, 'c.mp3', '/missing/c.mp3', CURRENT_TIMESTAMP, 10, 0, 0)"
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 3")
+
+    init_db(engine)
+
+    with engine.connect() as connection:
+        digests = connection.execute(
+            select(AudioModel.id, AudioModel.digest).order_by(AudioModel.id)
+        ).all()
+        indexes = {index["name"] for index in inspect(connection).get_indexes("audio")}
+    assert digests == [(1, file_digest(tmp_path / "a.mp3")), (2, None), (3, None)]
+    assert "ix_audio_digest" in indexes
+
+
+def test_should_add_score_columns(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE audio (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "file_path VARCHAR NOT NULL UNIQUE, digest VARCHAR, transcript VARCHAR, "
+            "added DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, "
+            "duration INTEGER NOT NULL, spend_time INTEGER NOT NULL, "
+            "finished_times INTEGER NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "CREATE TABLE recording (id INTEGER PRIMARY KEY, audio_id INTEGER, "
+            "start FLOAT NOT NULL, end FLOAT, file_path VARCHAR NOT NULL UNIQUE, "
+            "duration FLOAT NOT NULL, "
+            "added DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO audio (id, name, file_path, duration, spend_time, "
+            "finished_times) VALUES (1, 'a.mp3', '/a.mp3', 10, 0, 0)"
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 4")
+
+    init_db(engine)
+
+    with engine.connect() as connection:
+        audio = connection.execute(
+            select(
+                AudioModel.scored_takes,
+                AudioModel.timing_score,
+                AudioModel.intonation_score,
+            )
+        ).one()
+        columns = {
+            column["name"] for column in inspect(connection).get_columns("recording")
+        }
+    assert tuple(audio) == (0, None, None)
+    assert {"timing_score", "intonation_score"} <= columns
+
+
+def test_should_schedule_existing_and_new_time_stamps(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            AudioModel.__table__.insert().values(id=1, name="a.mp3", file_path="/a")
+        )
+        connection.execute(
+            TimeStampModel.__table__.insert(),
+            [{"audio_id": 1, "position": p} for p in (0.0, 2.5)],
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 5")
+
+    init_db(engine)
+
+    with engine.begin() as connection:
+        connection.execute(
+            TimeStampModel.__table__.insert().values(audio_id=1, position=4.0)
+        )
+        connection.execute(
+            TimeStampModel.__table__.delete().where(TimeStampModel.position == 0.0)
+        )
+        starts = connection.execute(
+            select(ReviewModel.start).order_by(ReviewModel.start)
+        ).scalars()
+        assert list(starts) == [2.5, 4.0]
+
+
+def test_should_store_default_added_dates_with_microseconds(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO audio (name, file_path, duration, spend_time, finished_times)"
+            " VALUES ('a.mp3', '/a', 0, 0, 0)"
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 6")
+
+    init_db(engine)
+
+    with engine.connect() as connection:
+        added = connection.exec_driver_sql("SELECT added FROM audio").scalar()
+    assert len(added) == 26 and added.endswith(".000000")
+
+
+def test_should_add_audio_source_path(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE audio (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "file_path VARCHAR NOT NULL UNIQUE, digest VARCHAR, transcript VARCHAR, "
+            "added DATETIME NOT NULL, duration INTEGER NOT NULL, "
+            "spend_time INTEGER NOT NULL, finished_times INTEGER NOT NULL, "
+            "scored_takes INTEGER NOT NULL DEFAULT 0, timing_score FLOAT, "
+            "intonation_score FLOAT)"
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 7")
+
+    init_db(engine)
+
+    with engine.connect() as connection:
+        columns = {
+            column["name"] for column in inspect(connection).get_columns("audio")
+        }
+    assert "source_path" in columns
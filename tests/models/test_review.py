@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.migrations import init_db
+from models.models import AudioModel, ReviewModel, TimeStampModel
+from models.review import (
+    EASY,
+    FORGOTTEN,
+    GOOD,
+    ReviewState,
+    count_due,
+    due_segments,
+    grade_review,
+    sm2,
+)
+
+NOW = datetime(2026, 1, 1, 12)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    init_db(engine)
+    with Session(engine) as session:
+        session.execute(
+            insert(AudioModel),
+            [{"name": f"{i}.mp3", "file_path": f"/a/{i}.mp3"} for i in (1, 2)],
+        )
+        session.execute(
+            insert(TimeStampModel),
+            [
+                {"audio_id": 1, "position": 0.0},
+                {"audio_id": 1, "position": 2.5},
+                {"audio_id": 2, "position": 0.0},
+            ],
+        )
+        # the triggers schedule new segments for the current time
+        session.execute(update(ReviewModel).values(due=NOW - timedelta(minutes=1)))
+        yield session
+    engine.dispose()
+
+
+def test_sm2_should_grow_interval_of_recalled_segment():
+    state = ReviewState()
+    intervals = []
+    for _ in range(4):
+        state = sm2(state, GOOD)
+        intervals.append(state.interval)
+
+    assert intervals == [1.0, 6.0, 15.0, 38.0]
+    assert state.ease == 2.5
+
+
+def test_sm2_should_relearn_forgotten_segment():
+    state = sm2(ReviewState(interval=15.0, ease=2.5, repetitions=3), FORGOTTEN)
+
+    assert (state.interval, state.repetitions, state.lapses) == (1.0, 0, 1)
+    assert state.ease == pytest.approx(1.96)
+    assert sm2(ReviewState(ease=1.3), 0).ease == 1.3
+
+
+def test_sm2_should_reject_unknown_grade():
+    with pytest.raises(ValueError):
+        sm2(ReviewState(), 6)
+
+
+def test_new_segments_should_be_due_with_their_end(session):
+    due = due_segments(session, now=NOW)
+
+    assert [(s.audio_id, s.start, s.end) for s in due] == [
+        (1, 0.0, 2.5),
+        (1, 2.5, None),
+        (2, 0.0, None),
+    ]
+    assert due[0].file_path == "/a/1.mp3"
+    assert count_due(session, NOW) == 3
+
+
+def test_graded_segment_should_leave_queue_until_due(session):
+    first, *rest = due_segments(session, now=NOW)
+
+    due = grade_review(session, first.id, EASY, now=NOW)
+
+    assert due == NOW + timedelta(days=1)
+    assert [s.id for s in due_segments(session, now=NOW)] == [s.id for s in rest]
+    assert first.id in [s.id for s in due_segments(session, now=due)]
+    reviewed = session.scalar(
+        select(ReviewModel.last_reviewed).where(ReviewModel.id == first.id)
+    )
+    assert reviewed == NOW
+
+
+def test_due_segments_should_skip_excluded_and_missing(session):
+    ids = [s.id for s in due_segments(session, now=NOW)]
+    assert len(ids) == 3
+
+    assert [s.id for s in due_segments(session, 1, NOW, exclude=ids[:2])] == ids[2:]
+    assert grade_review(session, 999, GOOD) is None
@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy import create_engine, delete, insert, update
+from sqlalchemy.orm import Session
+
+from models.migrations import init_db
+from models.models import AudioModel
+from models.search import (
+    build_fuzzy_query,
+    build_match_query,
+    build_short_term_filter,
+    search_audio,
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    init_db(engine)
+    with Session(engine) as session:
+        session.execute(
+            insert(AudioModel),
+            [
+                {"id": 1, "name": "Shadowing lesson 1.mp3", "file_path": "/a/1.mp3"},
+                {"id": 2, "name": "Podcast.mp3", "file_path": "/a/2.mp3"},
+                {
+                    "id": 3,
+                    "name": "Interview.mp3",
+                    "file_path": "/a/3.mp3",
+                    "transcript": "a short lesson about shadowing",
+                },
+            ],
+        )
+        yield session
+    engine.dispose()
+
+
+def _ids(results):
+    return [summary.id for summary in results]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("", None),
+        ("ab", None),
+        ('ab les"s', '"les""s"'),
+        ("one two", '"one" AND "two"'),
+    ],
+)
+def test_build_match_query(query, expected):
+    assert build_match_query(query) == expected
+
+
+def test_build_fuzzy_query_should_join_unique_trigrams():
+    assert build_fuzzy_query("Abab") == '"aba" OR "bab"'
+
+
+def test_should_rank_name_matches_above_transcript_matches(session):
+    assert _ids(search_audio(session, "lesson")) == [1, 3]
+
+
+def test_should_match_part_of_word_in_file_path(session):
+    assert _ids(search_audio(session, "a/2.")) == [2]
+
+
+def test_should_fall_back_to_fuzzy_match_for_typos(session):
+    assert _ids(search_audio(session, "podcst"))[0] == 2
+
+
+def test_short_terms_should_filter_matches(session):
+    assert _ids(search_audio(session, "lesson 1")) == [1]
+    assert _ids(search_audio(session, "lesson 9")) == []
+
+
+def test_build_short_term_filter_should_escape_like_wildcards():
+    condition, params = build_short_term_filter("lesson 5% a_")
+
+    assert params == {"short_0": "%5\\%%", "short_1": "%a\\_%"}
+    assert condition.count(" AND (") == 2
+
+
+def test_best_match_should_be_found_among_many_matches(session):
+    session.execute(
+        insert(AudioModel),
+        [
+            {"name": f"{i}.mp3", "file_path": f"/b/{i}.mp3", "transcript": "lesson"}
+            for i in range(2000)
+        ],
+    )
+    session.execute(
+        insert(AudioModel).values(id=9999, name="Lesson 2.mp3", file_path="/c.mp3")
+    )
+
+    assert set(_ids(search_audio(session, "lesson", limit=2))) == {1, 9999}
+
+
+def test_should_rank_only_newest_matches(session, monkeypatch):
+    monkeypatch.setattr("models.search.MAX_RANKED_MATCHES", 2)
+    session.execute(
+        insert(AudioModel),
+        [
+            {"id": i, "name": f"{i}.mp3", "file_path": f"/b/{i}.mp3", "transcript": "x"}
+            for i in range(10, 15)
+        ],
+    )
+
+    assert set(_ids(search_audio(session, "mp3 x"))) == {13, 14}
+
+
+def test_should_use_like_for_short_queries(session):
+    assert _ids(search_audio(session, "iN")) == [3, 1]
+
+
+def test_index_should_follow_updates_and_deletes(session):
+    session.execute(update(AudioModel).where(AudioModel.id == 2).values(name="Talk"))
+    assert _ids(search_audio(session, "talk")) == [2]
+    assert _ids(search_audio(session, "podcast")) == []
+
+    session.execute(delete(AudioModel).where(AudioModel.id == 1))
+    assert _ids(search_audio(session, "lesson")) == [3]
@@ -1,24 +1,121 @@
+from datetime import datetime
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
 
+from models.db_setup import Base
+from models.models import AudioModel, SegmentStatsModel, TimeStampModel
 from models.session_manager import AudioSession
 
 
-@pytest.mark.parametrize(
-    "audio_session, audio_session_other, excpected",
-    [
-        (
-            AudioSession(1, "Session 1", Path("/old/path"), [0.1, 0.2], 120, 30, 5),
-            AudioSession(
-                1, "Session 1", Path("/new/path"), [0.1, 0.2, 0.3], 120, 35, 5
-            ),
-            {"file_path": "/new/path", "time_stamp": "0.1,0.2,0.3", "spend_time": 35},
+@pytest.fixture
+def audio_session():
+    return AudioSession(1, "Session 1", Path("/old/path"), [0.1, 0.2], 120, 30, 5)
+
+
+def test_new_session_should_not_have_changes(audio_session):
+    assert not audio_session.has_changes
+    assert not audio_session.pop_changes()
+
+
+def test_should_record_only_changed_fields(audio_session):
+    audio_session.file_path = Path("/new/path")
+    audio_session.spend_time += 5
+    audio_session.duration = 120
+
+    changes = audio_session.pop_changes()
+
+    assert changes.fields == {"file_path": "/new/path", "spend_time": 35}
+    assert not audio_session.has_changes
+
+
+def test_added_and_removed_time_stamp_should_cancel_out(audio_session):
+    audio_session.track_time_stamp_added(0.3)
+    audio_session.track_time_stamp_removed(0.3)
+    audio_session.track_time_stamp_removed(0.1)
+
+    changes = audio_session.pop_changes()
+
+    assert changes.added_time_stamps == set()
+    assert changes.removed_time_stamps == {0.1}
+
+
+def test_apply_should_write_only_the_journal(audio_session):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add(AudioModel(id=1, name="Session 1", file_path="/old/path"))
+        session.add_all(
+            [TimeStampModel(audio_id=1, position=p) for p in audio_session.time_stamp]
         )
-    ],
-)
-def test_diff_should_return_dict_with_diffrent(
-    audio_session, audio_session_other, excpected
-):
-    diff = audio_session.diff(audio_session_other)
-    assert diff == excpected
+        session.commit()
+
+        audio_session.spend_time = 40
+        audio_session.track_time_stamp_added(0.3)
+        audio_session.track_time_stamp_removed(0.1)
+        audio_session.pop_changes().apply(session)
+        session.commit()
+
+        positions = session.scalars(
+            select(TimeStampModel.position).order_by(TimeStampModel.position)
+        ).all()
+        assert positions == [0.2, 0.3]
+        assert session.get(AudioModel, 1).spend_time == 40
+
+
+def test_segment_practice_should_be_batched(audio_session):
+    audio_session.track_segment_practice(0.1, 0.2, plays=1)
+    audio_session.track_segment_practice(0.1, 0.2, dwell=3)
+    audio_session.track_segment_practice(0.2, None, plays=1, dwell=1)
+    changes = audio_session.pop_changes()
+    audio_session.track_segment_practice(0.1, 0.25, dwell=2)
+
+    changes.merge(audio_session.pop_changes())
+
+    first = changes.segments[0.1]
+    assert (first.end, first.plays, first.dwell) == (0.25, 1, 5)
+    assert changes.segments[0.2].plays == 1
+
+
+def test_apply_should_add_segment_practice_to_stored_counters(audio_session):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add(AudioModel(id=1, name="Session 1", file_path="/old/path"))
+        session.add(SegmentStatsModel(audio_id=1, start=0.1, plays=4, dwell=10))
+        session.commit()
+
+        practiced = datetime(2025, 1, 1, 12)
+        with patch("models.session_manager.utc_now", return_value=practiced):
+            audio_session.track_segment_practice(0.1, 0.2, plays=1, dwell=3)
+            audio_session.track_segment_practice(0.2, None, dwell=2)
+        audio_session.pop_changes().apply(session)
+        session.commit()
+
+        rows = session.execute(
+            select(
+                SegmentStatsModel.start,
+                SegmentStatsModel.end,
+                SegmentStatsModel.plays,
+                SegmentStatsModel.dwell,
+            ).order_by(SegmentStatsModel.start)
+        ).all()
+        assert rows == [(0.1, 0.2, 5, 13), (0.2, None, 0, 2)]
+        # stored in UTC, like the other dates
+        assert session.get(SegmentStatsModel, 1).last_practiced == practiced
+
+
+def test_parse_data_should_sort_time_stamps():
+    data = {
+        "id": 1,
+        "name": "a.mp3",
+        "file_path": "/a.mp3",
+        "time_stamp": [2.0, 1.0],
+        "duration": 0,
+        "spend_time": 0,
+        "finished_times": 0,
+    }
+    assert AudioSession.parse_data(data).time_stamp == [1.0, 2.0]
@@ -0,0 +1,111 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from models.db_setup import Base
+from models.models import AudioModel, TimeStampModel
+from models.session_manager import AudioSession
+from models.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory.begin() as session:
+        session.add(AudioModel(id=1, name="a.mp3", file_path="/a.mp3"))
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def audio_session():
+    return AudioSession(1, "a.mp3", Path("/a.mp3"), [], 0, 0, 0)
+
+
+def _positions(session_factory):
+    with session_factory() as session:
+        return session.scalars(
+            select(TimeStampModel.position).order_by(TimeStampModel.position)
+        ).all()
+
+
+def test_submit_should_not_write_until_flush(session_factory, audio_session):
+    queue = WriteBehindQueue(session_factory.begin)
+    audio_session.spend_time = 10
+    queue.submit(audio_session.pop_changes())
+
+    with session_factory() as session:
+        assert session.get(AudioModel, 1).spend_time == 0
+    assert queue.flush()
+    with session_factory() as session:
+        assert session.get(AudioModel, 1).spend_time == 10
+
+
+def test_should_coalesce_changes_of_the_same_audio(session_factory, audio_session):
+    queue = WriteBehindQueue(session_factory.begin)
+    for position in (1.0, 2.0, 3.0):
+        audio_session.spend_time += 1
+        audio_session.track_time_stamp_added(position)
+        queue.submit(audio_session.pop_changes())
+    audio_session.track_time_stamp_removed(2.0)
+    queue.submit(audio_session.pop_changes())
+
+    queue.flush()
+
+    assert _positions(session_factory) == [1.0, 3.0]
+    with session_factory() as session:
+        assert session.get(AudioModel, 1).spend_time == 3
+
+
+def test_worker_thread_should_write_changes_on_stop(session_factory, audio_session):
+    queue = WriteBehindQueue(session_factory.begin, interval=60)
+    queue.start()
+    audio_session.track_time_stamp_added(5.0)
+    queue.submit(audio_session.pop_changes())
+
+    assert queue.flush(timeout=5)
+    audio_session.track_time_stamp_added(6.0)
+    queue.submit(audio_session.pop_changes())
+    queue.stop()
+
+    assert not queue.is_running
+    assert _positions(session_factory) == [5.0, 6.0]
+
+
+def test_failed_flush_should_keep_changes(session_factory, audio_session):
+    def broken_session():
+        raise OSError("disk is full")
+
+    queue = WriteBehindQueue(broken_session)
+    audio_session.finished_times = 1
+    queue.submit(audio_session.pop_changes())
+
+    assert not queue.flush()
+
+    queue._session_factory = session_factory.begin
+    assert queue.flush()
+    with session_factory() as session:
+        assert session.get(AudioModel, 1).finished_times == 1
+
+
+def test_changes_which_cant_be_saved_should_not_block_others(
+    session_factory, audio_session
+):
+    queue = WriteBehindQueue(session_factory.begin)
+    broken = MagicMock(audio_id=2)
+    broken.apply.side_effect = IntegrityError("INSERT", {}, Exception("UNIQUE"))
+    queue.submit(broken)
+    audio_session.finished_times = 1
+    queue.submit(audio_session.pop_changes())
+
+    assert queue.flush()
+
+    assert not queue.has_pending()
+    with session_factory() as session:
+        assert session.get(AudioModel, 1).finished_times == 1
@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models.library import add_recording, save_scores
+from shadowing.cli import main
+
+ROOT = Path(__file__).parent.parent.parent
+
+
+@pytest.fixture
+def database(tmp_path):
+    return f"sqlite:///{tmp_path / 'library.db'}"
+
+
+@pytest.fixture
+def library(make_wav, tmp_path, tmp_path_factory, database):
+    """Library with two audios, the first one with a pause in the middle."""
+    sample_rate = 16000  # the segmentation rate, so no resampling is needed
+    speech = np.sin(np.arange(sample_rate * 2) / 3) * 0.5
+    lesson = np.concatenate((speech, np.zeros(sample_rate), speech))
+    make_wav(lesson, sample_rate, name="lesson.wav")
+    make_wav(speech * 0.5, sample_rate, name="podcast.wav")
+    store = tmp_path_factory.mktemp("store")
+    main(["--database", database, "import", str(tmp_path), "--store", str(store)])
+    return database
+
+
+def _run(capsys, *args):
+    code = main(list(args))
+    return code, capsys.readouterr().out.splitlines()
+
+
+def test_import_should_report_imported_and_skipped(library, capsys, tmp_path):
+    code, out = _run(capsys, "--database", library, "import", str(tmp_path))
+    assert code == 0
+    assert out == ["imported 0, skipped 2, failed 0"]
+
+
+def test_list_should_print_every_audio(library, capsys):
+    code, out = _run(capsys, "--database", library, "list")
+    assert code == 0
+    assert [line.split("\t")[2] for line in out] == ["lesson.wav", "podcast.wav"]
+
+
+def test_search_should_fail_without_results(library, capsys):
+    assert _run(capsys, "--database", library, "search", "lesson")[0] == 0
+    assert _run(capsys, "--database", library, "search", "nothing")[0] == 1
+
+
+def test_segment_should_add_time_stamps_once(library, capsys):
+    code, out = _run(capsys, "--database", library, "segment", "--workers", "1")
+    assert code == 0
+    assert out == ["1\t1", "2\t0"]
+
+    # the audio with time stamps isn't segmented again unless it's asked for
+    assert _run(capsys, "--database", library, "segment", "--workers", "1")[1] == [
+        "2\t0"
+    ]
+    assert _run(capsys, "--database", library, "segment", "1")[1] == ["1\t0"]
+
+
+def test_export_stats_should_write_csv_and_jsonl(library, capsys, tmp_path):
+    _run(capsys, "--database", library, "segment", "1", "--workers", "1")
+    output = tmp_path / "stats.jsonl"
+
+    code, out = _run(capsys, "--database", library, "export-stats")
+    main(
+        ["--database", library, "export-stats", "--format", "jsonl", "-o", str(output)]
+    )
+
+    rows = list(csv.DictReader(io.StringIO("\n".join(out))))
+    assert code == 0
+    assert [(row["name"], row["duration"], row["time_stamps"]) for row in rows] == [
+        ("lesson.wav", "5", "1"),
+        ("podcast.wav", "2", "0"),
+    ]
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["time_stamps"] for record in records] == [1, 0]
+
+
+def test_weakest_should_print_lowest_scored_segments(library, capsys):
+    engine = create_engine(library)
+    with Session(engine) as session:
+        for audio_id, start, score in ((1, 0.0, 90.0), (1, 3.0, 40.0), (2, 0.0, 60.0)):
+            recording_id = add_recording(
+                session, audio_id, start, None, f"/r/{audio_id}-{start}.wav", 2.0
+            )
+            save_scores(session, recording_id, score, score)
+        session.commit()
+    engine.dispose()
+
+    code, out = _run(capsys, "--database", library, "weakest", "--limit", "2")
+    assert code == 0
+    assert out == ["1\t3.00\tend\t40.0\t0\t0", "2\t0.00\tend\t60.0\t0\t0"]
+
+
+def test_vacuum(library, capsys):
+    code, out = _run(capsys, "--database", library, "vacuum")
+    assert code == 0
+    assert out[0].endswith("bytes")
+
+
+def test_should_not_import_kivy(database):
+    script = (
+        "import sys\n"
+        "from shadowing.cli import main\n"
+        f"main(['--database', {database!r}, 'list'])\n"
+        "print(sorted(name for name in sys.modules if name.startswith('kivy')))\n"
+    )
+    result = subprocess.run(  # nosec B603
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
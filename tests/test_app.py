@@ -1,6 +1,7 @@
 import pytest
+from kivy.animation import Animation
 
-from main import ShadowApp
+from main import LAZY_SCREENS, ShadowApp
 
 
 class TestApp:
@@ -8,11 +9,16 @@ class TestApp:
         self.app = ShadowApp()
         self.gui = self.app.build()
 
+    def teardown_method(self):
+        # a transition left running would enter the screen in a later test
+        Animation.cancel_all(self.gui.transition)
+        self.app.on_stop()
+
     def test_gui_exists(self):
         assert self.gui is not None
 
-    def test_app_should_have_4_screens(self):
-        assert len(self.gui.screens) == 4
+    def test_app_should_build_only_main_screen(self):
+        assert self.gui.screen_names == ["main_screen"]
 
     def test_current_screen_should_be_main_screen(self):
         assert self.gui.current == "main_screen"
@@ -22,4 +28,13 @@ class TestApp:
         ["main_screen", "file_chooser_screen", "read_file_screen", "play_audio_screen"],
     )
     def test_app_should_have_screen(self, screen_name):
-        assert screen_name in [s.name for s in self.gui.screens]
+        assert self.gui.has_screen(screen_name)
+        assert screen_name in self.gui.registered_names
+
+    @pytest.mark.parametrize("screen_name", list(LAZY_SCREENS))
+    def test_screen_should_be_created_on_first_navigation(self, screen_name):
+        self.gui.current = screen_name
+
+        assert self.gui.current_screen.name == screen_name
+        assert self.app.WRITE_BEHIND is not None
+        assert len(self.gui.screens) == 2
@@ -0,0 +1,25 @@
+"""
+Cold start of the app. Only what is loaded before the first frame is checked,
+the timings depend on the machine and are measured by
+`benchmarks/bench_startup.py`.
+"""
+import pytest
+
+from benchmarks.bench_startup import measure_startup
+
+# loaded by the screens which are built after the first frame
+DEFERRED_MODULES = ("numpy", "utils.pcm", "utils.audio", "utils.scoring")
+
+
+@pytest.fixture(scope="module")
+def startup():
+    return measure_startup()
+
+
+def test_only_main_screen_should_be_loaded_before_first_frame(startup):
+    screens = [name for name in startup["modules"] if name.startswith("ui.screens.")]
+    assert screens == ["ui.screens.app_screen", "ui.screens.main_screen"]
+
+
+def test_audio_processing_should_not_be_loaded_before_first_frame(startup):
+    assert not set(DEFERRED_MODULES) & set(startup["modules"])
@@ -1,6 +1,9 @@
 import unittest
+from concurrent.futures import Future
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
+from kivy.clock import Clock
 from kivy.uix.button import Button
 from kivy.uix.filechooser import FileChooserIconView
 from kivy.uix.label import Label
@@ -49,3 +52,28 @@ class TestFileChooser(unittest.TestCase):
     def test_choose_button_should_be_disabled(self):
         """Verify the choose button is disabled by default"""
         self.assertTrue(self.file_chooser.ids.choose_button.disabled)
+
+    @patch("kivy.app.App.get_running_app")
+    @patch("ui.screens.file_chooser.IMPORT_EXECUTOR")
+    def test_choose_should_store_file_in_background(self, executor, mock_app):
+        future = Future()
+        executor.submit.return_value = future
+        self.file_chooser.ids.file_chooser.selection = ["/audio/a.mp3"]
+        self.file_chooser.manager = MagicMock()
+        self.file_chooser.open_stored_audio = MagicMock()
+
+        self.file_chooser.choose()
+
+        executor.submit.assert_called_once_with(
+            self.file_chooser.store_audio_file, Path("/audio/a.mp3")
+        )
+        self.assertTrue(self.file_chooser.ids.choose_button.disabled)
+
+        future.set_result(("abc", Path("/store/abc.mp3")))
+        Clock.tick()
+
+        self.file_chooser.open_stored_audio.assert_called_once_with(
+            Path("/audio/a.mp3"), "abc", Path("/store/abc.mp3")
+        )
+        self.assertEqual(self.file_chooser.manager.current, "main_screen")
+        self.assertFalse(self.file_chooser.ids.choose_button.disabled)
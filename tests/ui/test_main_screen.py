@@ -91,6 +91,15 @@ class TestMainScreen(unittest.TestCase):
             "When you choose the file, the button start will be enabled",
         )
 
+    @patch("kivy.app.App.get_running_app")
+    def test_review_should_open_player_in_review_mode(self, mock_app):
+        mock_app.return_value = MagicMock(REVIEW_MODE=False)
+        with patch.object(MainScreen, "manager", MagicMock()) as manager:
+            self.main_screen.review()
+
+        self.assertTrue(mock_app.return_value.REVIEW_MODE)
+        self.assertEqual(manager.current, "play_audio_screen")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import delete, insert
+
+from models.migrations import init_db
+from models.models import AudioModel
+from models.session_manager import DataBaseSessionManager
+from models.write_behind import WriteBehindQueue
+from ui.screens.manager_screen import ManagerScreen
+from utils.file import store_file
+
+
+@pytest.fixture
+def manager_screen():
+    init_db()
+    app = MagicMock(
+        AUDIO_SESSION=None, WRITE_BEHIND=WriteBehindQueue(), LIBRARY_REVISION=0
+    )
+    with patch("kivy.app.App.get_running_app", return_value=app):
+        yield ManagerScreen(name="manager_screen")
+    with DataBaseSessionManager() as session:
+        session.execute(delete(AudioModel))
+
+
+@pytest.fixture
+def library(manager_screen):
+    added = datetime(2025, 1, 1)
+    with DataBaseSessionManager() as session:
+        session.execute(
+            insert(AudioModel),
+            [
+                {
+                    "name": f"{i}.mp3",
+                    "file_path": f"/audio/{i}.mp3",
+                    # two audios added at the same time on every page boundary
+                    "added": added + timedelta(minutes=i // 2),
+                }
+                for i in range(7)
+            ],
+        )
+
+
+def test_list_audio_page_should_return_whole_library_in_pages(manager_screen, library):
+    names, page = [], manager_screen.list_audio_page(limit=3)
+    while page:
+        assert len(page) <= 3
+        names.extend(summary.name for summary in page)
+        page = manager_screen.list_audio_page(after=page[-1], limit=3)
+
+    assert names == [f"{i}.mp3" for i in range(7)]
+
+
+def test_created_audio_can_be_found_by_name_and_id(manager_screen):
+    created = manager_screen.create_audio(Path("/audio/new.mp3"))
+
+    assert manager_screen.find_audio("new.mp3") == created
+    assert manager_screen.get_audio(created.id) == created
+    assert manager_screen.find_audio("missing.mp3") is None
+
+
+def test_update_audio_session_should_save_time_stamps(manager_screen):
+    audio_session = manager_screen.create_audio(Path("/audio/new.mp3"))
+    audio_session.time_stamp.append(1.5)
+    audio_session.track_time_stamp_added(1.5)
+    audio_session.spend_time = 3
+
+    manager_screen.update_audio_session(audio_session)
+
+    saved = manager_screen.get_audio(audio_session.id)
+    assert saved.time_stamp == [1.5]
+    assert saved.spend_time == 3
+
+
+def test_create_audio_should_change_library_revision(manager_screen):
+    revision = manager_screen.library_revision
+
+    manager_screen.create_audio(Path("/audio/new.mp3"))
+
+    assert manager_screen.library_revision != revision
+
+
+def test_get_or_create_audio_should_recognise_audio_by_content(
+    manager_screen, tmp_path
+):
+    (tmp_path / "a.mp3").write_bytes(b"audio")
+    (tmp_path / "renamed.mp3").write_bytes(b"audio")
+    store = tmp_path / "store"
+
+    with patch("utils.file.DEFAULT_AUDIO_KEEPER", store), patch(
+        "ui.screens.manager_screen.store_file",
+        side_effect=lambda path, digest: store_file(path, to=store, digest=digest),
+    ), patch("ui.screens.manager_screen.message_box_info") as message_box:
+        created = manager_screen.get_or_create_audio(tmp_path / "a.mp3")
+        found = manager_screen.get_or_create_audio(tmp_path / "renamed.mp3")
+
+    assert found == created
+    assert created.name == "a.mp3"
+    with DataBaseSessionManager() as session:
+        source = session.get(AudioModel, created.id).source_path
+    assert source == f"{tmp_path.name}/a.mp3"
+    assert created.file_path.parent == store
+    assert len(list(store.iterdir())) == 1
+    message_box.assert_called_once()
@@ -1,11 +1,28 @@
+import shutil
+import tempfile
 import unittest
+import wave
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, call, patch
 
 import pytest
+from kivy.clock import Clock
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.slider import Slider
 
+from models.review import GOOD, HARD, DueSegment
+from models.session_manager import AudioSession
 from ui.screens.play_audio_screen import PlayAudioScreen
+from utils.audio import TimeStampManager
+from utils.enums import KeyboardEnum
+from utils.player_pool import PlayerPool
+from utils.recorder import Recorder, Take, WavFileSource
+from utils.scoring import Scores, score_take
+from utils.waveform import load_peaks
 
 
 # @pytest.mark.usefixtures("play_audio_screen")
@@ -114,3 +131,505 @@ class TestPlayAudioScreen(unittest.TestCase):
     #     self.play_audio_screen.update_progress_bar(0.1)
     #     self.assertEqual(self.play_audio_screen.ids["progress_bar"].value, 5)
     #     self.assertEqual(self.play_audio_screen.ids["current_time"].text, "00:05")
+
+
+class TestSegmentControl(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.audio_player = MagicMock(rate=1.0, sound_end=None)
+        self.screen.audio_player.sound.state = "play"
+        self.screen.time_stamp = MagicMock(time_stamp_list=[0, 5, 10])
+        self.screen.time_stamp.range.return_value = (5, 10)
+        self.screen.timer_guard()
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_schedule_segment_end_should_arm_single_timer(self, clock):
+        self.screen.schedule_segment_end(7.5)
+
+        clock.schedule_once.assert_called_once()
+        self.assertEqual(clock.schedule_once.call_args.args[1], 2.5)
+        clock.schedule_interval.assert_not_called()
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_schedule_segment_end_should_cancel_previous_timer(self, clock):
+        self.screen.schedule_segment_end(5)
+        first = self.screen.time_stamp_control
+
+        self.screen.schedule_segment_end(6)
+
+        first.cancel.assert_called_once()
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_control_time_should_rearm_when_fired_early(self, clock):
+        self.screen.audio_player.get_position.return_value = 9.9
+
+        self.screen.control_time(10, 0)
+
+        self.assertAlmostEqual(clock.schedule_once.call_args.args[1], 0.1)
+        self.screen.audio_player.pause.assert_not_called()
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_control_time_should_pause_at_segment_end(self, clock):
+        self.screen.audio_player.get_position.return_value = 10
+        self.screen.time_stamp.range.return_value = (10, None)
+
+        self.screen.control_time(10, 0)
+
+        self.screen.audio_player.pause.assert_called_once()
+        clock.schedule_once.assert_not_called()
+        self.assertEqual(self.screen.audio_player.current_position, 10)
+        self.assertIsNone(self.screen.segment_end)
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_control_time_should_do_nothing_when_paused(self, clock):
+        self.screen.audio_player.is_playing = False
+        self.screen.create_playback_clock()
+
+        self.screen.control_time(10, 0)
+
+        clock.schedule_once.assert_not_called()
+        self.screen.audio_player.pause.assert_not_called()
+
+
+class TestAutoSegment(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.get_audio_file = MagicMock(return_value=Path("/audio/a.mp3"))
+
+    @patch("ui.screens.play_audio_screen.message_box_info")
+    @patch("ui.screens.play_audio_screen.SEGMENTATION_EXECUTOR")
+    def test_broken_process_pool_should_be_reported(self, executor, message_box):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        executor.submit.return_value = future
+
+        self.screen.auto_segment()
+        Clock.tick()
+
+        message_box.assert_called_once()
+        self.assertFalse(self.screen.ids.auto_segment_button.disabled)
+
+        # the pool replaces the dead worker, so the next segmentation works
+        future = Future()
+        future.set_result([2.5])
+        executor.submit.return_value = future
+        self.screen.time_stamp = MagicMock()
+        self.screen.time_stamp.add_time_stamps.return_value = 1
+        self.screen.auto_segment()
+        Clock.tick()
+
+        self.screen.time_stamp.add_time_stamps.assert_called_once_with([2.5])
+        self.assertEqual(message_box.call_args.args[0], "Added 1 time stamps.")
+
+
+class TestPlaybackTick(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.audio_player = MagicMock(sound_length=60)
+        self.screen.current_audio_session = MagicMock(spend_time=0)
+        self.screen.create_playback_clock()
+
+    def test_label_should_change_only_with_displayed_second(self):
+        label = self.screen.ids.current_time
+        texts = []
+        label.bind(text=lambda _, text: texts.append(text))
+
+        for position in (1.0, 1.1, 1.9, 2.0, 2.5):
+            self.screen.audio_player.get_position.return_value = position
+            self.screen.on_playback_tick(0.1)
+
+        self.assertEqual(texts, ["00:01", "00:02"])
+        self.assertEqual(self.screen.ids.progress_bar.value, 2.5)
+
+
+class TestSegmentPractice(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.current_audio_session = AudioSession(
+            1, "a.mp3", Path("/audio/a.mp3"), [0.0, 4.0, 9.0], 0, 0, 0
+        )
+        self.screen.time_stamp = TimeStampManager(self.screen.current_audio_session)
+        self.screen.time_stamp.time_stamp_index = 1
+        self.screen.audio_player = MagicMock(current_position=4.0)
+        self.screen.timer_guard()
+        self.screen.current_audio_session.pop_changes()
+
+    def test_play_from_segment_start_should_count_play(self):
+        self.screen.count_segment_play()
+        self.screen.audio_player.current_position = 6.0  # resumed after pause
+        self.screen.count_segment_play()
+
+        segment = self.screen.current_audio_session.pop_changes().segments[4.0]
+        self.assertEqual((segment.end, segment.plays, segment.dwell), (9.0, 1, 0))
+
+    def test_played_seconds_should_count_for_current_segment(self):
+        self.screen.playback_clock = MagicMock()
+        self.screen.playback_clock.take_played_seconds.return_value = 2
+
+        self.screen.count_duration()
+
+        self.assertEqual(self.screen.current_audio_session.spend_time, 2)
+        changes = self.screen.current_audio_session.pop_changes()
+        self.assertEqual(changes.segments[4.0].dwell, 2)
+
+
+class TestSpeed(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.current_audio_session = AudioSession(
+            1, "a.mp3", Path("/audio/a.mp3"), [0.0, 4.0, 9.0], 0, 0, 0
+        )
+        self.screen.time_stamp = TimeStampManager(self.screen.current_audio_session)
+        self.screen.time_stamp.time_stamp_index = 1
+        player = MagicMock(
+            sound_length=20,
+            current_position=4.0,
+            is_looping=False,
+            is_segment=False,
+            is_playing=False,
+            rate=1.0,
+            sound_end=None,
+        )
+
+        def use_segment(start, end, wav_path, rate, position):
+            player.is_segment, player.rate, player.sound_end = True, rate, end
+            player.current_position = position
+
+        def stop_segment():
+            player.is_segment, player.rate, player.sound_end = False, 1.0, None
+            player.current_position = player.get_position.return_value
+
+        player.use_segment.side_effect = use_segment
+        player.stop_segment.side_effect = stop_segment
+        player.get_position.return_value = 4.0
+        self.screen.audio_player = player
+        self.screen.create_playback_clock()
+        self.screen.timer_guard()
+        self.segment = Future()
+        self.segment.set_result(Path("/pcm/segment.wav"))
+        patcher = patch("ui.screens.play_audio_screen.PCM_EXECUTOR")
+        self.executor = patcher.start()
+        self.executor.submit.return_value = self.segment
+        self.addCleanup(patcher.stop)
+
+    def test_speed_should_change_in_steps_within_limits(self):
+        for _ in range(5):
+            self.screen.on_key_press(None, KeyboardEnum.MINUS)
+        self.assertEqual(self.screen.speed, 0.5)
+
+        self.screen.change_speed(1)
+        self.assertEqual(self.screen.speed, 0.75)
+        self.executor.submit.assert_not_called()  # nothing plays
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_play_slower_should_play_stretched_segment(self, clock):
+        self.screen.speed = 0.5
+
+        self.screen.play()
+        Clock.tick()
+
+        player = self.screen.audio_player
+        self.executor.submit.assert_called_once_with(
+            player.pcm_cache.segment, 4.0, 9.0, 0.5
+        )
+        player.use_segment.assert_called_once_with(
+            4.0, 9.0, Path("/pcm/segment.wav"), 0.5, position=4.0
+        )
+        player.play.assert_called_once()
+        # five seconds of the segment play in ten
+        self.assertEqual(clock.schedule_once.call_args.args[1], 10)
+
+    @patch("ui.screens.extensions.play_audio_extensiosn.Clock")
+    def test_last_segment_should_be_stretched_in_parts(self, clock):
+        player = self.screen.audio_player
+        player.sound_length = 100
+        player.current_position = 9.0
+        self.screen.time_stamp.time_stamp_index = 2
+        self.screen.timer_guard()
+        self.screen.speed = 0.5
+
+        self.screen.play()
+        Clock.tick()
+
+        segment = player.pcm_cache.segment
+        self.assertEqual(
+            self.executor.submit.call_args_list,
+            [call(segment, 9.0, 29.0, 0.5), call(segment, 29.0, 49.0, 0.5)],
+        )
+        self.assertEqual(clock.schedule_once.call_args.args[1], 40)
+
+        player.is_playing = True
+        player.get_position.return_value = 29.0
+        self.screen.control_time(29.0, 0)
+        Clock.tick()
+
+        self.assertEqual(
+            self.executor.submit.call_args_list[2], call(segment, 29.0, 49.0, 0.5)
+        )
+        player.use_segment.assert_called_with(
+            29.0, 49.0, Path("/pcm/segment.wav"), 0.5, position=29.0
+        )
+        player.pause.assert_not_called()
+
+    def test_play_at_normal_speed_should_play_the_file(self):
+        self.screen.play()
+
+        self.executor.submit.assert_not_called()
+        self.screen.audio_player.play.assert_called_once()
+
+
+class TestSoundLoading(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.current_audio_session = AudioSession(
+            1, "a.mp3", Path("/audio/a.mp3"), [0.0, 4.0], 0, 0, 0
+        )
+        self.future = Future()
+        patcher = patch(
+            "utils.player_pool.AudioPlayer.load_async", return_value=self.future
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pool_patcher = patch.object(
+            PlayAudioScreen, "player_pool", PlayerPool(), create=True
+        )
+        pool_patcher.start()
+        self.addCleanup(pool_patcher.stop)
+        self.player = MagicMock(
+            sound_length=10, is_looping=False, is_segment=False, rate=1.0
+        )
+
+    def test_load_sound_should_show_loading_state_without_waiting(self):
+        future = self.screen.load_sound(Path("/audio/a.mp3"))
+
+        self.assertIs(future, self.future)
+        self.assertTrue(self.screen.is_loading)
+        self.assertIsNone(self.screen.audio_player)
+        self.assertTrue(self.screen.ids.play_button.disabled)
+
+    def test_loaded_sound_should_start_at_current_time_stamp(self):
+        self.screen.load_sound(Path("/audio/a.mp3"))
+
+        self.future.set_result(self.player)
+        Clock.tick()
+
+        self.assertIs(self.screen.audio_player, self.player)
+        self.assertEqual(self.player.current_position, 4.0)
+        self.assertFalse(self.screen.is_loading)
+        self.assertFalse(self.screen.ids.play_button.disabled)
+        self.assertEqual(self.screen.ids.total_time.text, "00:10")
+
+    def test_cancel_loading_should_unload_sound_which_was_loading(self):
+        self.screen.load_sound(Path("/audio/a.mp3"))
+        self.future.set_running_or_notify_cancel()
+
+        self.screen.cancel_loading()
+        self.future.set_result(self.player)
+        Clock.tick()
+
+        self.player.cleanup.assert_called_once()
+        self.assertIsNone(self.screen.audio_player)
+        self.assertFalse(self.screen.is_loading)
+
+    @patch("ui.screens.play_audio_screen.WAVEFORM_EXECUTOR")
+    def test_waveform_should_be_loaded_by_stored_digest(self, executor):
+        self.screen.current_audio_session.digest = "abc"
+
+        self.screen.load_waveform(Path("/audio/a.mp3"))
+
+        executor.submit.assert_called_once_with(load_peaks, Path("/audio/a.mp3"), "abc")
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.screen.current_audio_session = AudioSession(
+            7, "a.wav", Path("/audio/a.wav"), [0.0, 0.5], 0, 0, 0, digest="abc"
+        )
+        self.screen.time_stamp = TimeStampManager(self.screen.current_audio_session)
+        self.screen.time_stamp.time_stamp_index = 0
+        self.screen.audio_player = MagicMock(
+            sound_length=2,
+            current_position=0.0,
+            is_looping=False,
+            is_segment=False,
+            rate=1.0,
+            sound_end=None,
+        )
+        self.screen.audio_player.get_position.return_value = 0.0
+        self.screen.navigate = MagicMock(side_effect=lambda step: self.screen.play())
+        self.screen.create_playback_clock()
+        self.screen.timer_guard()
+        self.screen.save_recording = MagicMock()
+        self.screen.save_scores = MagicMock()
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        with wave.open(str(self.tmp_dir / "voice.wav"), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(8000)
+            wav.writeframes(bytes(8000 * 2))
+        self.screen.recorder = Recorder(
+            lambda: WavFileSource(self.tmp_dir / "voice.wav"), self.tmp_dir
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @patch("ui.screens.play_audio_screen.SCORING_EXECUTOR")
+    def test_record_should_play_and_save_take_of_current_segment(self, executor):
+        self.screen.get_audio_file = MagicMock(return_value=Path("/audio/a.wav"))
+        self.screen.toggle_record()
+
+        self.screen.navigate.assert_called_once_with(0)
+        self.assertEqual(self.screen.ids.record_button.text, "Stop Recording")
+
+        self.screen.recorder.wait(timeout=5)
+        Clock.tick()
+
+        audio_id, start, end, take = self.screen.save_recording.call_args.args
+        self.assertEqual((audio_id, start, end), (7, 0.0, 0.5))
+        self.assertEqual(take.duration, 0.5)
+        self.assertTrue(take.file_path.name.startswith("7-0-"))
+        self.assertEqual(self.screen.ids.record_button.text, "Record")
+        executor.submit.assert_called_once_with(
+            score_take, Path("/audio/a.wav"), 0.0, 0.5, take.file_path, digest="abc"
+        )
+
+    def test_record_slower_should_start_with_stretched_segment(self):
+        self.screen.recorder = MagicMock(is_recording=False)
+        self.screen.render_segment = MagicMock()
+        self.screen.speed = 0.5
+
+        self.screen.toggle_record()
+
+        self.screen.render_segment.assert_called_once()
+        self.screen.recorder.start.assert_not_called()
+
+        self.screen.audio_player.is_segment = True  # the segment is rendered
+        self.screen.play()
+
+        self.assertEqual(self.screen.recorder.start.call_args.kwargs["duration"], 1.0)
+        self.assertEqual(self.screen.ids.record_button.text, "Stop Recording")
+
+    @patch("ui.screens.play_audio_screen.message_box_info")
+    @patch("ui.screens.play_audio_screen.SCORING_EXECUTOR")
+    def test_long_take_should_be_saved_without_scoring(self, executor, message_box):
+        self.screen.time_stamp.time_stamp_index = 1
+        self.screen.audio_player.sound_length = 300
+        future = Future()
+        future.set_result(Take(self.tmp_dir / "take.wav", 299.5, 0.0))
+
+        self.screen._on_take_recorded(7, 0.5, None, future)
+        Clock.tick()
+
+        self.screen.save_recording.assert_called_once()
+        executor.submit.assert_not_called()
+        self.assertIn("up to 60 s", message_box.call_args.args[0])
+
+    @patch("ui.screens.play_audio_screen.message_box_info")
+    def test_scored_take_should_be_saved_and_shown(self, message_box_info):
+        future = Future()
+        future.set_result(Scores(timing=81.5, intonation=64.2))
+
+        self.screen._on_take_scored(3, future)
+        Clock.tick()
+
+        self.screen.save_scores.assert_called_once_with(3, future.result())
+        message_box_info.assert_called_once_with("Timing: 82/100\nIntonation: 64/100")
+
+
+class TestReview(unittest.TestCase):
+    def setUp(self):
+        self.screen = PlayAudioScreen(name="test_screen")
+        self.sessions = {
+            1: AudioSession(1, "a.mp3", Path("/audio/a.mp3"), [0.0, 2.0, 5.0], 0, 0, 0),
+            2: AudioSession(2, "b.mp3", Path("/audio/b.mp3"), [0.0], 0, 0, 0),
+        }
+        due = datetime(2026, 1, 1)
+        self.segments = [
+            DueSegment(1, 1, "/audio/a.mp3", 2.0, 5.0, due, 0),
+            DueSegment(2, 1, "/audio/a.mp3", 5.0, None, due, 0),
+            DueSegment(3, 2, "/audio/b.mp3", 0.0, None, due, 0, "b"),
+        ]
+        for name, value in (
+            ("audio_session", None),
+            ("review_mode", False),
+            ("player_pool", MagicMock()),
+        ):
+            patcher = patch.object(PlayAudioScreen, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        screen = self.screen
+        graded = set()
+        screen.get_due_segments = MagicMock(
+            side_effect=lambda limit, exclude=(): [
+                s for s in self.segments if s.id not in graded | set(exclude)
+            ][:limit]
+        )
+        screen.grade_review = MagicMock(side_effect=lambda id, grade: graded.add(id))
+        screen.update_audio_session = MagicMock()
+        screen.get_audio = MagicMock(side_effect=self.sessions.get)
+        screen.get_audio_file = lambda: screen.current_audio_session.file_path
+        screen.load_waveform = MagicMock()
+        screen.load_sound = MagicMock(side_effect=self._load_sound)
+
+    def _load_sound(self, file_path):
+        self.screen.time_stamp = TimeStampManager(self.screen.current_audio_session)
+        self.screen.audio_player = MagicMock(
+            current_position=0.0,
+            is_looping=False,
+            is_segment=False,
+            is_playing=False,
+            rate=1.0,
+            sound_end=None,
+        )
+        self.screen.create_playback_clock()
+
+    def test_review_should_start_at_first_due_segment(self):
+        self.screen.start_review()
+
+        self.assertTrue(self.screen.is_reviewing)
+        self.screen.load_sound.assert_called_once_with(Path("/audio/a.mp3"))
+        self.assertEqual(self.screen.time_stamp.stamp, 2.0)
+        self.screen.player_pool.prefetch.assert_called_once_with(
+            Path("/audio/b.mp3"), "b"
+        )
+
+    def test_grade_should_play_next_segment_of_same_audio(self):
+        self.screen.start_review()
+
+        self.screen.on_key_press(None, KeyboardEnum.THREE)
+
+        self.screen.grade_review.assert_called_once_with(1, GOOD)
+        self.screen.load_sound.assert_called_once()
+        self.assertEqual(self.screen.time_stamp.stamp, 5.0)
+        self.assertEqual(self.screen.audio_player.current_position, 5.0)
+        self.screen.audio_player.play.assert_called_once()
+
+    def test_grade_should_load_audio_of_next_segment_and_finish(self):
+        self.screen.start_review()
+        self.screen.grade_segment(GOOD)
+
+        self.screen.grade_segment(HARD)
+
+        self.screen.update_audio_session.assert_called_once_with(self.sessions[1])
+        self.screen.load_sound.assert_called_with(Path("/audio/b.mp3"))
+        self.assertIs(self.screen.current_audio_session, self.sessions[2])
+
+        with patch("ui.screens.play_audio_screen.message_box_info") as message_box:
+            self.screen.grade_segment(GOOD)
+        message_box.assert_called_once()
+        self.assertFalse(self.screen.is_reviewing)
+        self.assertEqual(self.screen.grade_review.call_count, 3)
+
+    @patch("ui.screens.play_audio_screen.message_box_info")
+    def test_review_without_due_segments_should_go_back(self, message_box):
+        self.screen.get_due_segments = MagicMock(return_value=[])
+        self.screen.back = MagicMock()
+
+        self.screen.start_review()
+
+        message_box.assert_called_once_with("No segments are due for review")
+        self.screen.back.assert_called_once()
+        self.assertFalse(self.screen.is_reviewing)
@@ -1,12 +1,30 @@
 import unittest
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 from kivy.uix.button import Button
 from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
 from kivy.uix.scrollview import ScrollView
 
+from models.session_manager import AudioSummary
 from ui.screens.read_file_screen import ReadFileScreen
 
 
+def _library(size):
+    return [AudioSummary(i, f"{i}.mp3", datetime(2025, 1, 1)) for i in range(size)]
+
+
+def _list_audio_page(library):
+    def list_audio_page(after=None, limit=50):
+        start = library.index(after) + 1 if after else 0
+        return library[start : start + limit]
+
+    return MagicMock(side_effect=list_audio_page)
+
+
 class TestFileChooser(unittest.TestCase):
     def setUp(self):
         self.file_chooser = ReadFileScreen(name="test_screen")
@@ -23,6 +41,88 @@ class TestFileChooser(unittest.TestCase):
         """Verify the type of widgets"""
         self.assertIsInstance(self.file_chooser.ids.info_label, Label)
         self.assertIsInstance(self.file_chooser.ids.scroll_view, ScrollView)
+        self.assertIsInstance(self.file_chooser.ids.scroll_view, RecycleView)
         self.assertIsInstance(self.file_chooser.ids.chose_file, Label)
         self.assertIsInstance(self.file_chooser.ids.button_back, Button)
         self.assertIsInstance(self.file_chooser.ids.button_choose, Button)
+
+
+@patch("kivy.app.App.get_running_app")
+class TestLibraryList(unittest.TestCase):
+    def setUp(self):
+        self.screen = ReadFileScreen(name="read_file_screen")
+        self.screen.PAGE_SIZE = 3
+        self.screen.list_audio_page = _list_audio_page(_library(7))
+        self.screen.get_audio_source = MagicMock(
+            side_effect=lambda pk: (Path(f"/audio/{pk}.mp3"), f"digest{pk}")
+        )
+
+    def test_on_enter_should_load_only_first_page(self, mock_app):
+        mock_app.return_value.LIBRARY_REVISION = 0
+
+        self.screen.on_enter()
+
+        names = [row["text"] for row in self.screen.ids.scroll_view.data]
+        self.assertEqual(names, ["0.mp3", "1.mp3", "2.mp3"])
+
+    def test_load_more_should_append_pages_until_the_end(self, mock_app):
+        mock_app.return_value.LIBRARY_REVISION = 0
+        self.screen.on_enter()
+
+        for _ in range(5):
+            self.screen.load_more()
+
+        self.assertEqual(len(self.screen.ids.scroll_view.data), 7)
+        self.assertEqual(self.screen.list_audio_page.call_count, 3)
+
+    def test_on_enter_should_reload_only_when_library_changed(self, mock_app):
+        mock_app.return_value.LIBRARY_REVISION = 0
+        self.screen.on_enter()
+        self.screen.on_enter()
+        self.assertEqual(self.screen.list_audio_page.call_count, 1)
+
+        mock_app.return_value.LIBRARY_REVISION = 1
+        self.screen.on_enter()
+        self.assertEqual(self.screen.list_audio_page.call_count, 2)
+
+    def test_select_should_toggle_selected_row(self, mock_app):
+        mock_app.return_value.LIBRARY_REVISION = 0
+        self.screen.on_enter()
+        list_view = self.screen.ids.scroll_view
+
+        list_view.select(1)
+        self.assertEqual(list_view.selected["audio_id"], 1)
+        self.assertFalse(self.screen.ids.button_choose.disabled)
+        self.assertEqual(self.screen.ids.chose_file.text, "Selected file: 1.mp3")
+
+        list_view.select(1)
+        self.assertIsNone(list_view.selected)
+        self.assertTrue(self.screen.ids.button_choose.disabled)
+
+    def test_select_should_prefetch_selected_audio(self, mock_app):
+        mock_app.return_value.LIBRARY_REVISION = 0
+        self.screen.on_enter()
+
+        self.screen.ids.scroll_view.select(2)
+
+        mock_app.return_value.PLAYER_POOL.prefetch.assert_called_once_with(
+            Path("/audio/2.mp3"), "digest2"
+        )
+
+    # run the @mainthread callbacks right away
+    @patch("kivy.clock.Clock.schedule_once", lambda callback, timeout=0: callback(0))
+    @patch("ui.screens.read_file_screen.SEARCH_EXECUTOR")
+    def test_search_should_show_only_results_of_last_query(self, executor, mock_app):
+        futures = {"les": Future(), "lesson": Future()}
+        executor.submit.side_effect = lambda search_audio, query: futures[query]
+        library = _library(3)
+
+        self.screen.search("les")
+        self.screen._search()
+        self.screen.search("lesson")
+        self.screen._search()
+        futures["lesson"].set_result(library[1:])
+        futures["les"].set_result(library)
+
+        names = [row["text"] for row in self.screen.ids.scroll_view.data]
+        self.assertEqual(names, ["1.mp3", "2.mp3"])
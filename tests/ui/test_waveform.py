@@ -0,0 +1,23 @@
+import numpy as np
+
+from ui.widgets import WaveformView
+from utils.waveform import WaveformPeaks
+
+
+def test_redraw_should_draw_one_line_per_column():
+    view = WaveformView(size=(200, 100), pos=(0, 0))
+    view.peaks = WaveformPeaks.from_base(
+        np.tile(np.array([[-127, 127]], dtype=np.int8), (1000, 1))
+    )
+
+    view.redraw()
+
+    vertices = np.array(view._mesh.vertices).reshape(-1, 4)
+    assert len(vertices) == 2 * 200
+    assert vertices[:, 1].min() == 0 and vertices[:, 1].max() == 100
+
+
+def test_redraw_without_peaks_should_clear_mesh():
+    view = WaveformView(size=(200, 100))
+    view.redraw()
+    assert view._mesh.vertices == []
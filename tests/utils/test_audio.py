@@ -1,7 +1,7 @@
 import tempfile
 import time
-from dataclasses import dataclass
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from pydub.generators import Sine
@@ -15,9 +15,8 @@ def sample_audio_session():
     return AudioSession(1, "Session 1", Path("/old/path"), [1.0, 2.0], 120, 30, 5)
 
 
-@dataclass
-class _DummyAudioSession:
-    time_stamp: list
+def _audio_session(time_stamp: list) -> AudioSession:
+    return AudioSession(1, "Session 1", Path("/old/path"), time_stamp, 120, 30, 5)
 
 
 class TestTimeStampManager:
@@ -47,7 +46,7 @@ class TestTimeStampManager:
     )
     def test_should_return_time_stamp_list(self, audio_session, expected):
         time_stamp_instance = TimeStampManager(audio_session)
-        assert time_stamp_instance.time_stamp_list == expected
+        assert time_stamp_instance.time_stamp_list.tolist() == expected
 
     @pytest.mark.parametrize("value", [1, 3, 10])
     def test_should_not_set_new_time_stamp_index_when_value_is_bigest_than_list(
@@ -87,8 +86,8 @@ class TestTimeStampManager:
 
     @pytest.mark.parametrize("index", [1, 2, 3, 4])
     def test_should_remove_time_stamp(self, index):
-        dummy_audio_session = _DummyAudioSession([1.0, 2.0, 3.0, 4.0, 5.0])
-        ts = TimeStampManager(dummy_audio_session)
+        audio_session = _audio_session([1.0, 2.0, 3.0, 4.0, 5.0])
+        ts = TimeStampManager(audio_session)
         ts._time_stamp_index = index
 
         size_before = len(ts.time_stamp_list)
@@ -98,12 +97,75 @@ class TestTimeStampManager:
         assert size_after == size_before - 1
 
     def test_should_raise_value_error_when_try_to_remove_first_time_stamp(self):
-        dummy_audio_session = _DummyAudioSession([1.0, 2.0, 3.0, 4.0, 5.0])
-        ts = TimeStampManager(dummy_audio_session)
+        audio_session = _audio_session([1.0, 2.0, 3.0, 4.0, 5.0])
+        ts = TimeStampManager(audio_session)
         ts._time_stamp_index = 0
         with pytest.raises(ValueError):
             ts.remove()
 
+    def test_add_time_stamps_should_skip_duplicates_and_keep_current(self):
+        audio_session = _audio_session([0.0, 5.0])
+        ts = TimeStampManager(audio_session)
+
+        added = ts.add_time_stamps([2.0, 5.5, 8.0, 2.3])
+
+        assert added == 2
+        assert ts.time_stamp_list.tolist() == [0.0, 2.0, 5.0, 8.0]
+        assert ts.stamp == 5.0
+        assert audio_session.pop_changes().added_time_stamps == {2.0, 8.0}
+
+    def test_should_track_added_and_removed_time_stamps(self):
+        audio_session = _audio_session([1.0, 2.0])
+        ts = TimeStampManager(audio_session)
+
+        ts.add_time_stamp(3.0)
+        ts.remove()
+        ts.remove()
+        changes = audio_session.pop_changes()
+
+        assert audio_session.time_stamp.tolist() == [1.0]
+        assert changes.added_time_stamps == set()
+        assert changes.removed_time_stamps == {2.0}
+
+    def test_should_keep_time_stamps_sorted_in_session(self):
+        audio_session = _audio_session([4.0, 1.0])
+        ts = TimeStampManager(audio_session)
+
+        ts.add_time_stamp(2.0)
+
+        assert audio_session.time_stamp is ts.time_stamp_list
+        assert audio_session.time_stamp.tolist() == [1.0, 2.0, 4.0]
+        assert ts.stamp == 2.0
+
+    @pytest.mark.parametrize(
+        "position, expected", [(1.9, False), (2.45, False), (1.4, True), (2.6, True)]
+    )
+    def test_should_use_tolerance_window_for_duplicates(self, position, expected):
+        ts = TimeStampManager(_audio_session([0.0, 2.0]), tolerance=0.5)
+        assert ts.add_time_stamp(position) is expected
+
+    def test_remove_time_stamps_should_remove_nearest_but_not_first(self):
+        audio_session = _audio_session([0.0, 2.0, 5.0, 8.0])
+        ts = TimeStampManager(audio_session)
+        ts.time_stamp_index = 2
+
+        removed = ts.remove_time_stamps([0.1, 2.2, 7.9, 12.0])
+
+        assert removed == 2
+        assert ts.time_stamp_list.tolist() == [0.0, 5.0]
+        assert ts.stamp == 5.0
+        assert audio_session.pop_changes().removed_time_stamps == {2.0, 8.0}
+
+    def test_should_handle_many_time_stamps(self):
+        ts = TimeStampManager(_audio_session([]))
+
+        added = ts.add_time_stamps(float(i) for i in range(50_000))
+
+        assert added == 49_999
+        assert ts.add_time_stamp(25_000.2) is False
+        assert ts.remove_time_stamps([10.0, 20.0]) == 2
+        assert ts.find(40_000.1) == 39_998
+
 
 class TestAudioPlayer:
     def setup_method(self, test_method):
@@ -135,3 +197,59 @@ class TestAudioPlayer:
     def test_audio_player_cleanup(self):
         self.player.cleanup()
         assert self.player.sound is None or self.player.sound.unload
+
+
+class _Sound:
+    """Kivy sound which plays only when the test moves its position."""
+
+    def __init__(self, length):
+        self.length, self.state, self.loop, self.pos = length, "stop", False, 0.0
+
+    def seek(self, position):
+        self.pos = position
+
+    def play(self):
+        self.state = "play"
+
+    def stop(self):
+        self.state = "stop"
+
+    def get_pos(self):
+        return self.pos
+
+    def unload(self):
+        pass
+
+
+class TestAudioPlayerSegments:
+    def setup_method(self, test_method):
+        sounds = iter([_Sound(10), _Sound(4)])
+        with patch("utils.audio.SoundLoader.load", side_effect=lambda _: next(sounds)):
+            self.player = AudioPlayer(Path("/audio/a.mp3"))
+            self.player.use_segment(2.0, 4.0, Path("/pcm/a.wav"), 0.5, position=3.0)
+
+    def test_position_of_stretched_segment_should_be_in_file_seconds(self):
+        self.player.play()
+
+        assert self.player.sound.pos == 2.0
+        self.player.sound.pos = 3.0
+        assert self.player.get_position() == 3.5
+        assert self.player.rate == 0.5
+
+    def test_segment_played_to_end_should_stay_at_its_end(self):
+        self.player.play()
+        self.player.sound.stop()  # the sound reached its end
+
+        assert self.player.is_playing
+        assert self.player.get_position() == 4.0
+        self.player.pause()
+        assert not self.player.is_playing
+
+    def test_stop_segment_should_go_back_to_file_at_same_position(self):
+        self.player.play()
+        self.player.sound.pos = 1.0
+
+        self.player.stop_segment()
+
+        assert not self.player.is_segment
+        assert (self.player.current_position, self.player.rate) == (2.5, 1.0)
@@ -1,62 +1,92 @@
 import os
-import tempfile
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from utils.file import copy_file, file_exists
+from utils.file import file_digest, store_file, trim_directory
 
 
 @pytest.fixture
-def temp_dirs_with_files():
-    with tempfile.TemporaryDirectory() as src_dir, tempfile.TemporaryDirectory() as dest_dir:
-        # create sample files
-        with open(os.path.join(src_dir, "sample1.mp3"), "w") as file:
-            file.write("Test file 1")
-
-        with open(os.path.join(src_dir, "sample2.mp3"), "w") as file:
-            file.write("Test file 2")
-
-        with open(os.path.join(dest_dir, "sample2.mp3"), "w") as file:
-            file.write("Test file 2")
-
-        yield src_dir, dest_dir
-
-
-def test_file_exists_should_return_true_when_file_exists(temp_dirs_with_files):
-    src_dir, dest_dir = temp_dirs_with_files
-    with patch("utils.file.DEFAULT_AUDIO_KEEPER", Path(dest_dir)):
-        assert file_exists(Path(src_dir) / "sample2.mp3")
-
-
-def test_file_exists_should_return_false_when_file_does_not_exists(
-    temp_dirs_with_files,
-):
-    src_dir, dest_dir = temp_dirs_with_files
-    with patch("utils.file.DEFAULT_AUDIO_KEEPER", Path(dest_dir)):
-        assert not file_exists(Path(src_dir) / "sample1.mp3")
-
-
-def test_copy_file_should_copy_file_if_file_does_not_exists_in_destination(
-    temp_dirs_with_files,
-):
-    """Ensure that function work properly. Should return path and in the destination directory should be new file."""
-    src_dir, dest_dir = temp_dirs_with_files
-    copy_file_name = "sample1.mp3"
-    assert not os.path.exists(Path(dest_dir) / copy_file_name)
-    _path = copy_file(Path(src_dir) / copy_file_name, to=Path(dest_dir))
-    assert isinstance(_path, Path)
-    expected_path = Path(dest_dir) / copy_file_name
-    assert _path == expected_path
-    assert os.path.exists(expected_path)
-
-
-def test_copy_file_should_not_copy_file_if_file_exists_in_destination(
-    temp_dirs_with_files,
-):
-    src_dir, dest_dir = [Path(p) for p in temp_dirs_with_files]
-    copy_file_name = Path("sample2.mp3")
-    with patch("utils.file.DEFAULT_AUDIO_KEEPER", dest_dir):
-        assert os.path.exists(dest_dir / copy_file_name)
-        assert not copy_file(src_dir / copy_file_name, to=dest_dir)
+def audio_files(tmp_path):
+    """Two files with the same content under different names and one other."""
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    for name, content in (
+        ("sample1.mp3", "Test file 1"),
+        ("copy_of_sample1.mp3", "Test file 1"),
+        ("other/sample1.mp3", "Test file 2"),
+    ):
+        path = src_dir / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(content)
+    return src_dir, tmp_path / "store"
+
+
+def test_store_file_should_name_file_by_its_digest(audio_files):
+    src_dir, store = audio_files
+    source = src_dir / "sample1.mp3"
+
+    stored = store_file(source, to=store)
+
+    assert stored == store / f"{file_digest(source)}.mp3"
+    assert stored.read_text() == "Test file 1"
+
+
+def test_store_file_should_keep_same_content_once(audio_files):
+    src_dir, store = audio_files
+
+    first = store_file(src_dir / "sample1.mp3", to=store)
+    second = store_file(src_dir / "copy_of_sample1.mp3", to=store)
+
+    assert first == second
+    assert len(list(store.iterdir())) == 1
+
+
+def test_store_file_should_keep_different_content_with_same_name(audio_files):
+    src_dir, store = audio_files
+
+    first = store_file(src_dir / "sample1.mp3", to=store)
+    second = store_file(src_dir / "other" / "sample1.mp3", to=store)
+
+    assert first != second
+    assert second.read_text() == "Test file 2"
+
+
+def test_store_file_should_copy_when_links_are_not_supported(audio_files):
+    src_dir, store = audio_files
+    source = src_dir / "sample1.mp3"
+
+    with patch("utils.file._reflink", side_effect=OSError), patch(
+        "utils.file.os.link", side_effect=OSError
+    ):
+        stored = store_file(source, to=store)
+
+    assert stored.read_text() == "Test file 1"
+    assert os.stat(stored).st_ino != os.stat(source).st_ino
+    assert [path.name for path in store.iterdir()] == [stored.name]
+
+
+def test_store_file_should_not_read_file_again_with_known_digest(audio_files):
+    src_dir, store = audio_files
+    source = src_dir / "sample1.mp3"
+
+    with patch("utils.file.file_digest") as digest:
+        stored = store_file(source, to=store, digest="abc")
+
+    digest.assert_not_called()
+    assert stored == Path(store / "abc.mp3")
+
+
+def test_trim_directory_should_remove_oldest_files_but_kept(tmp_path):
+    paths = [tmp_path / f"{i}.wav" for i in range(4)]
+    for i, path in enumerate(paths):
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (i, i))
+    (tmp_path / "other.txt").write_bytes(b"x" * 1000)
+
+    removed = trim_directory(tmp_path, 200, ["*.wav"], keep={paths[0]})
+
+    assert removed == 200
+    assert [path.exists() for path in paths] == [True, False, False, True]
+    assert (tmp_path / "other.txt").exists()
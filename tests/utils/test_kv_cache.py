@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+import pytest
+from kivy.factory import Factory
+from kivy.lang.builder import Builder
+from kivy.properties import StringProperty
+from kivy.uix.label import Label
+
+from ui.screens import KIVY_FILE
+from utils.kv_cache import load_kv, parse_kv
+
+KV = """
+#:set greeting "Hello"
+<CachedLabel>:
+    text: greeting + " " + self.name
+"""
+
+
+class CachedLabel(Label):
+    name = StringProperty()
+
+
+@pytest.fixture
+def kv_file(tmp_path):
+    path = tmp_path / "cached_label.kv"
+    path.write_text(KV)
+    yield path
+    Builder.unload_file(str(path))
+
+
+def test_load_kv_should_apply_rules(kv_file, tmp_path):
+    load_kv(kv_file, tmp_path / "cache")
+
+    label = CachedLabel()
+    label.name = "world"
+
+    assert label.text == "Hello world"
+
+
+def test_parse_kv_should_reuse_cache(kv_file, tmp_path):
+    parse_kv(kv_file, tmp_path / "cache")
+
+    with patch("utils.kv_cache.Parser") as parser:
+        cached = parse_kv(kv_file, tmp_path / "cache")
+
+    parser.assert_not_called()
+    assert [rule.name for _, rule in cached.rules] == ["<CachedLabel>"]
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_parse_kv_should_parse_changed_file(kv_file, tmp_path):
+    parse_kv(kv_file, tmp_path / "cache")
+    kv_file.write_text(KV.replace("Hello", "Hi"))
+
+    parser = parse_kv(kv_file, tmp_path / "cache")
+
+    assert "Hi" in parser.directives[0][1]
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_parse_kv_should_keep_cache_of_other_files(kv_file, tmp_path):
+    other = tmp_path / "cached_label.other.kv"
+    other.write_text(KV)
+    parse_kv(other, tmp_path / "cache")
+    parse_kv(kv_file, tmp_path / "cache")
+    kv_file.write_text(KV.replace("Hello", "Hi"))
+
+    parse_kv(kv_file, tmp_path / "cache")
+
+    names = [path.name for path in (tmp_path / "cache").iterdir()]
+    assert len(names) == 2
+    assert sum(name.startswith("cached_label.other.") for name in names) == 1
+
+
+def test_parse_kv_should_ignore_broken_cache(kv_file, tmp_path):
+    parse_kv(kv_file, tmp_path / "cache")
+    for path in (tmp_path / "cache").iterdir():
+        path.write_bytes(b"broken")
+
+    parser = parse_kv(kv_file, tmp_path / "cache")
+
+    assert [rule.name for _, rule in parser.rules] == ["<CachedLabel>"]
+
+
+def _describe(rule):
+    if rule is None:
+        return None
+    return (
+        rule.name,
+        rule.line,
+        rule.id,
+        [(name, prop.value) for name, prop in rule.properties.items()],
+        [(handler.name, handler.value) for handler in rule.handlers],
+        [_describe(child) for child in rule.children],
+        [_describe(canvas) for canvas in (rule.canvas_before, rule.canvas_root)],
+        _describe(rule.canvas_after),
+    )
+
+
+def _builder_state(filename):
+    return (
+        [
+            (selector.key, _describe(rule))
+            for selector, rule in Builder.rules
+            if rule.ctx.filename == filename
+        ],
+        {
+            name: cls
+            for name, (cls, _, fn) in Builder.templates.items()
+            if fn == filename
+        },
+        {
+            name: entry["baseclasses"]
+            for name, entry in Factory.classes.items()
+            if entry.get("filename") == filename
+        },
+        Builder.files.count(filename),
+    )
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "main_screen.kv",
+        "file_chooser.kv",
+        "read_file_screen.kv",
+        "play_audio_screen.kv",
+    ],
+)
+def test_load_kv_should_build_same_state_as_load_file(name, tmp_path):
+    kv_path = KIVY_FILE / name
+    filename = str(kv_path)
+    Builder.unload_file(filename)
+    try:
+        Builder.load_file(filename)
+        expected = _builder_state(filename)
+        Builder.unload_file(filename)
+
+        load_kv(kv_path, tmp_path)  # parses the file and caches it
+        assert _builder_state(filename) == expected
+        Builder.unload_file(filename)
+
+        with patch("utils.kv_cache.Parser") as parser:
+            load_kv(kv_path, tmp_path)
+        parser.assert_not_called()
+        assert _builder_state(filename) == expected
+        assert expected[0]
+    finally:
+        Builder.unload_file(filename)
+        Builder.load_file(filename)
+
+
+def test_parse_kv_should_raise_unexpected_errors(kv_file, tmp_path):
+    parse_kv(kv_file, tmp_path / "cache")
+
+    with patch("utils.kv_cache.pickle.load", side_effect=RuntimeError("bug")):
+        with pytest.raises(RuntimeError):
+            parse_kv(kv_file, tmp_path / "cache")
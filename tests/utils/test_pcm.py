@@ -0,0 +1,49 @@
+import wave
+
+import numpy as np
+import pytest
+
+from utils.pcm import AudioDecodeError, decode, probe_duration, read_blocks
+
+
+def test_decode_should_return_samples_of_wav_file(make_wav):
+    samples = np.sin(np.linspace(0, 100, 8000))
+    path = make_wav(samples, sample_rate=8000)
+
+    decoded, sample_rate = decode(path)
+
+    assert sample_rate == 8000
+    np.testing.assert_allclose(decoded, samples, atol=1e-4)
+
+
+def test_read_blocks_should_split_samples(make_wav):
+    path = make_wav(np.zeros(1000))
+
+    _, blocks = read_blocks(path, block_size=300)
+
+    assert [len(block) for block in blocks] == [300, 300, 300, 100]
+
+
+def test_decode_should_mix_stereo_to_mono(tmp_path):
+    path = tmp_path / "stereo.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(np.array([16384, 0] * 10, dtype="<i2").tobytes())
+
+    decoded, _ = decode(path)
+
+    np.testing.assert_allclose(decoded, 0.25)
+
+
+def test_decode_should_raise_for_invalid_wav(tmp_path):
+    path = tmp_path / "broken.wav"
+    path.write_bytes(b"not a wav file")
+    with pytest.raises(AudioDecodeError):
+        decode(path)
+
+
+def test_probe_duration_should_read_wav_header(make_wav):
+    path = make_wav(np.zeros(12000), sample_rate=8000)
+    assert probe_duration(path) == 1.5
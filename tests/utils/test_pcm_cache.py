@@ -0,0 +1,106 @@
+import os
+import wave
+from unittest.mock import patch
+
+import numpy as np
+
+from utils.pcm_cache import PcmCache
+
+
+def _frames(path):
+    with wave.open(str(path), "rb") as wav:
+        return wav.getnframes(), wav.getframerate()
+
+
+def test_decode_should_store_pcm_once(make_wav, tmp_path):
+    path = make_wav(np.linspace(-1, 1, 8000))
+    PcmCache(path, directory=tmp_path / "pcm").decode()
+
+    with patch("utils.pcm_cache.read_blocks") as read_blocks:
+        cache = PcmCache(path, directory=tmp_path / "pcm")
+        assert len(cache.samples) == 8000
+        assert cache.sample_rate == 8000
+    read_blocks.assert_not_called()
+
+
+def test_segment_should_cut_exact_samples(make_wav, tmp_path):
+    samples = np.linspace(-1, 1, 8000)
+    cache = PcmCache(make_wav(samples), directory=tmp_path / "pcm")
+
+    segment = cache.segment(0.25, 0.5)
+
+    assert _frames(segment) == (2000, 8000)
+    with wave.open(str(segment), "rb") as wav:
+        pcm = np.frombuffer(wav.readframes(2000), dtype="<i2")
+    assert pcm.tolist() == cache.samples[2000:4000].tolist()
+
+
+def test_segment_without_end_should_last_to_the_end_of_file(make_wav, tmp_path):
+    cache = PcmCache(make_wav(np.zeros(8000)), directory=tmp_path / "pcm")
+    assert _frames(cache.segment(0.75)) == (2000, 8000)
+
+
+def test_segment_should_be_reused(make_wav, tmp_path):
+    cache = PcmCache(make_wav(np.zeros(8000)), directory=tmp_path / "pcm")
+    first = cache.segment(0, 0.5)
+
+    with patch("utils.pcm_cache.wave.open") as wave_open:
+        assert cache.segment(0, 0.5) == first
+    wave_open.assert_not_called()
+
+
+def test_segment_should_remove_least_recently_used_files(make_wav, tmp_path):
+    cache = PcmCache(
+        make_wav(np.zeros(8000)), directory=tmp_path / "pcm", max_segments=2
+    )
+    first = cache.segment(0, 0.25)
+    second = cache.segment(0.25, 0.5)
+    cache.segment(0, 0.25)
+
+    cache.segment(0.5, 0.75)
+
+    assert first.is_file()
+    assert not second.exists()
+
+
+def test_stretched_segment_should_be_cached_per_rate(make_wav, tmp_path):
+    cache = PcmCache(make_wav(np.zeros(8000)), directory=tmp_path / "pcm")
+
+    normal = cache.segment(0, 0.5)
+    slow = cache.segment(0, 0.5, rate=0.5)
+
+    assert slow != normal
+    assert _frames(slow) == (8000, 8000)
+    with patch("utils.pcm_cache.stretch") as stretch:
+        assert cache.segment(0, 0.5, rate=0.5) == slow
+    stretch.assert_not_called()
+
+
+def test_clear_should_remove_segment_files_but_keep_pcm(make_wav, tmp_path):
+    cache = PcmCache(make_wav(np.zeros(8000)), directory=tmp_path / "pcm")
+    segments = [cache.segment(0, 0.5), cache.segment(0, 0.5, rate=1.5)]
+
+    cache.clear()
+
+    assert not any(segment.exists() for segment in segments)
+    assert len(list((tmp_path / "pcm").glob("*.pcm"))) == 1
+
+
+def test_directory_should_be_trimmed_least_recently_used_first(make_wav, tmp_path):
+    directory = tmp_path / "pcm"
+    first = PcmCache(make_wav(np.zeros(8000), name="a.wav"), directory=directory)
+    first.decode()
+    old_pcm = next(directory.glob("*.pcm"))
+    os.utime(old_pcm, (0, 0))
+    # room for the PCM of one file and a few segments
+    second = PcmCache(
+        make_wav(np.ones(8000) * 0.5, name="b.wav"),
+        directory=directory,
+        max_bytes=20000,
+    )
+
+    segment = second.segment(0, 0.5)
+
+    assert not old_pcm.exists()
+    assert segment.is_file()
+    assert len(list(directory.glob("*.pcm"))) == 1
@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+from utils.playback_clock import PlaybackClock
+
+
+class FakeMonotonic:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tick_should_read_position_once_for_all_subscribers():
+    get_position = MagicMock(return_value=12.5)
+    clock = PlaybackClock(get_position)
+    first, second = MagicMock(), MagicMock()
+    clock.subscribe(first)
+    clock.subscribe(second)
+
+    clock.tick()
+
+    get_position.assert_called_once()
+    first.assert_called_once_with(12.5)
+    second.assert_called_once_with(12.5)
+
+
+def test_played_time_should_follow_monotonic_clock():
+    monotonic = FakeMonotonic()
+    clock = PlaybackClock(lambda: 0, monotonic=monotonic)
+    clock.start()
+
+    for _ in range(3):
+        monotonic.now += 0.7  # late ticks
+        clock.tick()
+
+    assert clock.take_played_seconds() == 2
+    monotonic.now += 0.9
+    clock.stop()
+    assert clock.take_played_seconds() == 1
+
+
+def test_stopped_clock_should_not_count_time():
+    monotonic = FakeMonotonic()
+    clock = PlaybackClock(lambda: 0, monotonic=monotonic)
+    clock.start()
+    monotonic.now += 1.5
+    clock.stop()
+
+    monotonic.now += 10
+    clock.tick()
+    clock.stop()
+
+    assert not clock.is_running
+    assert clock.take_played_seconds() == 1
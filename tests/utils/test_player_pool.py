@@ -0,0 +1,143 @@
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils.player_pool import BYTES_PER_SECOND, PlayerPool
+
+
+def _loaded(sound_length=10):
+    future = Future()
+    future.set_result(MagicMock(sound_length=sound_length))
+    return future
+
+
+@pytest.fixture
+def load_async():
+    with patch("utils.player_pool.AudioPlayer.load_async") as load_async:
+        load_async.side_effect = lambda *args, **kwargs: _loaded()
+        yield load_async
+
+
+@pytest.fixture
+def audio_files(tmp_path):
+    paths = [tmp_path / f"{i}.mp3" for i in range(4)]
+    for path in paths:
+        path.write_bytes(b"audio")
+    return paths
+
+
+def test_get_should_reuse_loaded_player(load_async, audio_files):
+    pool = PlayerPool()
+
+    first = pool.get(audio_files[0])
+    second = pool.get(audio_files[0])
+
+    assert first is second
+    assert load_async.call_count == 1
+    assert (pool.hits, pool.misses) == (1, 1)
+
+
+def test_get_should_cache_pcm_by_stored_digest(load_async, audio_files):
+    pool = PlayerPool()
+
+    pool.get(audio_files[0], "abc")
+
+    with patch("utils.pcm_cache.file_digest") as file_digest:
+        assert load_async.call_args.kwargs["pcm_cache"].digest == "abc"
+    file_digest.assert_not_called()
+
+
+def test_get_should_reload_changed_file(load_async, audio_files):
+    pool = PlayerPool()
+    first = pool.get(audio_files[0])
+
+    audio_files[0].write_bytes(b"other audio")
+    second = pool.get(audio_files[0])
+
+    assert first is not second
+    assert pool.misses == 2
+
+
+def test_prefetch_should_not_count_but_make_get_hit(load_async, audio_files):
+    pool = PlayerPool()
+
+    pool.prefetch(audio_files[0])
+    pool.get(audio_files[0])
+
+    assert (pool.hits, pool.misses) == (1, 0)
+
+
+def test_get_after_prefetch_should_keep_stored_digest(load_async, audio_files):
+    pool = PlayerPool()
+
+    pool.prefetch(audio_files[0], "abc")
+    pool.get(audio_files[0], "abc")
+
+    assert load_async.call_count == 1
+    with patch("utils.pcm_cache.file_digest") as file_digest:
+        assert load_async.call_args.kwargs["pcm_cache"].digest == "abc"
+    file_digest.assert_not_called()
+
+
+def test_should_unload_least_recently_used_player(load_async, audio_files):
+    pool = PlayerPool(max_players=2)
+    first = pool.get(audio_files[0])
+    second = pool.get(audio_files[1])
+    pool.get(audio_files[0])
+
+    pool.get(audio_files[2])
+
+    second.result().cleanup.assert_called_once()
+    first.result().cleanup.assert_not_called()
+    assert audio_files[1] not in pool and len(pool) == 2
+
+
+def test_should_keep_memory_under_limit(load_async, audio_files):
+    pool = PlayerPool(max_memory=25 * BYTES_PER_SECOND)
+    futures = [pool.get(path) for path in audio_files[:3]]
+
+    assert pool.memory == 20 * BYTES_PER_SECOND
+    futures[0].result().cleanup.assert_called_once()
+
+
+def test_prefetch_over_memory_limit_should_keep_player_in_use(load_async, audio_files):
+    pool = PlayerPool(max_memory=25 * BYTES_PER_SECOND)
+    load_async.side_effect = [_loaded(30), _loaded(), _loaded()]
+    in_use = pool.get(audio_files[0])
+
+    pool.prefetch(audio_files[1])
+
+    in_use.result().cleanup.assert_not_called()
+    assert audio_files[0] in pool and audio_files[1] not in pool
+
+    pool.release()
+    pool.prefetch(audio_files[2])
+
+    in_use.result().cleanup.assert_called_once()
+    assert audio_files[2] in pool and len(pool) == 1
+
+
+def test_should_load_again_after_failed_load(load_async, audio_files):
+    failed = Future()
+    failed.set_exception(ValueError("Could not load sound!"))
+    load_async.side_effect = [failed, _loaded()]
+    pool = PlayerPool()
+
+    pool.get(audio_files[0])
+    player = pool.get(audio_files[0])
+
+    assert player.exception() is None
+    assert pool.misses == 2
+
+
+def test_discard_should_cancel_pending_load(audio_files):
+    pending = Future()
+    with patch("utils.player_pool.AudioPlayer.load_async", return_value=pending):
+        pool = PlayerPool()
+        pool.get(audio_files[0])
+
+    pool.discard(pending)
+
+    assert pending.cancelled()
+    assert len(pool) == 0
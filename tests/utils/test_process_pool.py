@@ -0,0 +1,27 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils.process_pool import ProcessPool
+
+
+def test_should_replace_executor_after_worker_died():
+    pool = ProcessPool(max_workers=1)
+    broken = pool.get_executor()
+
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=60)
+
+    assert pool.submit(abs, -3).result(timeout=60) == 3
+    assert pool.get_executor() is not broken
+    pool.get_executor().shutdown()
+
+
+def test_should_keep_working_executor():
+    pool = ProcessPool(max_workers=1)
+    executor = pool.get_executor()
+
+    assert pool.submit(abs, -3).result(timeout=60) == 3
+    assert pool.get_executor() is executor
+    executor.shutdown()
@@ -0,0 +1,129 @@
+import sys
+import time
+import wave
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from utils.recorder import (
+    CaptureSource,
+    MicrophoneSource,
+    Recorder,
+    RecorderError,
+    RingBuffer,
+    WavFileSource,
+)
+
+
+class EndlessSource(CaptureSource):
+    """Silence for as long as it's read, like a microphone."""
+
+    def read(self, frames):
+        time.sleep(frames / self.sample_rate)
+        return bytes(frames * self.frame_size)
+
+
+class BrokenSource(CaptureSource):
+    def open(self):
+        raise RecorderError("No input device")
+
+    def read(self, frames):
+        return b""
+
+
+def _frames(path):
+    with wave.open(str(path), "rb") as wav:
+        return wav.readframes(wav.getnframes())
+
+
+def test_ring_buffer_should_wrap_around():
+    buffer = RingBuffer(8)
+    buffer.write(b"abcdef")
+    assert buffer.read(4) == b"abcd"
+
+    assert buffer.write(b"ghijkl") == 6
+    assert buffer.read(100) == b"efghijkl"
+
+
+def test_ring_buffer_should_drop_what_does_not_fit():
+    buffer = RingBuffer(4)
+
+    assert buffer.write(b"abcdef") == 4
+    buffer.close()
+
+    assert (buffer.read(10), buffer.read(10), buffer.dropped) == (b"abcd", b"", 2)
+
+
+def test_recorder_should_stream_whole_source_to_wav(make_wav, tmp_path):
+    voice = make_wav(np.linspace(-1, 1, 8000) * 0.5)
+    recorder = Recorder(lambda: WavFileSource(voice), tmp_path, chunk_frames=100)
+
+    take = recorder.start("take.wav").result(timeout=5)
+
+    assert take.file_path == tmp_path / "take.wav"
+    assert (take.duration, take.dropped) == (1.0, 0.0)
+    assert _frames(take.file_path) == _frames(voice)
+
+
+def test_recorder_should_stop_after_duration(make_wav, tmp_path):
+    voice = make_wav(np.zeros(8000))
+    recorder = Recorder(lambda: WavFileSource(voice), tmp_path, chunk_frames=300)
+
+    take = recorder.start("take.wav", duration=0.25).result(timeout=5)
+
+    assert take.duration == 0.25
+
+
+def test_recorder_should_stop_on_request(tmp_path):
+    recorder = Recorder(lambda: EndlessSource(8000), tmp_path, chunk_frames=80)
+    future = recorder.start("take.wav")
+    time.sleep(0.1)
+    assert recorder.is_recording
+
+    recorder.stop()
+
+    assert 0 < future.result(timeout=5).duration < 1
+    recorder.wait()
+    assert not recorder.is_recording
+
+
+def test_recorder_should_not_start_second_take(tmp_path):
+    recorder = Recorder(lambda: EndlessSource(8000), tmp_path)
+    recorder.start("first.wav")
+
+    with pytest.raises(RecorderError):
+        recorder.start("second.wav")
+    recorder.stop()
+    recorder.wait()
+
+
+def test_recorder_should_report_source_errors(tmp_path):
+    recorder = Recorder(lambda: BrokenSource(), tmp_path)
+
+    with pytest.raises(RecorderError, match="No input device"):
+        recorder.start("take.wav").result(timeout=5)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_capture_source_should_require_read():
+    with pytest.raises(TypeError):
+        CaptureSource()
+
+
+def test_microphone_failure_should_fail_the_take(tmp_path):
+    class PortAudioError(Exception):
+        pass
+
+    stream = MagicMock()
+    stream.read.side_effect = PortAudioError("Input overflowed")
+    sounddevice = SimpleNamespace(
+        PortAudioError=PortAudioError, RawInputStream=MagicMock(return_value=stream)
+    )
+    recorder = Recorder(MicrophoneSource, tmp_path)
+
+    with patch.dict(sys.modules, {"sounddevice": sounddevice}):
+        with pytest.raises(RecorderError, match="Input overflowed"):
+            recorder.start("take.wav").result(timeout=5)
+    assert list(tmp_path.iterdir()) == []
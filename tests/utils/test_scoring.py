@@ -0,0 +1,157 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from utils.scoring import (
+    SCORING_EXECUTOR,
+    FeatureCache,
+    banded_dtw,
+    extract_features,
+    score,
+    score_take,
+    segment_features,
+)
+
+SAMPLE_RATE = 16000
+
+
+def _voice(pitch, seconds, sample_rate=SAMPLE_RATE):
+    """Harmonic voice-like signal whose pitch rises and falls once."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    frequency = pitch * (1 + 0.2 * np.sin(np.pi * t / seconds))
+    phase = 2 * np.pi * np.cumsum(frequency) / sample_rate
+    harmonics = sum(np.sin(k * phase) / k for k in range(1, 6))
+    return 0.3 * harmonics * np.sqrt(np.sin(np.pi * t / seconds))
+
+
+def test_extract_features_should_find_pitch_of_voice():
+    features = extract_features(_voice(150, 1.0), SAMPLE_RATE)
+
+    voiced = features.pitch[features.pitch > 0]
+    assert len(features) == 98
+    assert features.cepstra.shape == (98, 13)
+    assert 140 < np.median(voiced) < 190
+
+
+def test_banded_dtw_should_follow_stretched_sequence():
+    a = np.arange(10, dtype=float)[:, None]
+    b = np.repeat(a, 2, axis=0)
+
+    cost, path = banded_dtw(a, b, band=0.2)
+
+    assert cost == 0
+    assert path[0].tolist() == [0, 0] and path[-1].tolist() == [9, 19]
+    assert np.all(b[path[:, 1]] == a[path[:, 0]])
+
+
+@pytest.mark.parametrize("n, m", [(1, 100), (2, 300), (3, 300), (300, 3)])
+def test_banded_dtw_should_align_very_short_sequence_with_long_one(n, m):
+    a = np.linspace(0, 1, n)[:, None]
+    b = np.linspace(0, 1, m)[:, None]
+
+    _, path = banded_dtw(a, b, band=0.2)
+
+    assert path[0].tolist() == [0, 0] and path[-1].tolist() == [n - 1, m - 1]
+    assert np.all(np.diff(path, axis=0) >= 0)
+
+
+def test_same_contour_of_other_voice_should_score_high():
+    original = extract_features(_voice(120, 2.0), SAMPLE_RATE)
+    take = extract_features(_voice(210, 2.0, 22050), 22050)
+
+    scores = score(original, take)
+
+    assert scores.timing > 70
+    assert scores.intonation > 80
+
+
+def test_noise_should_score_no_intonation():
+    original = extract_features(_voice(120, 2.0), SAMPLE_RATE)
+    noise = np.random.default_rng(0).normal(0, 0.2, 2 * SAMPLE_RATE)
+
+    assert score(original, extract_features(noise, SAMPLE_RATE)).intonation == 0
+
+
+def test_segment_features_should_be_cached(make_wav, tmp_path):
+    path = make_wav(np.concatenate((_voice(120, 1.0), _voice(150, 1.0))), SAMPLE_RATE)
+    cache = FeatureCache(tmp_path / "features")
+
+    first = segment_features(path, 1.0, 2.0, cache=cache)
+    with patch("utils.scoring.read_segment") as read_segment:
+        second = segment_features(path, 1.0, 2.0, cache=cache)
+
+    read_segment.assert_not_called()
+    assert np.array_equal(first.cepstra, second.cepstra)
+    assert len(list(cache.directory.glob("*.npz"))) == 1
+
+
+def test_stored_digest_should_save_hashing_the_audio(make_wav, tmp_path):
+    path = make_wav(_voice(120, 1.0), SAMPLE_RATE)
+    cache = FeatureCache(tmp_path / "features")
+
+    with patch("utils.scoring.file_digest") as file_digest:
+        segment_features(path, 0.0, 0.5, cache=cache, digest="abc")
+
+    file_digest.assert_not_called()
+    assert len(list(cache.directory.glob("abc.*.npz"))) == 1
+
+
+def test_feature_cache_should_remove_least_recently_used(make_wav, tmp_path):
+    path = make_wav(_voice(120, 2.0), SAMPLE_RATE)
+    cache = FeatureCache(tmp_path / "features")
+    segment_features(path, 0.0, 0.5, cache=cache, digest="a")
+    size = next(cache.directory.glob("*.npz")).stat().st_size
+    cache.max_bytes = 2 * size
+
+    segment_features(path, 0.5, 1.0, cache=cache, digest="a")
+    os.utime(next(cache.directory.glob("a.0-500.*")), (0, 0))
+    segment_features(path, 1.0, 1.5, cache=cache, digest="a")
+
+    assert len(list(cache.directory.glob("*.npz"))) == 2
+    assert not list(cache.directory.glob("a.0-500.*"))
+
+
+def test_score_take_should_compare_take_with_segment(make_wav, tmp_path):
+    audio = make_wav(
+        np.concatenate((np.zeros(SAMPLE_RATE), _voice(120, 1.5))),
+        SAMPLE_RATE,
+        name="audio.wav",
+    )
+    take = make_wav(_voice(200, 1.5), SAMPLE_RATE, name="take.wav")
+
+    scores = score_take(audio, 1.0, None, take, cache=FeatureCache(tmp_path))
+
+    assert scores.intonation > 80
+
+
+def test_scoring_should_work_after_worker_died(make_wav, tmp_path):
+    audio = make_wav(_voice(120, 1.5), SAMPLE_RATE, name="audio.wav")
+    take = make_wav(_voice(200, 1.5), SAMPLE_RATE, name="take.wav")
+    with pytest.raises(BrokenProcessPool):
+        SCORING_EXECUTOR.submit(os._exit, 1).result(timeout=60)
+
+    future = SCORING_EXECUTOR.submit(
+        score_take, audio, 0.0, None, take, cache=FeatureCache(tmp_path)
+    )
+
+    assert future.result(timeout=60).intonation > 80
+
+
+def test_score_take_should_reject_empty_take(make_wav, tmp_path):
+    audio = make_wav(_voice(120, 1.0), SAMPLE_RATE, name="audio.wav")
+    take = make_wav(np.zeros(0), SAMPLE_RATE, name="take.wav")
+
+    with pytest.raises(ValueError):
+        score_take(audio, 0.0, None, take, cache=FeatureCache(tmp_path))
+
+
+def test_score_take_should_reject_take_over_length_limit(make_wav, tmp_path):
+    audio = make_wav(_voice(120, 1.0), SAMPLE_RATE, name="audio.wav")
+    take = make_wav(_voice(120, 1.5), SAMPLE_RATE, name="take.wav")
+
+    with patch("utils.scoring.MAX_SCORED_SECONDS", 1.2):
+        with pytest.raises(ValueError, match="longer than 1.2 s"):
+            score_take(audio, 0.0, None, take, cache=FeatureCache(tmp_path))
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from utils.segmentation import (
+    SEGMENTATION_EXECUTOR,
+    SegmentationSettings,
+    detect_boundaries,
+    find_boundaries,
+    window_levels,
+)
+
+SAMPLE_RATE = 16000
+
+
+def _speech(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return 0.5 * np.sin(2 * np.pi * 220 * t)
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE))
+
+
+def test_window_levels_should_return_level_of_every_window():
+    blocks = [np.full(300, 0.5), np.full(100, 0.5), np.zeros(400)]
+
+    levels = window_levels(blocks, window_size=200)
+
+    np.testing.assert_allclose(levels[:2], 20 * np.log10(0.5))
+    assert levels[2:].max() < -150
+
+
+def test_find_boundaries_should_skip_short_pauses_and_edges():
+    settings = SegmentationSettings(window=0.1, min_silence=0.3, min_segment=0.5)
+    # 0 dB speech, -100 dB silence; every value is one 0.1 s window
+    levels = np.array([-100] * 5 + [0] * 10 + [-100] * 2 + [0] * 10 + [-100] * 4)
+    levels = np.concatenate((levels, [0] * 10, [-100] * 5))
+
+    assert find_boundaries(levels.astype(float), settings) == [2.9]
+
+
+@pytest.mark.parametrize("min_segment, expected", [(1.0, [2.75, 5.25]), (3.0, [5.25])])
+def test_find_boundaries_should_keep_minimal_segment_length(min_segment, expected):
+    settings = SegmentationSettings(
+        window=0.5, min_silence=0.5, min_segment=min_segment
+    )
+    levels = np.array([0.0] * 5 + [-100.0] + [0.0] * 4 + [-100.0] + [0.0] * 5)
+
+    assert find_boundaries(levels, settings) == expected
+
+
+def test_detect_boundaries_should_find_pauses_in_audio_file(make_wav):
+    samples = np.concatenate(
+        [_speech(2), _silence(0.6), _speech(1.5), _silence(1.0), _speech(2)]
+    )
+    path = make_wav(samples, sample_rate=SAMPLE_RATE)
+
+    boundaries = detect_boundaries(path, SegmentationSettings())
+
+    assert boundaries == pytest.approx([2.3, 4.6], abs=0.03)
+
+
+def test_detect_boundaries_should_run_in_process_pool(make_wav):
+    path = make_wav(
+        np.concatenate([_speech(2), _silence(1.0), _speech(2)]), SAMPLE_RATE
+    )
+
+    future = SEGMENTATION_EXECUTOR.submit(detect_boundaries, path)
+
+    assert future.result(timeout=60) == pytest.approx([2.5], abs=0.03)
+
+
+def test_segmentation_should_work_after_worker_died(make_wav):
+    path = make_wav(
+        np.concatenate([_speech(2), _silence(1.0), _speech(2)]), SAMPLE_RATE
+    )
+    with pytest.raises(BrokenProcessPool):
+        SEGMENTATION_EXECUTOR.submit(os._exit, 1).result(timeout=60)
+
+    future = SEGMENTATION_EXECUTOR.submit(detect_boundaries, path)
+
+    assert future.result(timeout=60) == pytest.approx([2.5], abs=0.03)
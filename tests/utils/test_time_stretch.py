@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from utils.time_stretch import StretchSettings, stretch, stretched_length
+
+SAMPLE_RATE = 16000
+
+
+def _tone(frequency, seconds, sample_rate=SAMPLE_RATE):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return 0.5 * np.sin(2 * np.pi * frequency * t)
+
+
+def _peak(samples, sample_rate=SAMPLE_RATE):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.argmax(spectrum) * sample_rate / len(samples)
+
+
+@pytest.mark.parametrize("rate", [0.5, 0.75, 1.0, 1.25, 1.5])
+def test_stretch_should_change_length_but_keep_pitch(rate):
+    samples = _tone(220, 1.0)
+
+    output = np.concatenate(list(stretch(samples, rate, SAMPLE_RATE)))
+
+    assert len(output) == stretched_length(len(samples), rate)
+    assert _peak(output) == pytest.approx(220, abs=3)
+    # the overlapped frames add up to the level of the input
+    middle = output[len(output) // 4 : -len(output) // 4]
+    assert np.max(np.abs(middle)) == pytest.approx(0.5, abs=0.05)
+
+
+def test_stretch_should_yield_blocks_while_rendering():
+    blocks = list(
+        stretch(_tone(220, 2.0), 0.5, SAMPLE_RATE, StretchSettings(block_frames=8))
+    )
+
+    assert len(blocks) > 1
+    assert sum(map(len, blocks)) == 4 * SAMPLE_RATE
+
+
+def test_stretch_should_accept_int16_pcm():
+    pcm = (_tone(220, 0.5) * 32767).astype("<i2")
+
+    output = np.concatenate(list(stretch(pcm, 1.5, SAMPLE_RATE)))
+
+    assert output.dtype == np.float32
+    assert np.max(np.abs(output)) <= 32767 * 0.55
+
+
+@pytest.mark.parametrize("rate", [0.25, 2.0])
+def test_stretch_should_reject_rate_out_of_range(rate):
+    with pytest.raises(ValueError):
+        next(stretch(_tone(220, 0.1), rate, SAMPLE_RATE))
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.file import file_digest
+from utils.waveform import (
+    BASE_BUCKET,
+    LEVEL_FACTOR,
+    MIN_PEAKS,
+    WaveformCache,
+    WaveformPeaks,
+    compute_peaks,
+    load_peaks,
+    reduce_peaks,
+)
+
+
+def test_compute_peaks_should_keep_min_and_max_across_blocks():
+    blocks = [np.array([0.0, 0.5, -0.5]), np.array([1.0, -1.0])]
+
+    peaks = compute_peaks(blocks, bucket=2)
+
+    assert peaks.tolist() == [[0, 64], [-64, 127], [-127, -127]]
+
+
+def test_reduce_peaks_should_merge_neighbour_peaks():
+    peaks = np.array([[-1, 1], [-5, 2], [0, 7], [-2, 3]], dtype=np.int8)
+    assert reduce_peaks(peaks, 2).tolist() == [[-5, 2], [-2, 7]]
+
+
+def test_from_base_should_build_coarser_levels():
+    base = np.zeros((MIN_PEAKS * LEVEL_FACTOR**2, 2), dtype=np.int8)
+
+    peaks = WaveformPeaks.from_base(base)
+
+    assert sorted(peaks.levels) == [BASE_BUCKET * LEVEL_FACTOR**i for i in range(3)]
+    assert len(peaks.levels[max(peaks.levels)]) == MIN_PEAKS
+
+
+@pytest.mark.parametrize("width", [1, 100, 1000])
+def test_columns_should_return_one_peak_per_column(width):
+    peaks = WaveformPeaks.from_base(np.ones((MIN_PEAKS * 8, 2), dtype=np.int8))
+    assert peaks.columns(width).shape == (width, 2)
+
+
+def test_load_peaks_should_use_cache_after_first_load(make_wav, tmp_path):
+    path = make_wav(np.sin(np.linspace(0, 1000, 8000 * 5)))
+    digest = file_digest(path)
+    cache = WaveformCache(tmp_path / "peaks")
+
+    first = load_peaks(path, digest, cache)
+    path.unlink()  # the second load must not decode the file
+    second = load_peaks(path, digest, cache)
+
+    assert isinstance(second.levels[BASE_BUCKET], np.memmap)
+    np.testing.assert_array_equal(second.levels[BASE_BUCKET], first.levels[BASE_BUCKET])
+
+
+def test_cache_should_remove_least_recently_used_peaks(tmp_path):
+    peaks = WaveformPeaks.from_base(np.zeros((MIN_PEAKS, 2), dtype=np.int8))
+    cache = WaveformCache(tmp_path / "peaks")
+    cache.store("a", peaks)
+    size = sum(path.stat().st_size for path in cache.directory.glob("*.npy"))
+    cache.max_bytes = 2 * size
+
+    cache.store("b", peaks)
+    os.utime(cache._path("b", BASE_BUCKET), (0, 0))
+    cache.store("c", peaks)
+
+    assert cache.load("a") is not None and cache.load("c") is not None
+    assert cache.load("b") is None
@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from kivy.app import App
+from kivy.uix.screenmanager import Screen
+
+if TYPE_CHECKING:
+    from models.session_manager import AudioSession
+    from models.write_behind import WriteBehindQueue
+    from utils.player_pool import PlayerPool
+
+
+class AppScreen(Screen):
+    """
+    Screen with access to the application state.
+
+    It doesn't import the database layer, so the main screen built before
+    the first frame doesn't have to wait for SQLAlchemy to load.
+    """
+
+    @property
+    def audio_session(self) -> Optional["AudioSession"]:
+        app = App.get_running_app()
+        return app.AUDIO_SESSION
+
+    @audio_session.setter
+    def audio_session(self, audio_session: "AudioSession") -> None:
+        app = App.get_running_app()
+        app.AUDIO_SESSION = audio_session
+
+    @property
+    def review_mode(self) -> bool:
+        app = App.get_running_app()
+        return app.REVIEW_MODE
+
+    @review_mode.setter
+    def review_mode(self, review_mode: bool) -> None:
+        app = App.get_running_app()
+        app.REVIEW_MODE = review_mode
+
+    @property
+    def library_revision(self) -> int:
+        """Number which changes every time an audio is added to the library."""
+        app = App.get_running_app()
+        return app.LIBRARY_REVISION
+
+    @property
+    def write_behind(self) -> "WriteBehindQueue":
+        app = App.get_running_app()
+        return app.WRITE_BEHIND
+
+    @property
+    def player_pool(self) -> "PlayerPool":
+        app = App.get_running_app()
+        return app.PLAYER_POOL
+
+    def get_audio_file(self) -> Optional[Path]:  # ? Path | str
+        app = App.get_running_app()
+        return app.AUDIO_SESSION.file_path if app.AUDIO_SESSION else None
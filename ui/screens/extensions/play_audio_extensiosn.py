@@ -6,22 +6,27 @@ from typing import List, Optional
 from kivy.clock import Clock
 
 from utils.decorators import update_time_stamp_label
+from utils.playback_clock import PlaybackClock
 from utils.tools import format_time
 
 
 class EventEnum(StrEnum):
     UPDATE_EVENT = "update_event"
     TIME_STAMP_CONTROL = "time_stamp_control"
-    DURATION_TIME_EVENT = "duration_time_event"
 
 
 class PlayAudioEvent:
     """Helper class to manage events for PlayAudioScreen instance."""
 
+    # the clock may wake up a little before the segment end, it is close enough
+    SEGMENT_END_TOLERANCE = 0.005
+
     def __init__(self):
-        self.update_event = None  # Event to update the progress bar
-        self.time_stamp_control = None  # Event to control the time stamp
-        self.duration_time_event = None  # Event to track playback duration
+        self.update_event = None  # Event to tick the playback clock
+        self.time_stamp_control = None  # Event to stop at the end of the segment
+        self.playback_clock: Optional[PlaybackClock] = None
+        self.segment_end: Optional[float] = None
+        self.shown_second: Optional[int] = None
 
     def cancel_events(self, events: Optional[List[EventEnum]] = None) -> None:
         """Cancel specified events or all events if none are specified."""
@@ -33,57 +38,124 @@ class PlayAudioEvent:
                 event.cancel()
                 setattr(self, event_name, None)
 
-    def start_play_event(
-        self, tm_update_e: float = 0.1, t_duration_time_e: float = 1.0
-    ) -> None:
-        """Start events for updating progress bar and tracking playback duration."""
-        self.update_event = Clock.schedule_interval(
-            self.update_progress_bar, tm_update_e
-        )
-        self.duration_time_event = Clock.schedule_interval(
-            self.count_duration, t_duration_time_e
-        )
+    def create_playback_clock(self) -> None:
+        """Create the clock which shares the position of the audio player."""
+        self.playback_clock = PlaybackClock(self.audio_player.get_position)
+        self.playback_clock.subscribe(self.update_progress_bar)
+        self.playback_clock.subscribe(self.count_duration)
+
+    def start_play_event(self, interval: float = 0.1) -> None:
+        """Tick the playback clock while the audio is playing."""
+        self.cancel_events([EventEnum.UPDATE_EVENT])
+        self.playback_clock.start()
+        self.update_event = Clock.schedule_interval(self.on_playback_tick, interval)
+
+    def stop_play_event(self) -> None:
+        """Stop the playback clock and count the time played since its last tick."""
+        self.cancel_events([EventEnum.UPDATE_EVENT])
+        if self.playback_clock:
+            self.playback_clock.stop()
+            self.count_duration()
+
+    def on_playback_tick(self, dt):
+        self.playback_clock.tick()
+
+    def count_duration(self, position: Optional[float] = None):
+        """
+        Add the whole seconds played so far to the spent time counter of the
+        audio and to the dwell time of the current segment.
+        """
+        seconds = self.playback_clock.take_played_seconds()
+        if seconds:
+            self.current_audio_session.spend_time += seconds
+            self.current_audio_session.track_segment_practice(
+                self.time_stamp.stamp, self.segment_end, dwell=seconds
+            )
 
-    def count_duration(self, dt):
-        """Increase the spent time counter while audio is playing."""
-        if self.audio_player.sound.state == "play":
-            self.current_audio_session.spend_time += 1
+    def count_segment_play(self) -> None:
+        """Count a play of the current segment when it plays from its start."""
+        if (
+            abs(self.audio_player.current_position - self.time_stamp.stamp)
+            <= self.SEGMENT_END_TOLERANCE
+        ):
+            self.current_audio_session.track_segment_practice(
+                self.time_stamp.stamp, self.segment_end, plays=1
+            )
+
+    def schedule_segment_end(self, position: Optional[float] = None) -> None:
+        """
+        Arm a single timer which fires when the playback reaches the segment end.
+
+        Kivy sounds do not report their position, so the remaining time is
+        computed from the position and the speed of the player, and the timer
+        is armed again if it fires early. Nothing runs while the audio is paused.
+        A time-stretched part of a long segment ends before the segment, then
+        the timer fires at the end of the part.
+        """
+        self.cancel_events([EventEnum.TIME_STAMP_CONTROL])
+        end = self.segment_end
+        sound_end = self.audio_player.sound_end
+        if sound_end is not None and sound_end < (
+            (end or self.audio_player.sound_length) - self.SEGMENT_END_TOLERANCE
+        ):
+            end = sound_end
+        if end is None:
+            return
+        if position is None:
+            position = self.audio_player.get_position()
+        self.time_stamp_control = Clock.schedule_once(
+            partial(self.control_time, end),
+            max(0.0, (end - position) / self.audio_player.rate),
+        )
 
     @update_time_stamp_label
     def control_time(self, end, dt):
-        """Control the audio time stamp and pause if the end is reached."""
-        if self.audio_player.sound:
-            self.audio_player.current_position = self.audio_player.get_position()
-            if self.audio_player.current_position >= end:
-                if self.audio_player.sound.state == "play":
-                    self.time_stamp.time_stamp_index += 1
-                    self.pause()
-                    self.timer_guard()
-
-    def update_progress_bar(self, dt):
-        """Update the progress bar based on the current audio position."""
-        if not self.audio_player:
+        """
+        Pause the audio at the end of the segment and select the next one,
+        or go on with the next time-stretched part of the segment.
+        """
+        self.time_stamp_control = None
+        if not self.audio_player.sound or not self.audio_player.is_playing:
             return
 
-        if self.audio_player.sound:
-            current_pos = self.audio_player.get_position()
-            self.ids.progress_bar.value = current_pos
-            self.ids.current_time.text = format_time(current_pos)
+        position = self.audio_player.get_position()
+        if position < end - self.SEGMENT_END_TOLERANCE:
+            self.schedule_segment_end(position)
+            return
+        if end != self.segment_end:
+            self.stop_play_event()
+            self.audio_player.stop_segment()
+            self.play()  # the next part of the segment
+            return
 
-            if self.audio_player.is_finished():
-                self.pause()
-                self.current_audio_session.finished_times += 1
+        if not self.is_reviewing:  # the reviewed segment waits for its grade
+            self.time_stamp.time_stamp_index += 1
+        self.pause()
+        self.audio_player.current_position = self.timer_guard()
+
+    def show_position(self, position: float) -> None:
+        """Move the progress bar, the time label changes only every second."""
+        self.ids.progress_bar.value = position
+        second = int(position)
+        if second != self.shown_second:
+            self.shown_second = second
+            self.ids.current_time.text = format_time(position)
+
+    def update_progress_bar(self, position: float):
+        """Show the playback position and pause at the end of the audio."""
+        self.show_position(position)
+        if position >= self.audio_player.sound_length:
+            self.pause()
+            self.current_audio_session.finished_times += 1
 
     @update_time_stamp_label
     def timer_guard(self) -> float:
-        """Ensure time stamp control is active and schedule time control event."""
-        if self.time_stamp_control:
-            print("Timer guard cancelled")
-            self.cancel_events(["time_stamp_control"])
-
-        start, end = self.time_stamp.range()
-        if end is not None:
-            self.time_stamp_control = Clock.schedule_interval(
-                partial(self.control_time, end), 0.1
-            )
+        """
+        Select the range of the current time stamp for the segment control.
+
+        Returns:
+            float: Start of the segment.
+        """
+        self.cancel_events([EventEnum.TIME_STAMP_CONTROL])
+        start, self.segment_end = self.time_stamp.range()
         return start
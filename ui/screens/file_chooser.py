@@ -1,13 +1,22 @@
+import threading
+from concurrent.futures import Future
+from functools import partial
 from pathlib import Path
 
-from kivy.lang.builder import Builder
+from kivy.app import App
+from kivy.clock import mainthread
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.importer import IMPORT_EXECUTOR, ImportProgress, import_folder
+from utils.kivy_extensions import ProgressPopup, message_box_info
+from utils.kv_cache import load_kv
 
 from . import KIVY_FILE
 from .manager_screen import ManagerScreen
 
 FCH_KIVY = Path("file_chooser.kv")
 
-Builder.load_file(str(KIVY_FILE / FCH_KIVY))
+load_kv(KIVY_FILE / FCH_KIVY)
 
 
 class FileChooser(ManagerScreen):
@@ -25,15 +34,71 @@ class FileChooser(ManagerScreen):
     def choose(self):
         """
         This method performs the following steps:
-            1. Sets the selected audio file.
+            1. Hashes and stores the selected audio file in the background.
             2. Retrieves or creates an audio object based on the selected file.
             3. Sets the audio session with the retrieved or created audio object.
             4. Switches the current screen to the main screen.
         """
+        audio_path = Path(self.ids.file_chooser.selection[0])
+        self.ids.choose_button.disabled = True
+        future = IMPORT_EXECUTOR.submit(self.store_audio_file, audio_path)
+        future.add_done_callback(partial(self._on_file_stored, audio_path))
+
+    @mainthread
+    def _on_file_stored(self, audio_path: Path, future: Future) -> None:
+        self.ids.choose_button.disabled = not self.ids.file_chooser.selection
+        try:
+            audio = self.open_stored_audio(audio_path, *future.result())
+        except (OSError, SQLAlchemyError) as e:
+            message_box_info(f"Could not open {audio_path.name}: {e}")
+            return
 
-        audio = self.get_or_create_audio(Path(self.ids.file_chooser.selection[0]))
         self.audio_session = audio
         self.manager.current = "main_screen"
 
+    def choose_folder(self):
+        """
+        Import every audio file from the current folder and its subfolders in
+        the background, the popup shows the progress.
+        """
+        directory = Path(self.ids.file_chooser.path)
+        cancel = threading.Event()
+        popup = ProgressPopup(f"Importing {directory.name}", on_cancel=cancel.set)
+        popup.open()
+        future = IMPORT_EXECUTOR.submit(
+            import_folder,
+            directory,
+            on_progress=partial(self._on_import_progress, popup),
+            cancel=cancel,
+        )
+        future.add_done_callback(partial(self._on_folder_imported, popup))
+
+    @staticmethod
+    def _on_import_progress(popup: ProgressPopup, progress: ImportProgress) -> None:
+        # every file would schedule a redraw, a few per second are enough
+        if progress.done % 20 == 0 or progress.done == progress.total:
+            popup.update(progress.fraction, f"{progress.done} / {progress.total} files")
+
+    @mainthread
+    def _on_folder_imported(self, popup: ProgressPopup, future: Future) -> None:
+        popup.dismiss()
+        try:
+            progress = future.result()
+        except (OSError, SQLAlchemyError) as e:
+            message_box_info(f"Import failed: {e}")
+            return
+
+        if progress.imported:
+            App.get_running_app().LIBRARY_REVISION += 1
+        summary = (
+            f"Imported {progress.imported} audios, "
+            f"{progress.skipped} were already in the library."
+        )
+        if progress.failed:
+            summary += f"\n{len(progress.failed)} files could not be imported."
+        if progress.cancelled:
+            summary += "\nThe import was cancelled, start it again to continue."
+        message_box_info(summary)
+
     def cancel(self):
         self.manager.current = "main_screen"
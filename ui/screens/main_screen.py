@@ -1,16 +1,16 @@
 from pathlib import Path
 
-from kivy.lang.builder import Builder
+from utils.kv_cache import load_kv
 
 from . import KIVY_FILE
-from .manager_screen import ManagerScreen
+from .app_screen import AppScreen
 
 M_KIVY = Path("main_screen.kv")
 
-Builder.load_file(str(KIVY_FILE / M_KIVY))
+load_kv(KIVY_FILE / M_KIVY)
 
 
-class MainScreen(ManagerScreen):
+class MainScreen(AppScreen):
     def on_enter(self, *args):
         audio_file = self.get_audio_file()
         if not audio_file:
@@ -26,4 +26,10 @@ class MainScreen(ManagerScreen):
         self.manager.current = "file_chooser_screen"
 
     def play(self):
+        self.review_mode = False
+        self.manager.current = "play_audio_screen"
+
+    def review(self):
+        """Practice the segments of the library which are due for review."""
+        self.review_mode = True
         self.manager.current = "play_audio_screen"
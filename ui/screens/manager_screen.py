@@ -1,58 +1,72 @@
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Optional
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
 
 from kivy.app import App
-from kivy.uix.screenmanager import Screen
 from sqlalchemy import select
-
-from models.models import AudioModel
-from models.session_manager import AudioSession, DataBaseSessionManager
-from utils.file import copy_file
+from sqlalchemy.orm import Session
+
+from models.library import add_recording, list_audio_page, save_scores
+from models.models import AudioModel, TimeStampModel
+from models.review import DueSegment, due_segments, grade_review
+from models.search import search_audio
+from models.session_manager import AudioSession, AudioSummary, DataBaseSessionManager
+from utils.file import file_digest, source_path, store_file
 from utils.kivy_extensions import message_box_info
+from utils.recorder import Take
+from utils.scoring import Scores
+
+from .app_screen import AppScreen
 
 
-class ManagerScreen(Screen):
+class ManagerScreen(AppScreen):
     # these fields are neccessary to create AudioSession
     FIELD_TO_SESSION = (
         AudioModel.id,
         AudioModel.name,
         AudioModel.file_path,
-        AudioModel.time_stamp,
         AudioModel.spend_time,
         AudioModel.finished_times,
         AudioModel.duration,
+        AudioModel.digest,
     )
 
+    # how long reads wait for the queued changes to be saved, they usually
+    # take milliseconds, longer only while the database is locked
+    PENDING_WRITES_TIMEOUT = 1.0
+
     def __init__(self, *args, **kw):
         super().__init__(*args, **kw)
 
-    @property
-    def audio_session(self) -> Optional[AudioSession]:
-        app = App.get_running_app()
-        return app.AUDIO_SESSION
-
-    @audio_session.setter
-    def audio_session(self, audio_session: AudioSession) -> None:
-        app = App.get_running_app()
-        app.AUDIO_SESSION = audio_session
-
-    def get_audio_file(self) -> Optional[Path]:  # ? Path | str
-        app = App.get_running_app()
-        return app.AUDIO_SESSION.file_path if app.AUDIO_SESSION else None
-
-    def update_audio_session(self, new_audio_session: AudioSession) -> None:
-        difference = self.audio_session.diff(new_audio_session)
-        if difference:
-            self.audio_session = new_audio_session
-            self.update_audio(new_audio_session.id, difference)
-
-    def create_audio(self, file_path: Path, *args) -> AudioSession:
+    def update_audio_session(self, audio_session: AudioSession) -> None:
+        """
+        Queue the changes recorded by the audio session since the last save.
+        They are written to the database in the background by `write_behind`.
+        """
+        self.write_behind.submit(audio_session.pop_changes())
+
+    def wait_for_pending_writes(self) -> None:
+        """Make sure the queued changes are saved before reading audio stats."""
+        if self.write_behind.has_pending():
+            self.write_behind.flush(timeout=self.PENDING_WRITES_TIMEOUT)
+
+    def create_audio(
+        self,
+        file_path: Path,
+        name: Optional[str] = None,
+        digest: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> AudioSession:
         with DataBaseSessionManager() as session:
             audio = AudioModel(
-                name=str(file_path.name), file_path=str(file_path), time_stamp=""
+                name=name or str(file_path.name),
+                file_path=str(file_path),
+                source_path=source,
+                digest=digest,
             )
             session.add(audio)
             session.commit()
+            App.get_running_app().LIBRARY_REVISION += 1
             return AudioSession(
                 id=audio.id,
                 name=audio.name,
@@ -61,40 +75,144 @@ class ManagerScreen(Screen):
                 spend_time=audio.spend_time,
                 finished_times=audio.finished_times,
                 duration=audio.duration,
+                digest=audio.digest,
             )
 
+    def save_recording(
+        self, audio_id: int, start: float, end: Optional[float], take: Take
+    ) -> int:
+        """Index the recorded take of the segment in the database."""
+        with DataBaseSessionManager() as session:
+            return add_recording(
+                session, audio_id, start, end, str(take.file_path), take.duration
+            )
+
+    def save_scores(self, recording_id: int, scores: Scores) -> None:
+        with DataBaseSessionManager() as session:
+            save_scores(session, recording_id, scores.timing, scores.intonation)
+
+    def get_due_segments(
+        self, limit: int, exclude: Collection[int] = ()
+    ) -> List[DueSegment]:
+        """
+        Return the segments of the library due for review, the oldest first.
+
+        The queued changes are only written now, not waited for: segments
+        added a moment ago come with the next batch of the review.
+        """
+        self.write_behind.flush(timeout=0)
+        with DataBaseSessionManager() as session:
+            return due_segments(session, limit, exclude=exclude)
+
+    def grade_review(self, review_id: int, grade: int) -> None:
+        """Schedule the next review of the segment."""
+        with DataBaseSessionManager() as session:
+            grade_review(session, review_id, grade)
+
     def update_audio(self, pk: int, update_columns: dict):
         with DataBaseSessionManager() as session:
             session.query(AudioModel).filter(AudioModel.id == pk).update(update_columns)
             session.commit()
 
-    def list_audio(self) -> List[AudioSession]:
-        stmt = select(*self.FIELD_TO_SESSION).order_by(AudioModel.added)
+    @staticmethod
+    def get_time_stamps(
+        session: Session, audio_ids: Iterable[int]
+    ) -> Dict[int, List[float]]:
+        """Return sorted time stamps of the given audios grouped by audio id."""
+        stmt = (
+            select(TimeStampModel.audio_id, TimeStampModel.position)
+            .where(TimeStampModel.audio_id.in_(audio_ids))
+            .order_by(TimeStampModel.audio_id, TimeStampModel.position)
+        )
+        time_stamps = defaultdict(list)
+        for audio_id, position in session.execute(stmt):
+            time_stamps[audio_id].append(position)
+        return time_stamps
+
+    def list_audio_page(
+        self, after: Optional[AudioSummary] = None, limit: int = 50
+    ) -> List[AudioSummary]:
+        """Return the next page of the library ordered by the date it was added."""
+        with DataBaseSessionManager() as session:
+            return list_audio_page(session, after, limit)
 
-        results = []
+    def search_audio(self, query: str, limit: int = 50) -> List[AudioSummary]:
+        """Return audios whose name, path or transcript match the query."""
         with DataBaseSessionManager() as session:
-            for row in session.execute(stmt).all():
-                results.append(AudioSession.parse_data(row._asdict()))
+            return search_audio(session, query, limit)
 
-        return results
+    def get_audio(self, pk: int) -> Optional[AudioSession]:
+        return self._get_audio_session(AudioModel.id == pk)
+
+    def get_audio_source(self, pk: int) -> Optional[Tuple[Path, Optional[str]]]:
+        """Return the path of the audio file and its stored digest."""
+        with DataBaseSessionManager() as session:
+            row = session.execute(
+                select(AudioModel.file_path, AudioModel.digest).where(
+                    AudioModel.id == pk
+                )
+            ).first()
+        return (Path(row.file_path), row.digest) if row else None
 
     def find_audio(self, audio_name: str) -> Optional[AudioSession]:
-        stmt = select(*self.FIELD_TO_SESSION).where(AudioModel.name == audio_name)
+        return self._get_audio_session(AudioModel.name == audio_name)
+
+    def find_audio_by_digest(self, digest: str) -> Optional[AudioSession]:
+        return self._get_audio_session(AudioModel.digest == digest)
+
+    def _get_audio_session(self, where_clause) -> Optional[AudioSession]:
+        stmt = select(*self.FIELD_TO_SESSION).where(where_clause)
 
+        self.wait_for_pending_writes()
         with DataBaseSessionManager() as session:
             audio = session.execute(stmt).first()
-            return AudioSession.parse_data(audio._asdict()) if audio else None
+            if audio is None:
+                return None
+            time_stamps = self.get_time_stamps(session, [audio.id])
+            return AudioSession.parse_data(
+                {**audio._asdict(), "time_stamp": time_stamps.get(audio.id)}
+            )
 
-    def get_or_create_audio(self, audio_path: Path) -> AudioSession:
-        audio = self.find_audio(audio_path.name)
-        if audio is None:
-            # copy audio to audio file
-            audio_path = copy_file(audio_path)
-            if not audio_path:
-                raise IOError("Could not create audio")
-            audio = self.create_audio(audio_path)
-        else:
-            message_box_info(
-                "Audio already exists in the database and stats will be imported."
+    def store_audio_file(self, audio_path: Path) -> Tuple[str, Optional[Path]]:
+        """
+        Return the digest of the file and the path it was stored at, or None
+        when the same content is already in the library.
+
+        Hashing and copying a large file takes long, the UI runs this on
+        `IMPORT_EXECUTOR` and adds the audio with `open_stored_audio`.
+        """
+        digest = file_digest(audio_path)
+        with DataBaseSessionManager() as session:
+            exists = session.scalar(
+                select(AudioModel.id).where(AudioModel.digest == digest)
             )
-        return audio
+        if exists is not None:
+            return digest, None
+        return digest, store_file(audio_path, digest=digest)
+
+    def open_stored_audio(
+        self, audio_path: Path, digest: str, stored_path: Optional[Path]
+    ) -> AudioSession:
+        """Return the audio from `store_audio_file`, add it if it was stored."""
+        if stored_path is None:
+            audio = self.find_audio_by_digest(digest)
+            if audio is not None:
+                message_box_info(
+                    "Audio already exists in the database and stats will be imported."
+                )
+                return audio
+            # removed from the library since it was looked up
+            stored_path = store_file(audio_path, digest=digest)
+        return self.create_audio(
+            stored_path,
+            name=audio_path.name,
+            digest=digest,
+            source=source_path(audio_path),
+        )
+
+    def get_or_create_audio(self, audio_path: Path) -> AudioSession:
+        """
+        Return the audio with the same content or add the file to the library.
+        The audio is recognised by the digest of its content, not by its name.
+        """
+        return self.open_stored_audio(audio_path, *self.store_audio_file(audio_path))
@@ -1,50 +1,117 @@
-from copy import deepcopy
+import bisect
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Deque, Literal, Optional, Tuple
 
+from kivy.clock import mainthread
 from kivy.core.window import Window
-from kivy.lang.builder import Builder
+from kivy.logger import Logger
+from kivy.properties import BooleanProperty, NumericProperty
 
+from models.review import EASY, FORGOTTEN, GOOD, HARD, DueSegment
+from models.session_manager import AudioSession
+from ui.widgets import WaveformView  # noqa: F401
 from utils.audio import AudioPlayer, TimeStampManager
 from utils.decorators import update_time_stamp_label
 from utils.enums import KeyboardEnum
 from utils.kivy_extensions import message_box_info
+from utils.kv_cache import load_kv
+from utils.pcm import AudioDecodeError
+from utils.pcm_cache import PCM_EXECUTOR
+from utils.recorder import Recorder, RecorderError
+from utils.scoring import MAX_SCORED_SECONDS, SCORING_EXECUTOR, score_take
+from utils.segmentation import (
+    SEGMENTATION_EXECUTOR,
+    SegmentationSettings,
+    detect_boundaries,
+)
 from utils.tools import format_time
+from utils.waveform import WAVEFORM_EXECUTOR, load_peaks
 
 from . import KIVY_FILE
 from .extensions import EventEnum, PlayAudioEvent
 from .manager_screen import ManagerScreen
 
 PLS_KIVY = Path("play_audio_screen.kv")
-Builder.load_file(str(KIVY_FILE / PLS_KIVY))
+load_kv(KIVY_FILE / PLS_KIVY)
 
 
 class PlayAudioScreen(ManagerScreen, PlayAudioEvent):
+    SEGMENTATION_SETTINGS = SegmentationSettings()
+    # due segments read from the database at once
+    REVIEW_BATCH = 20
+    # upcoming segments of the review whose audio is loaded in advance
+    REVIEW_PREFETCH = 3
+    REVIEW_GRADES = {
+        KeyboardEnum.ONE: FORGOTTEN,
+        KeyboardEnum.TWO: HARD,
+        KeyboardEnum.THREE: GOOD,
+        KeyboardEnum.FOUR: EASY,
+    }
+    # speeds the learner can choose, segments are time-stretched to them
+    SPEEDS = (0.5, 0.75, 1.0, 1.25, 1.5)
+    # long segments are time-stretched this many seconds at a time, the next
+    # part is rendered while one plays
+    STRETCH_SECONDS = 20.0
+    # the controls are disabled until the sound is loaded
+    is_loading = BooleanProperty(False)
+    # the due segments of the library are played instead of the chosen audio
+    is_reviewing = BooleanProperty(False)
+    speed = NumericProperty(1.0)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.audio_player: Optional[AudioPlayer] = None
+        self.current_audio_session: Optional[AudioSession] = None
         self.time_stamp: Optional[TimeStampManager] = None
+        self.sound_loading: Optional[Future] = None
+        self.recorder = Recorder()
+        self.review_queue: Deque[DueSegment] = deque()
+        # the recording starts together with the playback of the segment
+        self.record_on_play = False
 
     @update_time_stamp_label
     def on_enter(self, *args):
         """Initialize the screen and load the audio file when entered."""
         self.cancel_events()
         super().on_enter(*args)
+        Window.bind(on_key_down=self.on_key_press)
 
-        self.current_audio_session = deepcopy(self.audio_session)
+        if self.review_mode:
+            self.current_audio_session = None
+            self.start_review()
+            return
+        self.current_audio_session = self.audio_session
         self.load_sound(self.get_audio_file())
-        Window.bind(on_key_down=self.on_key_press)
+        self.load_waveform(self.get_audio_file())
 
     def on_leave(self, *args):
         """Cleanup when leaving the screen, including unbinding key events."""
         Window.unbind(on_key_down=self.on_key_press)
-        self.current_audio_session.time_stamp = self.time_stamp.time_stamp_list
-        self.update_audio_session(self.current_audio_session)
+        self.is_reviewing = self.review_mode = self.record_on_play = False
+        self.review_queue.clear()
+        self.cancel_loading()
+        self.player_pool.release()
+        self.recorder.stop()
+        if self.audio_player:
+            # the player stays in the pool, so it must be ready for the next use
+            self.audio_player.stop_segment()
+            self.audio_player.stop()
+            self.ids.loop_button.text = "Loop"
+        if self.current_audio_session:
+            self.update_audio_session(self.current_audio_session)
 
         super().on_leave(*args)
 
     def on_key_press(self, instance, key, *args):
         """Handle key press events for audio control."""
+        if self.is_loading:
+            return
         key_actions = {
             KeyboardEnum.LEFT: self.reverse,
             KeyboardEnum.RIGHT: self.next,
@@ -52,7 +119,17 @@ class PlayAudioScreen(ManagerScreen, PlayAudioEvent):
             KeyboardEnum.DOWN: self.set_time_stamp,
             KeyboardEnum.SPACE: self.pause,
             KeyboardEnum.R: self.remove_time_stamp,
+            KeyboardEnum.A: self.auto_segment,
+            KeyboardEnum.L: self.toggle_loop,
+            KeyboardEnum.V: self.toggle_record,
+            KeyboardEnum.MINUS: partial(self.change_speed, -1),
+            KeyboardEnum.EQUAL: partial(self.change_speed, 1),
         }
+        if self.is_reviewing:
+            key_actions.update(
+                (key, partial(self.grade_segment, grade))
+                for key, grade in self.REVIEW_GRADES.items()
+            )
         print(key)
         action = key_actions.get(key)
         if action:
@@ -60,22 +137,80 @@ class PlayAudioScreen(ManagerScreen, PlayAudioEvent):
 
     def is_playing(self) -> bool:
         """Check if the audio is currently playing."""
-        return self.audio_player.sound and self.audio_player.sound.state == "play"
+        return bool(
+            self.audio_player
+            and self.audio_player.sound
+            and self.audio_player.is_playing
+        )
 
-    def load_sound(self, file_path: Path):
-        """Load an audio file and initialize the player."""
+    def load_sound(self, file_path: Path) -> Future:
+        """
+        Load the audio file in the background, the screen shows the loading
+        state until the player is ready.
+        """
+        self.cancel_loading()
+        self.audio_player = None
         self.time_stamp = TimeStampManager(self.current_audio_session)
-        self.audio_player = AudioPlayer(file_path, self.time_stamp.stamp)
+        self.is_loading = True
+        self.ids.title.text = f"Loading {file_path.name}..."
+
+        future = self.player_pool.get(file_path, self.current_audio_session.digest)
+        self.sound_loading = future
+        future.add_done_callback(partial(self._on_sound_loaded, file_path))
+        return future
+
+    def cancel_loading(self) -> None:
+        """Stop loading the sound, a sound which is already loading is unloaded."""
+        future, self.sound_loading = self.sound_loading, None
+        if future is not None and not future.done():
+            self.player_pool.discard(future)
+        self.is_loading = False
+
+    @mainthread
+    def _on_sound_loaded(self, file_path: Path, future: Future) -> None:
+        if future is not self.sound_loading:
+            return  # cancelled, the player is unloaded by the pool
+        self.sound_loading = None
+        self.is_loading = False
+        self.ids.title.text = file_path.name
+        try:
+            self.audio_player = future.result()
+        except ValueError as e:
+            message_box_info(f"Could not load the audio: {e}")
+            return
+
+        self.audio_player.current_position = self.time_stamp.stamp
+        self.timer_guard()
+        self.create_playback_clock()
 
         # Ustawienie pozycji na ostatni time stamp
-        self.ids.progress_bar.value = self.audio_player.current_position
-        self.ids.current_time.text = format_time(self.audio_player.current_position)
+        self.shown_second = None
+        self.show_position(self.audio_player.current_position)
 
         # set layout after load audio
         length = self.audio_player.sound_length
         self.current_audio_session.duration = length
         self.ids.progress_bar.max = length
         self.ids.total_time.text = format_time(length)
+        if self.is_reviewing:
+            self.play()
+
+    def load_waveform(self, file_path: Path) -> None:
+        """Load the waveform peaks in the background and draw them when ready."""
+        self.ids.waveform.peaks = None
+        # the stored digest saves hashing the whole file again
+        digest = self.current_audio_session and self.current_audio_session.digest
+        future = WAVEFORM_EXECUTOR.submit(load_peaks, file_path, digest)
+        future.add_done_callback(partial(self._on_waveform_loaded, file_path))
+
+    @mainthread
+    def _on_waveform_loaded(self, file_path: Path, future: Future) -> None:
+        if file_path != self.get_audio_file():
+            return  # another audio was opened in the meantime
+        try:
+            self.ids.waveform.peaks = future.result()
+        except (AudioDecodeError, OSError) as e:
+            Logger.warning(f"Waveform: could not load peaks of {file_path}: {e}")
 
     @update_time_stamp_label
     def set_time_stamp(self):
@@ -85,10 +220,293 @@ class PlayAudioScreen(ManagerScreen, PlayAudioEvent):
             message_box_info("Time stamp already exists. You can't add it again.")
         self.pause()
 
+    def auto_segment(self) -> None:
+        """Detect pauses between sentences in another process and add time stamps."""
+        self.ids.auto_segment_button.disabled = True
+        file_path = self.get_audio_file()
+        future = SEGMENTATION_EXECUTOR.submit(
+            detect_boundaries, file_path, self.SEGMENTATION_SETTINGS
+        )
+        future.add_done_callback(partial(self._on_auto_segmented, file_path))
+
+    @mainthread
+    @update_time_stamp_label
+    def _on_auto_segmented(self, file_path: Path, future: Future) -> None:
+        self.ids.auto_segment_button.disabled = False
+        if file_path != self.get_audio_file():
+            return
+        try:
+            boundaries = future.result()
+        except (AudioDecodeError, OSError, BrokenProcessPool) as e:
+            message_box_info(f"Could not segment the audio: {e}")
+            return
+        added = self.time_stamp.add_time_stamps(boundaries)
+        message_box_info(f"Added {added} time stamps.")
+
+    def toggle_loop(self) -> None:
+        """Loop the current segment without gaps or go back to normal playback."""
+        if self.audio_player.is_looping:
+            self.audio_player.stop_segment()
+            self.ids.loop_button.text = "Loop"
+            self.navigate(0)
+            return
+
+        start, end = self.time_stamp.range()
+        length = (end or self.audio_player.sound_length) - start
+        if self.speed != 1 and length > self.STRETCH_SECONDS:
+            message_box_info(
+                f"Only segments up to {self.STRETCH_SECONDS:g} s loop at "
+                f"{self.speed:g}x, add a time stamp to shorten it."
+            )
+            return
+        self.ids.loop_button.disabled = True
+        self.cancel_events([EventEnum.TIME_STAMP_CONTROL])
+        self.render_segment(loop=True)
+
+    def stretched_part(self) -> Tuple[float, float]:
+        """
+        Return the part of the current segment with the current position which
+        is time-stretched at once. The whole audio before the first time stamp
+        is set, or any long segment, is stretched `STRETCH_SECONDS` at a time.
+        """
+        start, end = self.time_stamp.range()
+        if end is None:
+            end = self.audio_player.sound_length
+        offset = self.audio_player.current_position - start + self.SEGMENT_END_TOLERANCE
+        first = start + max(0, offset // self.STRETCH_SECONDS) * self.STRETCH_SECONDS
+        return first, min(end, first + self.STRETCH_SECONDS)
+
+    def render_segment(self, loop: bool = False) -> Future:
+        """Cut the current segment at the current speed in the background."""
+        start, end = self.time_stamp.range() if loop else self.stretched_part()
+        future = PCM_EXECUTOR.submit(
+            self.audio_player.pcm_cache.segment, start, end, self.speed
+        )
+        future.add_done_callback(
+            partial(
+                self._on_segment_ready,
+                self.audio_player,
+                start,
+                end,
+                self.speed,
+                loop,
+                self.audio_player.current_position,
+            )
+        )
+        return future
+
+    @mainthread
+    def _on_segment_ready(
+        self,
+        audio_player: AudioPlayer,
+        start: float,
+        end: float,
+        speed: float,
+        loop: bool,
+        position: float,
+        future: Future,
+    ) -> None:
+        self.ids.loop_button.disabled = False
+        if audio_player is not self.audio_player:
+            return  # another audio was opened in the meantime
+        try:
+            wav_path = future.result()
+            if loop:
+                audio_player.loop_segment(start, end, wav_path, speed)
+            else:
+                audio_player.use_segment(start, end, wav_path, speed, position=position)
+        except (AudioDecodeError, OSError, ValueError) as e:
+            self.record_on_play = False
+            message_box_info(f"Could not play the segment: {e}")
+            if self.is_playing():
+                self.schedule_segment_end()
+            return
+        if not loop:
+            self.play()
+            self.prefetch_stretched_part(end)
+            return
+        self.ids.loop_button.text = "Stop Loop"
+        self.ids.pause_button.disabled = False
+        self.start_play_event()
+
+    def prefetch_stretched_part(self, start: float) -> None:
+        """Render the part of the segment which follows the playing one."""
+        end = self.segment_end or self.audio_player.sound_length
+        if start < end - self.SEGMENT_END_TOLERANCE:
+            PCM_EXECUTOR.submit(
+                self.audio_player.pcm_cache.segment,
+                start,
+                min(end, start + self.STRETCH_SECONDS),
+                self.speed,
+            )
+
+    def change_speed(self, step: Literal[1, -1]) -> None:
+        """Play slower or faster, the segment keeps its pitch."""
+        index = self.SPEEDS.index(self.speed) + step
+        if not 0 <= index < len(self.SPEEDS):
+            return
+        self.speed = self.SPEEDS[index]
+        if self.audio_player is None:
+            return
+        if self.audio_player.is_looping:
+            self.audio_player.stop_segment()
+            self.ids.loop_button.text = "Loop"
+            self.toggle_loop()
+        elif self.is_playing():
+            self.pause()
+            self.play()
+
+    def toggle_record(self) -> None:
+        """Record the voice while the current segment plays, or stop recording."""
+        if self.recorder.is_recording:
+            self.recorder.stop()
+            return
+        self.record_on_play = True
+        self.navigate(0)  # the segment plays from its start while recording
+
+    def start_recording(self) -> None:
+        """Record the voice for as long as the current segment plays."""
+        start, end = self.time_stamp.range()
+        length = end if end is not None else self.audio_player.sound_length
+        audio_id = self.current_audio_session.id
+        file_name = (
+            f"{audio_id}-{round(start * 1000)}-{datetime.now():%Y%m%d-%H%M%S-%f}.wav"
+        )
+        try:
+            future = self.recorder.start(
+                file_name, duration=(length - start) / self.speed
+            )
+        except RecorderError as e:
+            message_box_info(f"Could not record the voice: {e}")
+            return
+        self.ids.record_button.text = "Stop Recording"
+        future.add_done_callback(partial(self._on_take_recorded, audio_id, start, end))
+
+    @mainthread
+    def _on_take_recorded(
+        self, audio_id: int, start: float, end: Optional[float], future: Future
+    ) -> None:
+        self.ids.record_button.text = "Record"
+        try:
+            take = future.result()
+        except (RecorderError, OSError) as e:
+            message_box_info(f"Could not record the voice: {e}")
+            return
+        recording_id = self.save_recording(audio_id, start, end, take)
+        if take.dropped:
+            Logger.warning(f"Recorder: {take.dropped:.2f} s of the take were dropped")
+
+        length = (end or self.audio_player.sound_length) - start
+        if max(length, take.duration) > MAX_SCORED_SECONDS:
+            message_box_info(
+                f"The take is saved, but only segments up to "
+                f"{MAX_SCORED_SECONDS:g} s are scored"
+            )
+            return
+        future = SCORING_EXECUTOR.submit(
+            score_take,
+            self.get_audio_file(),
+            start,
+            end,
+            take.file_path,
+            digest=self.current_audio_session.digest,
+        )
+        future.add_done_callback(partial(self._on_take_scored, recording_id))
+
+    @mainthread
+    def _on_take_scored(self, recording_id: int, future: Future) -> None:
+        try:
+            scores = future.result()
+        except (
+            AudioDecodeError,
+            OSError,
+            ValueError,
+            MemoryError,
+            BrokenProcessPool,
+        ) as e:
+            Logger.warning(f"Scoring: could not score the take: {e}")
+            return
+        self.save_scores(recording_id, scores)
+        message_box_info(
+            f"Timing: {scores.timing:.0f}/100\nIntonation: {scores.intonation:.0f}/100"
+        )
+
+    def start_review(self) -> None:
+        """Play the segments of the library which are due, one after another."""
+        self.review_queue = deque(self.get_due_segments(self.REVIEW_BATCH))
+        if not self.review_queue:
+            message_box_info("No segments are due for review")
+            self.back()
+            return
+        self.is_reviewing = True
+        self.show_review_segment()
+
+    @update_time_stamp_label
+    def show_review_segment(self) -> None:
+        """Play the first segment of the queue, loading its audio if needed."""
+        segment = self.review_queue[0]
+        session = self.current_audio_session
+        if session is not None and session.id == segment.audio_id:
+            self.select_segment(segment.start)
+            if self.audio_player:  # otherwise it plays once it's loaded
+                self.navigate(0)
+        else:
+            if session is not None:
+                self.update_audio_session(session)
+            if self.audio_player:
+                self.pause()
+            self.current_audio_session = self.audio_session = self.get_audio(
+                segment.audio_id
+            )
+            file_path = Path(segment.file_path)
+            self.load_sound(file_path)
+            self.load_waveform(file_path)
+            self.select_segment(segment.start)
+        self.prefetch_review_segments()
+
+    def select_segment(self, start: float) -> None:
+        """Select the time stamp which starts the segment."""
+        self.time_stamp.time_stamp_index = (
+            bisect.bisect_right(self.time_stamp.time_stamp_list, start) - 1
+        )
+
+    def prefetch_review_segments(self) -> None:
+        """Start loading the audio of the next segments of the review."""
+        current = self.get_audio_file()
+        upcoming = islice(self.review_queue, 1, 1 + self.REVIEW_PREFETCH)
+        digests = {Path(s.file_path): s.digest for s in upcoming}
+        for file_path, digest in digests.items():
+            if file_path == current:
+                continue
+            try:
+                self.player_pool.prefetch(file_path, digest)
+            except OSError as e:
+                Logger.warning(f"Review: could not prefetch {file_path}: {e}")
+
+    def grade_segment(self, grade: int) -> None:
+        """Schedule the next review of the current segment and go to the next one."""
+        if not self.is_reviewing or self.is_loading:
+            return
+        segment = self.review_queue.popleft()
+        self.grade_review(segment.id, grade)
+        if len(self.review_queue) <= self.REVIEW_PREFETCH:
+            queued = {s.id for s in self.review_queue} | {segment.id}
+            self.review_queue.extend(
+                self.get_due_segments(self.REVIEW_BATCH, exclude=queued)
+            )
+        if not self.review_queue:
+            self.pause()
+            self.is_reviewing = self.review_mode = False
+            message_box_info("All due segments are reviewed!")
+            return
+        self.show_review_segment()
+
     def back(self):
         """Stop playback and return to the main screen."""
+        self.cancel_loading()
         if self.is_playing():
             self.audio_player.stop()
+        self.stop_play_event()
         self.cancel_events()
 
         self.manager.current = "main_screen"
@@ -97,19 +515,27 @@ class PlayAudioScreen(ManagerScreen, PlayAudioEvent):
         """Save the current audio session."""
         if self.is_playing():
             self.audio_player.stop()
+            self.stop_play_event()
             self.cancel_events()
-        self.current_audio_session.time_stamp = self.time_stamp.time_stamp_list
         self.update_audio_session(self.current_audio_session)
-        self.current_audio_session = deepcopy(self.get_audio_session())
 
         message_box_info("Saved!")
 
     def play(self):
         """Start audio playback and enable the pause button."""
+        if self.speed != 1 and not self.audio_player.is_segment:
+            self.render_segment()  # it plays once it's time-stretched
+            return
         if not self.is_playing():
             self.ids.pause_button.disabled = False
+        self.count_segment_play()
         self.audio_player.play()
+        if self.record_on_play:
+            self.record_on_play = False
+            self.start_recording()
         self.start_play_event()
+        if not self.audio_player.is_looping:
+            self.schedule_segment_end(self.audio_player.current_position)
 
     def pause(self) -> None:
         """
@@ -118,12 +544,39 @@ class PlayAudioScreen(ManagerScreen, PlayAudioEvent):
         if self.is_playing():
             self.ids.pause_button.disabled = True
             self.audio_player.pause()
+            if not self.audio_player.is_looping:
+                self.audio_player.stop_segment()
+
+            self.stop_play_event()
+            self.cancel_events([EventEnum.TIME_STAMP_CONTROL])
+
+    @update_time_stamp_label
+    def seek(self, position: float) -> None:
+        """Move the playback to the position chosen on the progress bar."""
+        if not self.audio_player or not self.audio_player.sound:
+            return
+        playing = self.is_playing()
+        if self.audio_player.is_segment:
+            self.audio_player.stop_segment()
+            self.ids.loop_button.text = "Loop"
+        elif playing:
+            self.audio_player.stop()
 
-            self.cancel_events([EventEnum.DURATION_TIME_EVENT, EventEnum.UPDATE_EVENT])
+        self.time_stamp.time_stamp_index = (
+            bisect.bisect_right(self.time_stamp.time_stamp_list, position) - 1
+        )
+        self.timer_guard()
+        self.audio_player.current_position = position
+        self.show_position(position)
+        if playing:
+            self.play()
 
     def navigate(self, direction: Literal[1, -1]) -> None:
         """Navigate through the audio playback based on the given direction."""
         if self.audio_player.sound:
+            if self.audio_player.is_segment:
+                self.audio_player.stop_segment()
+                self.ids.loop_button.text = "Loop"
             self.time_stamp.time_stamp_index += direction
             if self.audio_player.sound.state == "play":
                 self.audio_player.stop()
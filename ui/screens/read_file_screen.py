@@ -1,73 +1,181 @@
+from concurrent.futures import Future
+from functools import partial
 from pathlib import Path
+from typing import Optional
 
-from kivy.lang.builder import Builder
+from kivy.clock import Clock, mainthread
+from kivy.logger import Logger
+from kivy.properties import BooleanProperty, NumericProperty, ObjectProperty
 from kivy.uix.button import Button
-from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from sqlalchemy.exc import SQLAlchemyError
 
-from utils.file import DEFAULT_AUDIO_KEEPER
+from models.search import SEARCH_EXECUTOR
+from models.session_manager import AudioSummary
+from utils.kv_cache import load_kv
 
 from . import KIVY_FILE
 from .manager_screen import ManagerScreen
 
 RFS_KIVY = Path("read_file_screen.kv")
 
-Builder.load_file(str(KIVY_FILE / RFS_KIVY))
+load_kv(KIVY_FILE / RFS_KIVY)
+
+
+class AudioRow(RecycleDataViewBehavior, Button):
+    """Row of the library list. Only rows visible on the screen are created."""
+
+    index = NumericProperty(0)
+    audio_id = NumericProperty(0)
+    selected = BooleanProperty(False)
+    list_view = ObjectProperty(None, allownone=True)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.index = index
+        self.list_view = rv
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_press(self):
+        self.list_view.select(self.index)
+
+
+class AudioListView(RecycleView):
+    """
+    RecycleView of the library.
+
+    Dispatches `on_load_more` when the user scrolls close to the end of the list.
+    """
+
+    # data of the selected row
+    selected = ObjectProperty(None, allownone=True)
+    # scroll_y below which the next page is requested
+    load_more_at = NumericProperty(0.1)
+
+    __events__ = ("on_load_more",)
+
+    def select(self, index: int) -> None:
+        """Select the row with the given index or deselect it if it's selected."""
+        item = self.data[index]
+        if self.selected is not None:
+            self.selected["selected"] = False
+        self.selected = None if item is self.selected else item
+        if self.selected is not None:
+            self.selected["selected"] = True
+        self.refresh_from_data()
+
+    def deselect(self) -> None:
+        if self.selected is not None:
+            self.selected["selected"] = False
+            self.selected = None
+            self.refresh_from_data()
+
+    def clear(self) -> None:
+        self.selected = None
+        self.data = []
+        self.scroll_y = 1
+
+    def on_scroll_y(self, instance, value):
+        if value <= self.load_more_at:
+            self.dispatch("on_load_more")
+
+    def on_load_more(self):
+        pass
 
 
 class ReadFileScreen(ManagerScreen):
-    selected_button = None
+    PAGE_SIZE = 50
+    # the search starts when the user stops typing for this many seconds
+    SEARCH_DELAY = 0.2
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._loaded_revision: Optional[int] = None
+        self._last_summary: Optional[AudioSummary] = None
+        self._has_more = False
+        self._query = ""
+        self._search_trigger = Clock.create_trigger(self._search, self.SEARCH_DELAY)
 
     def on_enter(self, *args):
         """
-        When the screen is entered, create dynamic buttons with recently selected files
+        When the screen is entered, load the first page of the library.
+        The list is kept as it is when the library hasn't changed since then.
         """
-        # Remove any existing widget in the ScrollView
-        self.list_of_audio_session = self.list_audio()
-        self.ids.scroll_view.clear_widgets()
-
-        # create dynamic buttons
-        layout = GridLayout(cols=1, spacing=10, size_hint_y=None)
-        layout.bind(minimum_height=layout.setter("height"))
-        for row in self.list_of_audio_session:
-            btn = Button(text=str(row.name), size_hint_y=None, height=40)
-            btn.bind(on_press=self.on_button_click)
-            layout.add_widget(btn)
-        self.ids.scroll_view.add_widget(layout)
-
-    def on_button_click(self, instance):
-        # Reset color of previously selected button
-        if self.selected_button or instance == self.selected_button:
-            self.selected_button.background_color = [1, 1, 1, 1]  # Default white color
-            if instance == self.selected_button:
-                self.selected_button = None
-                self.ids.button_choose.disabled = False
-                self.ids.chose_file.text = ""
-                return
-
-        # Update selected button, change its color and enable the "Choose" button
-        self.selected_button = instance
-        self.ids.button_choose.disabled = False
-        self.ids.chose_file.text = f"Selected file: {instance.text}"
-        self.selected_button.background_color = [0, 0.5, 1, 1]
+        if self._loaded_revision == self.library_revision:
+            return
+        self._loaded_revision = self.library_revision
+        if self._query:
+            self._search()
+        else:
+            self.reload()
+
+    def reload(self) -> None:
+        """Show the library from the first page."""
+        self._last_summary = None
+        self._has_more = True
+        self.ids.scroll_view.clear()
+        self.load_more()
+
+    def search(self, query: str) -> None:
+        """Show the search results once the user stops typing."""
+        self._query = query.strip()
+        self._search_trigger()
+
+    def _search(self, *args) -> None:
+        if not self._query:
+            self.reload()
+            return
+        future = SEARCH_EXECUTOR.submit(self.search_audio, self._query)
+        future.add_done_callback(partial(self._show_results, self._query))
+
+    @mainthread
+    def _show_results(self, query: str, future: Future) -> None:
+        if query != self._query:
+            return  # the user typed on, a newer search is running
+        try:
+            results = future.result()
+        except SQLAlchemyError as e:
+            Logger.warning(f"ReadFileScreen: search for {query!r} failed: {e}")
+            return
+        self._has_more = False
+        self.ids.scroll_view.clear()
+        self.ids.scroll_view.data = [
+            {"text": summary.name, "audio_id": summary.id, "selected": False}
+            for summary in results
+        ]
+
+    def load_more(self) -> None:
+        """Append the next page of the library to the list."""
+        if not self._has_more:
+            return
+        page = self.list_audio_page(after=self._last_summary, limit=self.PAGE_SIZE)
+        self._has_more = len(page) == self.PAGE_SIZE
+        if page:
+            self._last_summary = page[-1]
+        self.ids.scroll_view.data.extend(
+            {"text": summary.name, "audio_id": summary.id, "selected": False}
+            for summary in page
+        )
+
+    def on_selected(self, selected: Optional[dict]) -> None:
+        self.ids.chose_file.text = (
+            f"Selected file: {selected['text']}" if selected else ""
+        )
+        if selected:
+            # the audio is likely to be played, start loading it before Choose
+            source = self.get_audio_source(selected["audio_id"])
+            if source:
+                self.player_pool.prefetch(*source)
 
     def back(self):
         """
         Back to the menu and reset:
-            * selected_button attribute
+            * selected row
             * chose_file text
         """
         self.manager.current = "main_screen"
-        self.selected_button = None
-        self.ids.chose_file.text = ""
+        self.ids.scroll_view.deselect()
 
     def choose(self):
-        selected_file = DEFAULT_AUDIO_KEEPER / Path(self.selected_button.text)
-        self.audio_session = next(
-            (
-                session
-                for session in self.list_of_audio_session
-                if session.file_path == selected_file
-            ),
-            None,
-        )
+        self.audio_session = self.get_audio(self.ids.scroll_view.selected["audio_id"])
         self.manager.current = "main_screen"
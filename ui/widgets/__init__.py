@@ -0,0 +1,4 @@
+"""Reusable widgets used by the screens"""
+from .waveform import WaveformView
+
+__all__ = ["WaveformView"]
@@ -0,0 +1,42 @@
+import numpy as np
+from kivy.clock import Clock
+from kivy.graphics import Color, Mesh
+from kivy.properties import ColorProperty, ObjectProperty
+from kivy.uix.widget import Widget
+
+
+class WaveformView(Widget):
+    """Draw waveform peaks as vertical lines of a single Mesh."""
+
+    # utils.waveform.WaveformPeaks or None
+    peaks = ObjectProperty(None, allownone=True)
+    color = ColorProperty([0.2, 0.6, 1, 1])
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        with self.canvas:
+            self._color = Color(rgba=self.color)
+            self._mesh = Mesh(mode="lines")
+        self._redraw_trigger = Clock.create_trigger(self.redraw)
+        self.bind(pos=self._redraw_trigger, size=self._redraw_trigger)
+        self.bind(peaks=self._redraw_trigger)
+
+    def on_color(self, instance, value):
+        self._color.rgba = value
+
+    def redraw(self, *args):
+        if self.peaks is None:
+            self._mesh.vertices, self._mesh.indices = [], []
+            return
+
+        columns = self.peaks.columns(int(self.width))
+        count = len(columns)
+        half_height = self.height / 2
+        # every column is a line from its min to its max peak: (x, y, u, v) * 2
+        vertices = np.zeros((count, 2, 4), dtype=np.float32)
+        vertices[:, :, 0] = (self.x + (np.arange(count) + 0.5) * self.width / count)[
+            :, None
+        ]
+        vertices[:, :, 1] = self.center_y + columns * half_height
+        self._mesh.vertices = vertices.ravel().tolist()
+        self._mesh.indices = list(range(2 * count))
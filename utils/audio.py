@@ -1,29 +1,150 @@
 import bisect
+import heapq
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterable, Optional
 
 from kivy.core.audio import SoundLoader
 
+from models.models import TIME_STAMP_TOLERANCE
 from models.session_manager import AudioSession
 
+from .pcm_cache import PcmCache
+
+# sounds are loaded off the UI thread, one at a time
+SOUND_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sound")
+
 
 class AudioLoadError(Exception):
     """Custom exceptions for audio loading failures"""
 
 
 class AudioPlayer:
-    def __init__(self, audio_path: Path, current_position=0):
+    """
+    Player of the audio file.
+
+    With a PcmCache it can also play a segment from its own WAV file cut out
+    of the decoded PCM, so it starts exactly on its first sample, restarts
+    without seeking in the compressed file and may be time-stretched to
+    another speed. Positions are always in seconds of the audio file. The
+    most recently played segments stay loaded in memory, one per speed.
+    """
+
+    def __init__(
+        self,
+        audio_path: Path,
+        current_position=0,
+        pcm_cache: Optional[PcmCache] = None,
+        max_segment_sounds: int = 8,
+    ):
         self.sound = SoundLoader.load(str(audio_path))
         if not self.sound:
             raise ValueError("Could not load sound!")  # TODO: Maybe custom exceptions
         self.sound_length = self.sound.length or 0
         self.current_position = current_position
+        self.pcm_cache = pcm_cache
+        self.max_segment_sounds = max_segment_sounds
+        self._file_sound = self.sound
+        self._segment_sounds = OrderedDict()
+        # position of the beginning and the end of self.sound in the audio file
+        self._offset = 0
+        self._end: Optional[float] = None
+        # seconds of the audio file played in one second of self.sound
+        self._rate = 1.0
+        # the sound was started and not stopped, it may have played to its end
+        self._started = False
+
+    @classmethod
+    def load_async(cls, audio_path: Path, *args, **kwargs) -> Future:
+        """Load the sound in the background, the future returns the player."""
+        return SOUND_EXECUTOR.submit(cls, audio_path, *args, **kwargs)
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def is_segment(self) -> bool:
+        return self.sound is not self._file_sound
+
+    @property
+    def is_looping(self) -> bool:
+        return self.is_segment and self.sound.loop
+
+    def _load_segment_sound(self, key: tuple, wav_path: Path):
+        sound = self._segment_sounds.pop(key, None) or SoundLoader.load(str(wav_path))
+        if not sound:
+            raise ValueError("Could not load segment!")
+        self._segment_sounds[key] = sound
+        while len(self._segment_sounds) > self.max_segment_sounds:
+            _, evicted = self._segment_sounds.popitem(last=False)
+            evicted.unload()
+        return sound
+
+    @property
+    def sound_end(self) -> Optional[float]:
+        """Position of the end of the playing segment, None for the audio file."""
+        return self._end if self.is_segment else None
+
+    @property
+    def is_playing(self) -> bool:
+        """A segment played to its end is playing until it's paused."""
+        return self._started and (self.sound.state == "play" or self.is_segment)
+
+    def use_segment(
+        self,
+        start: float,
+        end: Optional[float],
+        wav_path: Path,
+        rate: float = 1.0,
+        loop: bool = False,
+        position: Optional[float] = None,
+    ) -> None:
+        """
+        Play the segment from its WAV file from now on, see `PcmCache.segment`.
+
+        Args:
+            rate: Speed the segment was rendered at.
+            loop: Play the segment in a gapless loop.
+            position: Where to start in the segment, its start by default.
+        """
+        if self.sound.state == "play":
+            self.stop()
+        sound = self._load_segment_sound((start, end, rate), wav_path)
+        sound.loop = loop
+        self.sound, self._offset, self._rate = sound, start, rate
+        self._end = end if end is not None else self.sound_length
+        if position is None or not start <= position < self._end:
+            position = start
+        self.current_position = position
+
+    def loop_segment(
+        self, start: float, end: Optional[float], wav_path: Path, rate: float = 1.0
+    ) -> None:
+        """Play the segment in a gapless loop."""
+        self.use_segment(start, end, wav_path, rate, loop=True)
+        self.play()
+
+    def stop_segment(self) -> None:
+        """Go back to the audio file at the current position of the segment."""
+        if not self.is_segment:
+            return
+        if self._started:
+            self.current_position = self.get_position()
+        self.stop()
+        self.sound.loop = False
+        self.sound, self._offset, self._rate = self._file_sound, 0, 1.0
 
     def play(self):
-        self.sound.seek(self.current_position)
+        self.sound.seek((self.current_position - self._offset) / self._rate)
         self.sound.play()
+        self._started = True
 
     def stop(self):
         self.sound.stop()
+        self._started = False
 
     def pause(self):
         """Pause the current sound and set new current_position value"""
@@ -31,20 +152,46 @@ class AudioPlayer:
         self.stop()
 
     def get_position(self):
-        return self.sound.get_pos()
+        if self.is_segment and self._started and self.sound.state != "play":
+            return self._end  # the segment played to its end
+        return self._offset + self.sound.get_pos() * self._rate
 
     def is_finished(self) -> bool:
         return self.get_position() >= self.sound_length
 
     def cleanup(self):
         """Explicitly unload resources"""
+        for sound in self._segment_sounds.values():
+            sound.unload()
+        self._segment_sounds.clear()
+        if self.pcm_cache:
+            self.pcm_cache.clear()
+        self.sound = self._file_sound
         if self.sound:
             self.sound.unload()
 
 
 class TimeStampManager:
-    def __init__(self, audio_session: AudioSession):
-        self._time_stamp_list = audio_session.time_stamp or [0]
+    """
+    Manage the time stamps of the audio session.
+
+    The time stamps are kept sorted in a compact `array("d")`, which replaces
+    the list of the session and is modified in place. Every change is tracked by
+    the session, so it can be saved without comparing the whole list.
+
+    Two time stamps closer than `tolerance` seconds are duplicates.
+    """
+
+    DEFAULT_TOLERANCE = TIME_STAMP_TOLERANCE
+
+    def __init__(self, audio_session: AudioSession, tolerance=DEFAULT_TOLERANCE):
+        self._audio_session = audio_session
+        self.tolerance = tolerance
+        self._time_stamp_list = array("d", sorted(audio_session.time_stamp))
+        audio_session.time_stamp = self._time_stamp_list
+        if not self._time_stamp_list:
+            self._time_stamp_list.append(0)
+            audio_session.track_time_stamp_added(0)
         self._time_stamp_index = len(self._time_stamp_list) - 1
 
     @property
@@ -75,12 +222,75 @@ class TimeStampManager:
         elif len(self._time_stamp_list) <= self.time_stamp_index:
             self._time_stamp_index = len(self._time_stamp_list) - 1
 
+    def find(self, position: float) -> Optional[int]:
+        """Return index of the nearest time stamp within the tolerance."""
+        index = bisect.bisect_left(self._time_stamp_list, position)
+        nearest = min(
+            (i for i in (index - 1, index) if 0 <= i < len(self._time_stamp_list)),
+            key=lambda i: abs(self._time_stamp_list[i] - position),
+            default=None,
+        )
+        if (
+            nearest is not None
+            and abs(self._time_stamp_list[nearest] - position) <= self.tolerance
+        ):
+            return nearest
+        return None
+
     def add_time_stamp(self, new_position) -> bool:
-        if int(new_position) not in [int(ts) for ts in self._time_stamp_list]:
-            bisect.insort(self._time_stamp_list, new_position)
-            self.time_stamp_index += 1
-            return True
-        return False
+        if self.find(new_position) is not None:
+            return False
+        index = bisect.bisect_left(self._time_stamp_list, new_position)
+        self._time_stamp_list.insert(index, new_position)
+        self._audio_session.track_time_stamp_added(new_position)
+        self.time_stamp_index = index
+        return True
+
+    def add_time_stamps(self, positions: Iterable[float]) -> int:
+        """
+        Add many time stamps at once, skipping the ones which already exist.
+        The current time stamp stays selected.
+
+        Returns:
+            int: Number of added time stamps.
+        """
+        current = self.stamp
+        added = []
+        for position in sorted(positions):
+            if self.find(position) is None and (
+                not added or position - added[-1] > self.tolerance
+            ):
+                added.append(position)
+        if not added:
+            return 0
+
+        self._time_stamp_list[:] = array("d", heapq.merge(self._time_stamp_list, added))
+        for position in added:
+            self._audio_session.track_time_stamp_added(position)
+        self._time_stamp_index = bisect.bisect_left(self._time_stamp_list, current)
+        return len(added)
+
+    def remove_time_stamps(self, positions: Iterable[float]) -> int:
+        """
+        Remove the time stamps nearest to the positions. The first time stamp
+        is never removed and the current one stays selected, if it is kept.
+
+        Returns:
+            int: Number of removed time stamps.
+        """
+        current = self.stamp
+        removed = {self.find(position) for position in positions} - {None, 0}
+        if not removed:
+            return 0
+
+        for index in removed:
+            self._audio_session.track_time_stamp_removed(self._time_stamp_list[index])
+        self._time_stamp_list[:] = array(
+            "d",
+            (ts for i, ts in enumerate(self._time_stamp_list) if i not in removed),
+        )
+        self.time_stamp_index = bisect.bisect_right(self._time_stamp_list, current) - 1
+        return len(removed)
 
     def range(self):
         if len(self._time_stamp_list) == 1:
@@ -104,5 +314,6 @@ class TimeStampManager:
         if self.time_stamp_index <= 0:
             raise ValueError("Cannot remove the first time stamp")
 
-        self._time_stamp_list.pop(self.time_stamp_index)
+        position = self._time_stamp_list.pop(self.time_stamp_index)
+        self._audio_session.track_time_stamp_removed(position)
         self.time_stamp_index -= 1
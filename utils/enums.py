@@ -8,3 +8,13 @@ class KeyboardEnum(IntEnum):
     DOWN = 274  # time stamp
     SPACE = 32  # pause
     R = 114  # remove time stamp
+    A = 97  # auto segment
+    L = 108  # loop segment
+    V = 118  # record the voice
+    MINUS = 45  # slower
+    EQUAL = 61  # faster
+    # grades of the segment in the review session
+    ONE = 49
+    TWO = 50
+    THREE = 51
+    FOUR = 52
@@ -1,26 +1,124 @@
+import hashlib
+import os
 import shutil
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import Collection, Iterable, Optional
 
 DEFAULT_AUDIO_KEEPER = Path(__file__).parent.parent / Path("audio")
+DEFAULT_PEAKS_KEEPER = Path(__file__).parent.parent / Path("peaks")
+DEFAULT_PCM_KEEPER = Path(__file__).parent.parent / Path("pcm")
+DEFAULT_RECORDINGS_KEEPER = Path(__file__).parent.parent / Path("recordings")
+DEFAULT_FEATURES_KEEPER = Path(__file__).parent.parent / Path("features")
+DEFAULT_KV_KEEPER = Path(__file__).parent.parent / Path("kvcache")
 
+# ioctl request which clones a file on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
 
-def file_exists(file_path: Path) -> bool:
-    file_name = file_path.name
-    return Path(DEFAULT_AUDIO_KEEPER / Path(file_name)).is_file()
 
+def file_digest(file_path: Path) -> str:
+    """Return the hex digest of the file content, which is read in chunks."""
+    with open(file_path, "rb") as file:
+        return hashlib.file_digest(
+            file, lambda: hashlib.blake2b(digest_size=20)
+        ).hexdigest()
 
-def copy_file(
-    file_path: Path, to: Path = DEFAULT_AUDIO_KEEPER, new_name: Optional[str] = None
-) -> Optional[Path]:
+
+def trim_directory(
+    directory: Path,
+    max_bytes: int,
+    patterns: Iterable[str],
+    keep: Collection[Path] = (),
+) -> int:
+    """
+    Remove the least recently used files matching the patterns until they take
+    at most `max_bytes`. A file counts as used when it's written or touched,
+    so the oldest mtime goes first. Files in `keep` are never removed.
+
+    Returns:
+        int: Number of removed bytes.
+    """
+    files = []
+    for pattern in patterns:
+        for path in directory.glob(pattern):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            continue  # still open on Windows
+        total -= size
+        removed += size
+    return removed
+
+
+def _reflink(source: Path, destination: Path) -> None:
+    """Clone the file with copy-on-write (Linux FICLONE), so no data is copied."""
+    if sys.platform != "linux":
+        raise OSError("reflinks are not supported")
+    import fcntl
+
+    with open(source, "rb") as src, open(destination, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            destination.unlink()
+            raise
+
+
+def _link_or_copy(source: Path, destination: Path) -> None:
+    for link in (_reflink, os.link):
+        try:
+            link(source, destination)
+            return
+        except OSError:
+            continue
+    shutil.copyfile(source, destination)
+
+
+def source_path(file_path: Path, root: Optional[Path] = None) -> str:
+    """
+    Return the path the file is known by in the library: relative to the
+    parent of the imported `root` folder, or its folder and name otherwise.
     """
-    Copies a file to the specified directory if it doesn't already exists there.
-    Optionally renames the file during the copy.
+    if root is not None:
+        return file_path.relative_to(root.parent).as_posix()
+    return Path(file_path.parent.name, file_path.name).as_posix()
+
+
+def store_file(
+    file_path: Path, to: Path = DEFAULT_AUDIO_KEEPER, digest: Optional[str] = None
+) -> Path:
+    """
+    Store the file under the digest of its content, so every audio is kept once
+    whatever its name. The file is reflinked or hardlinked when the filesystem
+    supports it and copied otherwise.
 
     Returns:
-        Optional[Path]: The path to the copied file, or None if the file already exists.
+        Path: The path to the stored file.
     """
-    if not file_exists(file_path):
-        destination = to / (new_name + file_path.name if new_name else file_path.name)
-        return Path(shutil.copy(file_path, destination))
-    return
+    digest = digest or file_digest(file_path)
+    destination = to / f"{digest}{file_path.suffix.lower()}"
+    if destination.is_file():
+        return destination
+
+    to.mkdir(parents=True, exist_ok=True)
+    tmp_path = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+    try:
+        _link_or_copy(file_path, tmp_path)
+        os.replace(tmp_path, destination)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return destination
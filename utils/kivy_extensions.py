@@ -1,7 +1,13 @@
+from typing import Callable, Dict, Optional
+
+from kivy.clock import mainthread
+from kivy.logger import Logger
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
+from kivy.uix.screenmanager import Screen, ScreenManager
 from kivy.uix.scrollview import ScrollView
 
 
@@ -41,3 +47,73 @@ def message_box_info(message: str) -> None:
         auto_dismiss=True,
     )
     popup.open()
+
+
+class ProgressPopup(Popup):
+    """
+    Popup with a progress bar which doesn't block the UI.
+
+    `update` is safe to call from any thread, the widgets change on the main
+    thread. The cancel button calls `on_cancel`.
+    """
+
+    def __init__(self, title: str, on_cancel: Optional[Callable] = None, **kwargs):
+        layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
+        self.label = Label(text="", halign="center")
+        self.progress_bar = ProgressBar(max=1)
+        self.cancel_button = Button(text="Cancel", size_hint_y=None, height=40)
+        self.cancel_button.bind(on_press=lambda instance: self.cancel())
+        for widget in (self.label, self.progress_bar, self.cancel_button):
+            layout.add_widget(widget)
+
+        super().__init__(
+            title=title,
+            content=layout,
+            size_hint=(0.6, 0.4),
+            auto_dismiss=False,
+            **kwargs,
+        )
+        self.on_cancel = on_cancel
+
+    def cancel(self) -> None:
+        self.cancel_button.disabled = True
+        self.label.text = "Cancelling..."
+        if self.on_cancel:
+            self.on_cancel()
+
+    @mainthread
+    def update(self, fraction: float, text: str) -> None:
+        self.progress_bar.value = fraction
+        if not self.cancel_button.disabled:
+            self.label.text = text
+
+
+class LazyScreenManager(ScreenManager):
+    """
+    Screen manager which creates the registered screens on first navigation.
+
+    Only the first screen has to be built before the window is shown, the
+    modules of the others (and their kv rules) are imported when needed.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._factories: Dict[str, Callable[[str], Screen]] = {}
+
+    @property
+    def registered_names(self) -> list:
+        """Names of all screens, including those which aren't created yet."""
+        return list(dict.fromkeys(self.screen_names + list(self._factories)))
+
+    def register(self, name: str, factory: Callable[[str], Screen]) -> None:
+        """Register the factory which creates the screen with the given name."""
+        self._factories[name] = factory
+
+    def get_screen(self, name: str) -> Screen:
+        if name not in self.screen_names and name in self._factories:
+            Logger.info(f"LazyScreenManager: creating {name}")
+            self.add_widget(self._factories.pop(name)(name))
+        return super().get_screen(name)
+
+    def has_screen(self, name: str) -> bool:
+        return name in self.screen_names or name in self._factories
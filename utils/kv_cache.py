@@ -0,0 +1,134 @@
+"""
+Cache of the parsed kv files.
+
+Parsing a kv file compiles every Python expression in it, which is the most
+expensive part of `Builder.load_file`. The parsed rules are pickled next to
+each other in `DEFAULT_KV_KEEPER`, keyed by a hash of the file content, the
+cache version, Kivy and Python versions, so a changed file or an upgrade is
+parsed again. Writing a new entry removes the older ones of the same file.
+Compiled expressions are pickled with `marshal`.
+"""
+import copyreg
+import hashlib
+import io
+import marshal
+import os
+import pickle  # nosec B403
+import sys
+from functools import partial
+from pathlib import Path
+from types import CodeType
+
+import kivy
+from kivy.factory import Factory
+from kivy.lang.builder import Builder
+from kivy.lang.parser import Parser
+from kivy.logger import Logger
+
+from .file import DEFAULT_KV_KEEPER
+
+# change when the pickled form of the parser changes
+KV_CACHE_VERSION = 1
+# a truncated or corrupted file, or classes of Kivy which changed since it was
+# written (marshal raises ValueError for bad data)
+CACHE_ERRORS = (
+    pickle.UnpicklingError,
+    EOFError,
+    ValueError,
+    AttributeError,
+    ImportError,
+    TypeError,
+)
+
+
+def _reduce_code(code: CodeType):
+    return marshal.loads, (marshal.dumps(code),)
+
+
+def kv_cache_key(content: str) -> str:
+    """Return the key of the kv file content for this version of the app."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{KV_CACHE_VERSION}:{kivy.__version__}:".encode())
+    digest.update(f"{sys.version_info.major}.{sys.version_info.minor}:".encode())
+    digest.update(content.encode())
+    return digest.hexdigest()
+
+
+def _remove_stale(cache_path: Path, stem: str) -> None:
+    """Remove the entries of the kv file other than `cache_path`."""
+    # the keys are hex digests of 20 bytes, so other kv files never match
+    for path in cache_path.parent.glob(f"{stem}.{'?' * 40}.pickle"):
+        if path != cache_path:
+            path.unlink(missing_ok=True)
+
+
+def _dump(parser: Parser, cache_path: Path) -> None:
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[CodeType] = _reduce_code
+    pickler.dump(parser)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(buffer.getvalue())
+    os.replace(tmp_path, cache_path)
+
+
+def parse_kv(kv_path: Path, cache_dir: Path = DEFAULT_KV_KEEPER) -> Parser:
+    """Return the parsed kv file, from the cache when it's there."""
+    content = kv_path.read_text(encoding="utf8")
+    filename = str(kv_path)
+    cache_path = cache_dir / f"{kv_path.stem}.{kv_cache_key(content)}.pickle"
+    try:
+        with open(cache_path, "rb") as file:
+            parser = pickle.load(file)  # nosec B301
+    except FileNotFoundError:
+        parser = None
+    except CACHE_ERRORS as e:
+        Logger.warning(f"KvCache: ignoring broken cache of {kv_path.name}: {e}")
+        parser = None
+    if parser is not None:
+        # the directives (#:import, #:set) change global state of the language
+        parser.execute_directives()
+        parser.filename = filename
+        return parser
+
+    parser = Parser(content=content, filename=filename)
+    try:
+        _dump(parser, cache_path)
+        _remove_stale(cache_path, kv_path.stem)
+    except (OSError, pickle.PicklingError) as e:
+        Logger.warning(f"KvCache: could not cache {kv_path.name}: {e}")
+    return parser
+
+
+def load_kv(kv_path: Path, cache_dir: Path = DEFAULT_KV_KEEPER) -> None:
+    """
+    Add the rules of the kv file to the `Builder`, like `Builder.load_file`.
+
+    Only files with rules, templates and dynamic classes are supported, kv
+    files of the screens don't have a root widget.
+    """
+    kv_path = Path(kv_path)
+    parser = parse_kv(kv_path, cache_dir)
+    if parser.root:
+        raise ValueError(f"{kv_path} has a root widget, use Builder.load_file")
+
+    filename = parser.filename
+    if filename in Builder.files:
+        Logger.warning(f"KvCache: {filename} is loaded multiple times")
+
+    # the same steps as Builder.load_string does after parsing, a test checks
+    # that both leave the Builder in the same state
+    Builder.rules.extend(parser.rules)
+    Builder._clear_matchcache()
+    for name, cls, template in parser.templates:
+        Builder.templates[name] = (cls, template, filename)
+        Factory.register(
+            name, cls=partial(Builder.template, name), is_template=True, warn=True
+        )
+    for name, baseclasses in parser.dynamic_classes.items():
+        Factory.register(name, baseclasses=baseclasses, filename=filename, warn=True)
+    if parser.templates or parser.dynamic_classes or parser.rules:
+        Builder.files.append(filename)
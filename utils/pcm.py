@@ -0,0 +1,129 @@
+"""
+Decoding audio files to PCM samples.
+
+WAV files are read with the `wave` module, other formats are decoded by the
+`ffmpeg` binary. Samples are mono float32 in range [-1, 1] and are produced
+in blocks, so long files never have to be decoded into memory at once.
+"""
+import shutil
+import subprocess  # nosec B404
+import wave
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+# sample rate used when ffmpeg decodes a file and no rate was requested
+DEFAULT_SAMPLE_RATE = 44100
+BLOCK_SIZE = 1 << 16  # samples
+
+_WAV_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+class AudioDecodeError(Exception):
+    """Raised when the audio file can't be decoded"""
+
+
+def _wav_to_float(frames: bytes, sample_width: int, channels: int) -> np.ndarray:
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = (
+            raw[:, 0].astype(np.int32)
+            | raw[:, 1].astype(np.int32) << 8
+            | raw[:, 2].astype(np.int8).astype(np.int32) << 16
+        )
+        scale = float(1 << 23)
+    else:
+        samples = np.frombuffer(frames, dtype=_WAV_DTYPES[sample_width])
+        if sample_width == 1:
+            samples = samples.astype(np.int16) - 128
+        scale = float(1 << (8 * sample_width - 1))
+    samples = samples.astype(np.float32) / scale
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _read_wav(wav: wave.Wave_read, block_size: int) -> Iterator[np.ndarray]:
+    with wav:
+        width, channels = wav.getsampwidth(), wav.getnchannels()
+        while frames := wav.readframes(block_size):
+            yield _wav_to_float(frames, width, channels)
+
+
+def _read_ffmpeg(path: Path, sample_rate: int, block_size: int) -> Iterator[np.ndarray]:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioDecodeError(f"ffmpeg is required to decode {path.suffix} files")
+
+    command = [ffmpeg, "-v", "error", "-i", str(path)]
+    command += ["-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "-"]
+    with subprocess.Popen(  # nosec B603
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ) as process:
+        rest = b""
+        while data := process.stdout.read(block_size * 4):
+            # keep a part of the sample cut at the end of the block for the next one
+            data = rest + data
+            usable = len(data) - len(data) % 4
+            rest = data[usable:]
+            yield np.frombuffer(data[:usable], dtype=np.float32)
+        if process.wait() != 0:
+            raise AudioDecodeError(process.stderr.read().decode(errors="replace"))
+
+
+def read_blocks(
+    path: Path, sample_rate: Optional[int] = None, block_size: int = BLOCK_SIZE
+) -> Tuple[int, Iterator[np.ndarray]]:
+    """
+    Return the sample rate and an iterator over blocks of mono samples.
+
+    WAV files are read at their own sample rate unless another one is requested.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".wav":
+        try:
+            wav = wave.open(str(path), "rb")
+        except (wave.Error, EOFError) as e:
+            raise AudioDecodeError(str(e)) from e
+        if sample_rate in (None, wav.getframerate()):
+            return wav.getframerate(), _read_wav(wav, block_size)
+        wav.close()
+
+    sample_rate = sample_rate or DEFAULT_SAMPLE_RATE
+    return sample_rate, _read_ffmpeg(path, sample_rate, block_size)
+
+
+def probe_duration(path: Path) -> float:
+    """
+    Return the duration of the audio in seconds without decoding it.
+
+    WAV duration is read from the header, other formats are probed by `ffprobe`.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".wav":
+        try:
+            with wave.open(str(path), "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError) as e:
+            raise AudioDecodeError(str(e)) from e
+
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        raise AudioDecodeError(f"ffprobe is required to probe {path.suffix} files")
+    command = [ffprobe, "-v", "error", "-show_entries", "format=duration"]
+    command += ["-of", "default=noprint_wrappers=1:nokey=1", str(path)]
+    result = subprocess.run(command, capture_output=True, text=True)  # nosec B603
+    try:
+        return float(result.stdout)
+    except ValueError:
+        raise AudioDecodeError(result.stderr or f"Unknown duration of {path}")
+
+
+def decode(path: Path, sample_rate: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """Decode the whole file and return its samples and sample rate."""
+    sample_rate, blocks = read_blocks(path, sample_rate)
+    samples = list(blocks)
+    if not samples:
+        return np.zeros(0, dtype=np.float32), sample_rate
+    return np.concatenate(samples), sample_rate
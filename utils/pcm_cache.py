@@ -0,0 +1,162 @@
+"""
+Decoded PCM of audio files for instant, sample-accurate segment playback.
+
+Seeking in a compressed file decodes it again from the nearest keyframe, so
+the PCM of the whole file is decoded once, stored as raw int16 samples and
+read with mmap. Segments are cut from it at exact sample positions and written
+as small WAV files, which players load into memory and loop without gaps.
+Segments played slower or faster are time-stretched while they are written.
+
+The directory is shared by all the caches and kept under `max_bytes`: the
+least recently used PCM and segment files are removed first.
+"""
+import os
+import threading
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .file import DEFAULT_PCM_KEEPER, file_digest, trim_directory
+from .pcm import read_blocks
+from .time_stretch import stretch
+
+# decoding and cutting of segments run next to the UI thread
+PCM_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pcm")
+# an hour of 44.1 kHz PCM takes about 317 MB
+DEFAULT_MAX_BYTES = 2 * 1024**3
+CACHED_FILES = ("*.pcm", "*.wav")
+
+
+class PcmCache:
+    """
+    PCM of one audio file and an LRU of the segments cut from it.
+
+    Only the `max_segments` most recently used segment files are kept on disk,
+    every rate of a segment has its own file. They are removed by `clear`
+    when the cache is dropped.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        digest: Optional[str] = None,
+        directory: Path = DEFAULT_PCM_KEEPER,
+        max_segments: int = 32,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.file_path = Path(file_path)
+        self.directory = directory
+        self.max_segments = max_segments
+        self.max_bytes = max_bytes
+        self._digest = digest
+        self._path: Optional[Path] = None
+        self._samples: Optional[np.ndarray] = None
+        self._sample_rate: Optional[int] = None
+        self._segments: "OrderedDict[tuple, Path]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = file_digest(self.file_path)
+        return self._digest
+
+    @property
+    def sample_rate(self) -> int:
+        self.decode()
+        return self._sample_rate
+
+    @property
+    def samples(self) -> np.ndarray:
+        self.decode()
+        return self._samples
+
+    def _find_decoded(self) -> Optional[Path]:
+        return next(self.directory.glob(f"{self.digest}.*.pcm"), None)
+
+    def decode(self) -> None:
+        """Decode the file unless its PCM is already on disk, then map it."""
+        with self._lock:
+            if self._samples is not None:
+                return
+            path = self._find_decoded()
+            if path is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                sample_rate, blocks = read_blocks(self.file_path)
+                path = self.directory / f"{self.digest}.{sample_rate}.pcm"
+                tmp_path = path.with_suffix(".tmp")
+                with open(tmp_path, "wb") as file:
+                    for block in blocks:
+                        pcm = np.clip(block, -1, 1) * np.iinfo(np.int16).max
+                        file.write(pcm.astype("<i2").tobytes())
+                os.replace(tmp_path, path)
+                self._trim(path)
+            else:
+                os.utime(path)
+
+            self._path = path
+            self._sample_rate = int(path.suffixes[-2].lstrip("."))
+            if path.stat().st_size:
+                self._samples = np.memmap(path, dtype="<i2", mode="r")
+            else:
+                self._samples = np.zeros(0, dtype="<i2")
+
+    def segment(
+        self, start: float, end: Optional[float] = None, rate: float = 1.0
+    ) -> Path:
+        """
+        Return WAV file with the samples from start to end (in seconds),
+        played `rate` times faster at the same pitch.
+        """
+        samples, sample_rate = self.samples, self.sample_rate
+        first = max(0, min(round(start * sample_rate), len(samples) - 1))
+        last = len(samples) if end is None else round(end * sample_rate)
+        last = min(max(first + 1, last), len(samples))
+        key = (first, last, rate)
+
+        with self._lock:
+            path = self._segments.get(key)
+            if path is not None and path.is_file():
+                self._segments.move_to_end(key)
+                os.utime(path)
+                return path
+
+            speed = "" if rate == 1 else f".x{rate:g}"
+            path = self.directory / f"{self.digest}.{first}-{last}{speed}.wav"
+            tmp_path = path.with_suffix(".tmp")
+            with wave.open(str(tmp_path), "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(sample_rate)
+                if rate == 1:
+                    wav.writeframes(samples[first:last].tobytes())
+                else:
+                    limits = np.iinfo(np.int16)
+                    for block in stretch(samples[first:last], rate, sample_rate):
+                        pcm = np.clip(block, limits.min, limits.max).round()
+                        wav.writeframes(pcm.astype("<i2").tobytes())
+            os.replace(tmp_path, path)
+
+            self._segments[key] = path
+            while len(self._segments) > self.max_segments:
+                _, evicted = self._segments.popitem(last=False)
+                evicted.unlink(missing_ok=True)
+            self._trim(path)
+            return path
+
+    def _trim(self, path: Path) -> None:
+        """Make room in the directory, the file just used is kept."""
+        trim_directory(
+            self.directory, self.max_bytes, CACHED_FILES, keep={path, self._path}
+        )
+
+    def clear(self) -> None:
+        """Remove the segment files, the decoded PCM stays for the next use."""
+        with self._lock:
+            while self._segments:
+                _, path = self._segments.popitem()
+                path.unlink(missing_ok=True)
@@ -0,0 +1,60 @@
+"""Single playback tick which reads the position once and shares it."""
+import time
+from typing import Callable, List, Optional
+
+
+class PlaybackClock:
+    """
+    Fan out the playback position to subscribers on every tick.
+
+    The position is read once per tick, however many widgets follow it. The
+    played time is measured with the monotonic clock, so it does not depend on
+    how often or how late the ticks come.
+    """
+
+    def __init__(
+        self,
+        get_position: Callable[[], float],
+        monotonic: Callable[[], float] = time.monotonic,
+    ):
+        self.get_position = get_position
+        self._monotonic = monotonic
+        self._subscribers: List[Callable[[float], None]] = []
+        self._last_tick: Optional[float] = None
+        self._played = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._last_tick is not None
+
+    def subscribe(self, callback: Callable[[float], None]) -> None:
+        """Call the callback with the playback position on every tick."""
+        self._subscribers.append(callback)
+
+    def start(self) -> None:
+        """Start measuring the played time."""
+        if not self.is_running:
+            self._last_tick = self._monotonic()
+
+    def stop(self) -> None:
+        """Stop measuring the played time, the time since the last tick counts."""
+        if self.is_running:
+            self._played += self._monotonic() - self._last_tick
+            self._last_tick = None
+
+    def tick(self) -> float:
+        """Read the position and pass it to the subscribers."""
+        if self.is_running:
+            now = self._monotonic()
+            self._played += now - self._last_tick
+            self._last_tick = now
+        position = self.get_position()
+        for callback in list(self._subscribers):
+            callback(position)
+        return position
+
+    def take_played_seconds(self) -> int:
+        """Return the whole seconds played since the last call."""
+        seconds = int(self._played)
+        self._played -= seconds
+        return seconds
@@ -0,0 +1,133 @@
+"""Recently used audio players, kept loaded so the audio opens instantly."""
+import os
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional, Tuple
+
+from kivy.logger import Logger
+
+from .audio import AudioPlayer
+from .pcm_cache import PcmCache
+
+# decoded 16-bit stereo at 44.1 kHz, how much a loaded sound may take in memory
+BYTES_PER_SECOND = 44100 * 2 * 2
+
+
+def _cleanup(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().cleanup()
+
+
+def _unload(future: Future) -> None:
+    """Cancel the loading or unload the player once it's loaded."""
+    if not future.cancel():
+        future.add_done_callback(_cleanup)
+
+
+class PlayerPool:
+    """
+    LRU of loading and loaded players keyed by the file path and its mtime.
+
+    A player is reused until the file changes. The least recently used players
+    are unloaded when there are more than `max_players` of them or when their
+    estimated memory exceeds `max_memory` bytes. The player last returned by
+    `get` is in use and never unloaded until it's released, so a prefetched
+    player which does not fit next to it is unloaded instead.
+    """
+
+    def __init__(self, max_players: int = 4, max_memory: int = 512 * 1024**2):
+        self.max_players = max_players
+        self.max_memory = max_memory
+        self.hits = 0
+        self.misses = 0
+        self._players: "OrderedDict[Tuple[str, int], Future]" = OrderedDict()
+        self._pinned: Optional[Future] = None
+
+    @staticmethod
+    def _key(file_path: Path) -> Tuple[str, int]:
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            mtime = 0  # the loading fails and reports it
+        return str(file_path), mtime
+
+    @property
+    def memory(self) -> int:
+        """Estimated memory of the loaded players in bytes."""
+        return sum(
+            round(future.result().sound_length * BYTES_PER_SECOND)
+            for future in self._players.values()
+            if future.done() and not future.cancelled() and not future.exception()
+        )
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def _load(self, file_path: Path, digest: Optional[str], count: bool) -> Future:
+        key = self._key(file_path)
+        future = self._players.get(key)
+        if future is not None and not future.cancelled():
+            if not future.done() or future.exception() is None:
+                if count:
+                    self.hits += 1
+                    self._pinned = future
+                self._players.move_to_end(key)
+                return future
+
+        if count:
+            self.misses += 1
+        future = AudioPlayer.load_async(
+            file_path, pcm_cache=PcmCache(file_path, digest)
+        )
+        self._players[key] = future
+        self._players.move_to_end(key)
+        if count:
+            self._pinned = future
+        self._evict()
+        return future
+
+    def get(self, file_path: Path, digest: Optional[str] = None) -> Future:
+        """
+        Return a future of the player, which is loaded unless it's in the pool.
+        The player stays loaded until `release` or the next `get`. The stored
+        `digest` of the file saves hashing it before its PCM is cached.
+        """
+        return self._load(Path(file_path), digest, count=True)
+
+    def release(self) -> None:
+        """Let the player returned by the last `get` be unloaded."""
+        self._pinned = None
+
+    def prefetch(self, file_path: Path, digest: Optional[str] = None) -> None:
+        """Start loading the player which is likely needed soon."""
+        self._load(Path(file_path), digest, count=False)
+
+    def discard(self, future: Future) -> None:
+        """Remove the player from the pool and unload it."""
+        for key, pooled in list(self._players.items()):
+            if pooled is future:
+                del self._players[key]
+                _unload(future)
+        if self._pinned is future:
+            self._pinned = None
+
+    def _evict(self) -> None:
+        for key, future in list(self._players.items()):
+            if len(self._players) <= self.max_players and (
+                self.memory <= self.max_memory
+            ):
+                return
+            if future is not self._pinned:
+                del self._players[key]
+                _unload(future)
+
+    def clear(self) -> None:
+        """Unload all players."""
+        Logger.info(f"PlayerPool: {self.hits} hits, {self.misses} misses")
+        self._pinned = None
+        while self._players:
+            _unload(self._players.popitem()[1])
+
+    def __contains__(self, file_path: Optional[Path]) -> bool:
+        return file_path is not None and self._key(file_path) in self._players
@@ -0,0 +1,44 @@
+"""Process pool which replaces itself when one of its workers dies."""
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+
+class ProcessPool:
+    """
+    Run functions in `spawn`ed processes, next to the UI.
+
+    A `ProcessPoolExecutor` is broken for good once one of its processes ends
+    abruptly, for example when it's killed for taking too much memory. The
+    futures it was running fail with `BrokenProcessPool`, and so does every
+    later submit. This pool starts a new executor instead, so only the work
+    which was running is lost.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get_executor(
+        self, broken: Optional[ProcessPoolExecutor] = None
+    ) -> ProcessPoolExecutor:
+        """Return the executor, a new one if it's missing or `broken`."""
+        with self._lock:
+            if self._executor is None or self._executor is broken:
+                if broken is not None:
+                    broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        executor = self.get_executor()
+        try:
+            return executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            return self.get_executor(broken=executor).submit(fn, *args, **kwargs)
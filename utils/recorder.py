@@ -0,0 +1,330 @@
+"""
+Recording of the learner's voice while a segment plays.
+
+The capture thread only reads chunks from the source and copies them into a
+fixed-size ring buffer, so it never waits for the disk. The writer thread
+drains the buffer into a WAV file. A take is never held in memory as a whole
+and neither thread runs on the UI thread, so recording doesn't delay playback.
+When the disk can't keep up, the chunks which don't fit into the buffer are
+dropped and counted instead of blocking the capture.
+"""
+import os
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from .file import DEFAULT_RECORDINGS_KEEPER
+
+SAMPLE_WIDTH = 2  # bytes, 16-bit PCM
+
+
+class RecorderError(Exception):
+    """Raised when the voice can't be recorded"""
+
+
+class CaptureSource(ABC):
+    """Source of interleaved 16-bit PCM frames, such as the microphone."""
+
+    def __init__(self, sample_rate: int = 44100, channels: int = 1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * SAMPLE_WIDTH
+
+    def open(self) -> None:
+        pass
+
+    @abstractmethod
+    def read(self, frames: int) -> bytes:
+        """
+        Wait for the next frames and return them, empty bytes at the end.
+
+        Raises:
+            RecorderError: The source failed and the take is incomplete.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class MicrophoneSource(CaptureSource):
+    """Default input device, read by the optional `sounddevice` package."""
+
+    def __init__(self, sample_rate: int = 44100, channels: int = 1):
+        super().__init__(sample_rate, channels)
+        self._stream = None
+
+    def open(self) -> None:
+        try:
+            import sounddevice
+        except ImportError as e:
+            raise RecorderError("sounddevice is required to record the voice") from e
+        try:
+            self._stream = sounddevice.RawInputStream(
+                samplerate=self.sample_rate, channels=self.channels, dtype="int16"
+            )
+            self._stream.start()
+        except sounddevice.PortAudioError as e:
+            raise RecorderError(f"Could not open the microphone: {e}") from e
+
+    def read(self, frames: int) -> bytes:
+        import sounddevice  # loaded by `open`
+
+        try:
+            data, _ = self._stream.read(frames)
+        except sounddevice.PortAudioError as e:
+            raise RecorderError(f"Could not read from the microphone: {e}") from e
+        return bytes(data)
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class WavFileSource(CaptureSource):
+    """
+    WAV file which stands in for the microphone, in tests and benchmarks.
+
+    With `realtime` the frames are returned at the pace of the recording.
+    """
+
+    def __init__(self, file_path: Path, realtime: bool = False):
+        with wave.open(str(file_path), "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise RecorderError("Only 16-bit WAV files can stand in for the mic")
+            super().__init__(wav.getframerate(), wav.getnchannels())
+        self.file_path = file_path
+        self.realtime = realtime
+        self._wav: Optional[wave.Wave_read] = None
+        self._started = 0.0
+        self._frames_read = 0
+
+    def open(self) -> None:
+        self._wav = wave.open(str(self.file_path), "rb")
+        self._started = time.monotonic()
+        self._frames_read = 0
+
+    def read(self, frames: int) -> bytes:
+        data = self._wav.readframes(frames)
+        self._frames_read += len(data) // self.frame_size
+        if self.realtime:
+            due = self._started + self._frames_read / self.sample_rate
+            time.sleep(max(0.0, due - time.monotonic()))
+        return data
+
+    def close(self) -> None:
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class RingBuffer:
+    """
+    Bounded byte buffer between one writing and one reading thread.
+
+    `write` never blocks: the bytes which don't fit are dropped and counted.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.dropped = 0
+        self._data = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: bytes) -> int:
+        """Copy as much of the data as fits and return the number of bytes."""
+        with self._condition:
+            count = min(len(data), self.capacity - self._size)
+            end = (self._start + self._size) % self.capacity
+            first = min(count, self.capacity - end)
+            self._data[end : end + first] = data[:first]
+            self._data[: count - first] = data[first:count]
+            self._size += count
+            self.dropped += len(data) - count
+            self._condition.notify()
+        return count
+
+    def read(self, max_size: int, timeout: Optional[float] = None) -> bytes:
+        """
+        Wait for data and return up to `max_size` bytes of it.
+        Empty bytes mean the buffer is closed and drained, or the timeout passed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._size or self._closed, timeout)
+            count = min(max_size, self._size)
+            first = min(count, self.capacity - self._start)
+            data = bytes(self._data[self._start : self._start + first]) + bytes(
+                self._data[: count - first]
+            )
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+            return data
+
+    def close(self) -> None:
+        """No more data will be written, the reader drains the rest."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+@dataclass(frozen=True)
+class Take:
+    """Recorded voice saved to a WAV file."""
+
+    file_path: Path
+    duration: float  # seconds
+    dropped: float  # seconds of voice lost because the disk couldn't keep up
+
+
+class Recorder:
+    """
+    Records one take at a time from a capture source to a WAV file.
+
+    Args:
+        source_factory: Creates the capture source for every take.
+        chunk_frames: Frames read from the source at once.
+        buffer_seconds: Voice kept in memory while the disk is busy.
+    """
+
+    def __init__(
+        self,
+        source_factory: Callable[[], CaptureSource] = MicrophoneSource,
+        directory: Path = DEFAULT_RECORDINGS_KEEPER,
+        chunk_frames: int = 1024,
+        buffer_seconds: float = 2.0,
+    ):
+        self.source_factory = source_factory
+        self.directory = directory
+        self.chunk_frames = chunk_frames
+        self.buffer_seconds = buffer_seconds
+        self._stopping = threading.Event()
+        self._threads: list = []
+
+    @property
+    def is_recording(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self, file_name: str, duration: Optional[float] = None) -> Future:
+        """
+        Start recording in the background and return a future of the take.
+
+        The recording stops after `duration` seconds, when the source ends
+        or when `stop` is called.
+        """
+        if self.is_recording:
+            raise RecorderError("Another take is being recorded")
+        self._stopping.clear()
+        source = self.source_factory()
+        capacity = round(self.buffer_seconds * source.sample_rate) * source.frame_size
+        buffer = RingBuffer(max(capacity, self.chunk_frames * source.frame_size))
+        future = Future()
+        future.set_running_or_notify_cancel()
+        errors: list = []
+
+        self._threads = [
+            threading.Thread(
+                target=self._capture,
+                args=(source, buffer, duration, errors),
+                name="recorder-capture",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._write,
+                args=(source, buffer, self.directory / file_name, errors, future),
+                name="recorder-writer",
+                daemon=True,
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return future
+
+    def stop(self) -> None:
+        """Stop the capture, the take is saved in the background."""
+        self._stopping.set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _capture(
+        self,
+        source: CaptureSource,
+        buffer: RingBuffer,
+        duration: Optional[float],
+        errors: list,
+    ) -> None:
+        remaining = round(duration * source.sample_rate) if duration else None
+        try:
+            source.open()
+            while not self._stopping.is_set() and remaining != 0:
+                frames = self.chunk_frames
+                if remaining is not None:
+                    frames = min(frames, remaining)
+                    remaining -= frames
+                data = source.read(frames)
+                if not data:
+                    break
+                buffer.write(data)
+        except (RecorderError, OSError) as e:
+            errors.append(e)
+        finally:
+            source.close()
+            buffer.close()
+
+    def _write(
+        self,
+        source: CaptureSource,
+        buffer: RingBuffer,
+        file_path: Path,
+        errors: list,
+        future: Future,
+    ) -> None:
+        read_size = self.chunk_frames * source.frame_size
+        tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+        frames = 0
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with wave.open(str(tmp_path), "wb") as wav:
+                wav.setnchannels(source.channels)
+                wav.setsampwidth(SAMPLE_WIDTH)
+                wav.setframerate(source.sample_rate)
+                while (data := buffer.read(read_size)) or not buffer.closed:
+                    wav.writeframesraw(data)
+                    frames += len(data) // source.frame_size
+            if errors:
+                raise errors[0]
+            os.replace(tmp_path, file_path)
+        except (RecorderError, OSError) as e:
+            tmp_path.unlink(missing_ok=True)
+            self._stopping.set()  # the capture has nowhere to write
+            future.set_exception(e)
+            return
+
+        bytes_per_second = source.sample_rate * source.frame_size
+        future.set_result(
+            Take(
+                file_path=file_path,
+                duration=frames / source.sample_rate,
+                dropped=buffer.dropped / bytes_per_second,
+            )
+        )
@@ -0,0 +1,344 @@
+"""
+Scoring of a recorded take against the original segment.
+
+Both signals are cut into short overlapping frames described by numpy
+features: the energy envelope, the pitch found by autocorrelation and
+MFCC-like cepstra of a mel spectrum. The cepstra are aligned by dynamic time
+warping restricted to a band around the diagonal and computed an anti-diagonal
+at a time, and the alignment gives two scores from 0 to 100:
+
+    timing: how closely the take follows the rhythm of the original
+    intonation: correlation of the pitch contours, in semitones relative to
+        each speaker, over the aligned frames voiced in both
+
+Features are computed at the sample rate of each file, so takes and audio
+with different rates are compared without resampling. Features of the
+original segments are cached in `.npz` files keyed by the digest of the audio,
+the segment and the settings, so more takes of the same segment decode the
+original only once. The least recently used of them are removed when they
+take more than `FeatureCache.max_bytes`. Segments and takes longer than
+`MAX_SCORED_SECONDS` are not scored, the alignment memory grows with the
+square of the length.
+"""
+import hashlib
+import os
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .file import DEFAULT_FEATURES_KEEPER, file_digest, trim_directory
+from .pcm import read_blocks
+from .process_pool import ProcessPool
+
+# feature extraction and alignment run in other processes, next to the UI
+SCORING_EXECUTOR = ProcessPool(max_workers=2)
+# a minute of both signals takes about 15 MB of DTW backpointers
+MAX_SCORED_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class ScoringSettings:
+    frame: float = 0.025  # seconds
+    hop: float = 0.010  # seconds
+    mel_bands: int = 26
+    cepstra: int = 13
+    max_frequency: float = 8000.0  # Hz, the mel spectrum is comparable up to it
+    min_pitch: float = 60.0  # Hz
+    max_pitch: float = 400.0  # Hz
+    # frames whose normalized autocorrelation peak is lower are unvoiced
+    voicing_threshold: float = 0.45
+    # frames quieter than the loudest one by this many dB are silent
+    silence: float = -35.0
+    # radius of the DTW band as a part of the longer signal
+    band: float = 0.2
+    # mean distance of the alignment from the diagonal which scores 0 for timing
+    max_timing_deviation: float = 0.15
+    min_voiced_frames: int = 10
+
+    @property
+    def key(self) -> str:
+        return hashlib.blake2b(repr(astuple(self)).encode(), digest_size=6).hexdigest()
+
+
+@dataclass(frozen=True)
+class Features:
+    energy: np.ndarray  # dB per frame
+    pitch: np.ndarray  # Hz per frame, 0 for unvoiced and silent frames
+    cepstra: np.ndarray  # (frames, cepstra)
+
+    def __len__(self) -> int:
+        return len(self.energy)
+
+
+@dataclass(frozen=True)
+class Scores:
+    timing: float
+    intonation: float
+
+
+def frame_signal(samples: np.ndarray, frame_size: int, hop_size: int) -> np.ndarray:
+    """Return (frames, frame_size) view of overlapping frames of the samples."""
+    if len(samples) < frame_size:
+        samples = np.pad(samples, (0, frame_size - len(samples)))
+    windows = np.lib.stride_tricks.sliding_window_view(samples, frame_size)
+    return windows[::hop_size]
+
+
+def mel_filterbank(
+    n_fft: int, sample_rate: int, bands: int, max_frequency: float
+) -> np.ndarray:
+    """Return (bands, n_fft // 2 + 1) triangular filters evenly spaced on mel scale."""
+    top = min(max_frequency, sample_rate / 2)
+    mels = np.linspace(0, 2595 * np.log10(1 + top / 700), bands + 2)
+    edges = 700 * (10 ** (mels / 2595) - 1)
+    frequencies = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (frequencies - lower) / (center - lower)
+    falling = (upper - frequencies) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling))
+
+
+def dct_matrix(size: int, count: int) -> np.ndarray:
+    """Return (count, size) orthonormal DCT-II matrix."""
+    n = np.arange(size)
+    matrix = np.cos(np.pi / size * (n + 0.5) * np.arange(count)[:, None])
+    matrix *= np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def extract_features(
+    samples: np.ndarray, sample_rate: int, settings: ScoringSettings = ScoringSettings()
+) -> Features:
+    """Return the energy, pitch and cepstra of every frame of the samples."""
+    frame_size = max(1, round(settings.frame * sample_rate))
+    hop_size = max(1, round(settings.hop * sample_rate))
+    frames = frame_signal(np.asarray(samples, dtype=np.float64), frame_size, hop_size)
+    frames = frames - frames.mean(axis=1, keepdims=True)
+
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    energy = 20 * np.log10(np.maximum(rms, 1e-10))
+
+    n_fft = 1 << (2 * frame_size - 1).bit_length()
+    windowed = frames * np.hamming(frame_size)
+    spectrum = np.fft.rfft(windowed, n_fft)
+    power = np.square(np.abs(spectrum))
+    filters = mel_filterbank(
+        n_fft, sample_rate, settings.mel_bands, settings.max_frequency
+    )
+    log_mel = np.log(np.maximum(power @ filters.T, 1e-10))
+    cepstra = log_mel @ dct_matrix(settings.mel_bands, settings.cepstra).T
+    # the mean removes the influence of the microphone and the room
+    cepstra -= cepstra.mean(axis=0)
+
+    # autocorrelation of the zero-padded frames is the inverse FFT of the power
+    autocorrelation = np.fft.irfft(np.square(np.abs(np.fft.rfft(frames, n_fft))))
+    min_lag = max(1, int(sample_rate / settings.max_pitch))
+    max_lag = min(frame_size - 1, int(sample_rate / settings.min_pitch))
+    lags = autocorrelation[:, min_lag : max_lag + 1]
+    best = np.argmax(lags, axis=1)
+    strength = lags[np.arange(len(lags)), best] / np.maximum(
+        autocorrelation[:, 0], 1e-10
+    )
+    voiced = (strength >= settings.voicing_threshold) & (
+        energy >= energy.max() + settings.silence
+    )
+    pitch = np.where(voiced, sample_rate / (best + min_lag), 0.0)
+
+    return Features(energy=energy, pitch=pitch, cepstra=cepstra)
+
+
+def banded_dtw(a: np.ndarray, b: np.ndarray, band: float) -> Tuple[float, np.ndarray]:
+    """
+    Align two sequences of feature vectors and return the mean cost of the
+    alignment and its (steps, 2) path of frame indices.
+
+    Only cells within `band` (a part of the longer sequence) of the diagonal
+    are computed. The cells of one anti-diagonal don't depend on each other,
+    so each anti-diagonal is computed at once. Only the totals of the last
+    two anti-diagonals are kept, and the step into each cell of the band is
+    stored in a byte, so the memory is bound by the band instead of n * m.
+    """
+    n, m = len(a), len(b)
+    # a band narrower than the difference of the lengths may hold no path
+    radius = max(1.0, band * max(n, m), abs(n - m))
+    # the band of row i starts at column first[i], row 0 only holds the origin
+    first = np.floor((np.arange(-1, n) * (m / n)) + 1 - radius).astype(np.int64)
+    first[0] = 0
+    steps = np.full((n + 1, 2 * int(np.ceil(radius)) + 2), -1, dtype=np.int8)
+    before_last = np.full(n + 1, np.inf)  # the totals of the anti-diagonal d - 2
+    last = np.full(n + 1, np.inf)  # and d - 1, indexed by the row
+    before_last[0] = 0.0
+    for diagonal in range(2, n + m + 1):
+        rows = np.arange(max(1, diagonal - m), min(n, diagonal - 1) + 1)
+        rows = rows[np.abs((rows - 1) * (m / n) - (diagonal - rows - 1)) <= radius]
+        columns = diagonal - rows
+        cost = np.linalg.norm(a[rows - 1] - b[columns - 1], axis=1)
+        previous = np.stack((before_last[rows - 1], last[rows - 1], last[rows]))
+        step = np.argmin(previous, axis=0)
+        steps[rows, columns - first[rows]] = step
+        current = np.full(n + 1, np.inf)
+        current[rows] = cost + previous[step, np.arange(len(rows))]
+        before_last, last = last, current
+
+    path = [(n - 1, m - 1)]
+    row, column = n, m
+    while (row, column) != (1, 1):
+        step = steps[row, column - first[row]]
+        row, column = row - (step < 2), column - (step != 1)
+        path.append((row - 1, column - 1))
+    path = np.array(path[::-1])
+    return float(last[n] / len(path)), path
+
+
+def timing_score(path: np.ndarray, settings: ScoringSettings) -> float:
+    """Score how close the alignment is to a constant tempo."""
+    n, m = path[-1] + 1
+    deviation = np.mean(np.abs(path[:, 0] / max(n - 1, 1) - path[:, 1] / max(m - 1, 1)))
+    return float(100 * np.clip(1 - deviation / settings.max_timing_deviation, 0, 1))
+
+
+def intonation_score(
+    original: np.ndarray, take: np.ndarray, path: np.ndarray, settings: ScoringSettings
+) -> float:
+    """Score the correlation of the aligned pitch contours in semitones."""
+    first, second = original[path[:, 0]], take[path[:, 1]]
+    voiced = (first > 0) & (second > 0)
+    if voiced.sum() < settings.min_voiced_frames:
+        return 0.0
+    first = 12 * np.log2(first[voiced] / np.median(first[voiced]))
+    second = 12 * np.log2(second[voiced] / np.median(second[voiced]))
+    if first.std() == 0 or second.std() == 0:
+        return 0.0
+    return float(100 * np.clip(np.corrcoef(first, second)[0, 1], 0, 1))
+
+
+def score(
+    original: Features, take: Features, settings: ScoringSettings = ScoringSettings()
+) -> Scores:
+    _, path = banded_dtw(original.cepstra, take.cepstra, settings.band)
+    return Scores(
+        timing=round(timing_score(path, settings), 1),
+        intonation=round(
+            intonation_score(original.pitch, take.pitch, path, settings), 1
+        ),
+    )
+
+
+def read_segment(
+    file_path: Path, start: float = 0.0, end: Optional[float] = None
+) -> Tuple[np.ndarray, int]:
+    """Decode only the blocks of the file up to the end of the segment."""
+    sample_rate, blocks = read_blocks(file_path)
+    first = round(start * sample_rate)
+    last = round(end * sample_rate) if end is not None else None
+    parts, position = [], 0
+    for block in blocks:
+        block_end = position + len(block)
+        if block_end > first:
+            parts.append(block[max(0, first - position) :])
+        position = block_end
+        if last is not None and position >= last:
+            break
+    samples = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    if last is not None:
+        samples = samples[: last - first]
+    return samples, sample_rate
+
+
+class FeatureCache:
+    def __init__(
+        self,
+        directory: Path = DEFAULT_FEATURES_KEEPER,
+        max_bytes: int = 256 * 1024**2,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(
+        self, digest: str, start: float, end: Optional[float], settings: ScoringSettings
+    ) -> Path:
+        segment = f"{round(start * 1000)}-{'end' if end is None else round(end * 1000)}"
+        return self.directory / f"{digest}.{segment}.{settings.key}.npz"
+
+    def load(
+        self, digest: str, start: float, end: Optional[float], settings: ScoringSettings
+    ) -> Optional[Features]:
+        path = self._path(digest, start, end, settings)
+        try:
+            with np.load(path) as data:
+                features = Features(data["energy"], data["pitch"], data["cepstra"])
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return features
+
+    def store(
+        self,
+        digest: str,
+        start: float,
+        end: Optional[float],
+        settings: ScoringSettings,
+        features: Features,
+    ) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(digest, start, end, settings)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as file:
+            np.savez(
+                file,
+                energy=features.energy,
+                pitch=features.pitch,
+                cepstra=features.cepstra,
+            )
+        os.replace(tmp_path, path)
+        trim_directory(self.directory, self.max_bytes, ["*.npz"], keep={path})
+
+
+def segment_features(
+    file_path: Path,
+    start: float,
+    end: Optional[float],
+    settings: ScoringSettings = ScoringSettings(),
+    cache: Optional[FeatureCache] = None,
+    digest: Optional[str] = None,
+) -> Features:
+    """Load the features of the segment from the cache or compute and cache them."""
+    cache = cache or FeatureCache()
+    digest = digest or file_digest(file_path)
+    features = cache.load(digest, start, end, settings)
+    if features is None:
+        samples, sample_rate = read_segment(file_path, start, end)
+        if len(samples) > MAX_SCORED_SECONDS * sample_rate:
+            raise ValueError(
+                f"Segments longer than {MAX_SCORED_SECONDS:g} s are not scored"
+            )
+        features = extract_features(samples, sample_rate, settings)
+        cache.store(digest, start, end, settings, features)
+    return features
+
+
+def score_take(
+    audio_path: Path,
+    start: float,
+    end: Optional[float],
+    take_path: Path,
+    settings: ScoringSettings = ScoringSettings(),
+    cache: Optional[FeatureCache] = None,
+    digest: Optional[str] = None,
+) -> Scores:
+    """
+    Score the recorded take against the segment of the audio.
+
+    The stored `digest` of the audio saves hashing the whole file to find
+    the cached features of the segment.
+    """
+    original = segment_features(audio_path, start, end, settings, cache, digest)
+    samples, sample_rate = read_segment(take_path)
+    if not samples.size:
+        raise ValueError("The take is empty")
+    if len(samples) > MAX_SCORED_SECONDS * sample_rate:
+        raise ValueError(f"Takes longer than {MAX_SCORED_SECONDS:g} s are not scored")
+    return score(original, extract_features(samples, sample_rate, settings), settings)
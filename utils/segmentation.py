@@ -0,0 +1,79 @@
+"""
+Automatic segmentation of audio into sentences.
+
+The audio is decoded in blocks and the RMS level of short windows is computed
+with numpy. Long enough runs of windows quieter than the speech level become
+pauses and the middle of every pause becomes a segment boundary.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List
+
+import numpy as np
+
+from .pcm import read_blocks
+from .process_pool import ProcessPool
+
+# decoding and analysis run in another process, so they never block the UI
+SEGMENTATION_EXECUTOR = ProcessPool(max_workers=1)
+
+
+@dataclass(frozen=True)
+class SegmentationSettings:
+    sample_rate: int = 16000
+    window: float = 0.02  # seconds
+    # windows quieter than the speech level by this many dB are silent
+    silence_threshold: float = -30.0
+    # percentile of the window levels taken as the speech level
+    speech_percentile: float = 90.0
+    min_silence: float = 0.35  # seconds
+    min_segment: float = 1.0  # seconds
+
+
+def window_levels(blocks: Iterable[np.ndarray], window_size: int) -> np.ndarray:
+    """Return RMS level in dBFS of consecutive windows of the sample blocks."""
+    levels = []
+    rest = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        if rest.size:
+            block = np.concatenate((rest, block))
+        usable = len(block) - len(block) % window_size
+        windows = block[:usable].reshape(-1, window_size)
+        levels.append(np.sqrt(np.mean(np.square(windows, dtype=np.float64), axis=1)))
+        rest = block[usable:]
+    if not levels:
+        return np.zeros(0)
+    return 20 * np.log10(np.maximum(np.concatenate(levels), 1e-10))
+
+
+def find_boundaries(levels: np.ndarray, settings: SegmentationSettings) -> List[float]:
+    """Return positions in seconds of the middle of pauses between sentences."""
+    if not levels.size:
+        return []
+
+    speech_level = np.percentile(levels, settings.speech_percentile)
+    silent = levels < speech_level + settings.silence_threshold
+    # starts and ends of the runs of silent windows
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.view(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+
+    long_enough = (ends - starts) * settings.window >= settings.min_silence
+    # silence before the first and after the last sentence isn't a boundary
+    inside = (starts > 0) & (ends < len(levels))
+    middles = (starts + ends)[long_enough & inside] * settings.window / 2
+
+    boundaries, previous = [], 0.0
+    for position in middles.tolist():
+        if position - previous >= settings.min_segment:
+            boundaries.append(round(position, 3))
+            previous = position
+    return boundaries
+
+
+def detect_boundaries(
+    file_path: Path, settings: SegmentationSettings = SegmentationSettings()
+) -> List[float]:
+    """Decode the audio file and return the boundaries of its sentences."""
+    sample_rate, blocks = read_blocks(file_path, settings.sample_rate)
+    window_size = max(1, round(settings.window * sample_rate))
+    return find_boundaries(window_levels(blocks, window_size), settings)
@@ -0,0 +1,87 @@
+"""
+Pitch-preserving time stretching with WSOLA (waveform similarity overlap-add).
+
+The output is built from Hann-windowed frames of the input overlapped by half
+a frame. Every frame is taken near its nominal position (its output position
+times the rate), shifted within a tolerance to where it best matches the
+natural continuation of the previous frame, so the periods of the voice line
+up and the pitch doesn't change. The shift of a frame is found by a single
+cross-correlation of the continuation with all candidate positions.
+
+`stretch` reads the input only around the current frame and yields the output
+in blocks, so segments of any length are rendered with constant memory and
+written to disk while they are rendered.
+"""
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+# the slowest and the fastest playback offered to the learner
+MIN_RATE = 0.5
+MAX_RATE = 1.5
+
+
+@dataclass(frozen=True)
+class StretchSettings:
+    frame: float = 0.040  # seconds, a few periods of the lowest voices
+    tolerance: float = 0.010  # seconds, the largest shift of a frame
+    block_frames: int = 64  # frames yielded in one block of the output
+
+
+def _read(samples: np.ndarray, begin: int, length: int) -> np.ndarray:
+    """Return float32 samples from begin, padded with silence outside the input."""
+    chunk = np.zeros(length, dtype=np.float32)
+    first, last = max(begin, 0), min(begin + length, len(samples))
+    if first < last:
+        chunk[first - begin : last - begin] = samples[first:last]
+    return chunk
+
+
+def stretched_length(length: int, rate: float) -> int:
+    """Number of samples of the input played at the rate."""
+    return round(length / rate)
+
+
+def stretch(
+    samples: np.ndarray,
+    rate: float,
+    sample_rate: int,
+    settings: StretchSettings = StretchSettings(),
+) -> Iterator[np.ndarray]:
+    """
+    Yield blocks of the samples played `rate` times faster, at the same pitch.
+
+    The samples may be of any numeric type, such as a memory-mapped int16 PCM,
+    the output is float32 in the same scale.
+    """
+    if not MIN_RATE <= rate <= MAX_RATE:
+        raise ValueError(f"Rate must be between {MIN_RATE} and {MAX_RATE}, not {rate}")
+    hop = max(1, round(settings.frame * sample_rate / 2))
+    size = 2 * hop
+    tolerance = max(1, round(settings.tolerance * sample_rate))
+    # the periodic Hann windows of frames overlapped by half sum up to one
+    window = np.hanning(size + 1)[:-1].astype(np.float32)
+    length = stretched_length(len(samples), rate)
+
+    # the first half of the first frame has nothing to overlap with
+    block = [_read(samples, 0, hop)]
+    tail = (_read(samples, 0, size) * window)[hop:]
+    position, emitted, frame = 0, hop, 1
+    while emitted < length:
+        nominal = round(frame * hop * rate)
+        continuation = _read(samples, position + hop, size)
+        candidates = _read(samples, nominal - tolerance, size + 2 * tolerance)
+        similarity = np.correlate(candidates, continuation, mode="valid")
+        position = nominal - tolerance + int(np.argmax(similarity))
+        windowed = _read(samples, position, size) * window
+        block.append(tail + windowed[:hop])
+        tail = windowed[hop:]
+        emitted += hop
+        frame += 1
+        if len(block) >= settings.block_frames and emitted < length:
+            yield np.concatenate(block)
+            block = []
+
+    output = np.concatenate(block)
+    yield output[: len(output) - (emitted - length)]
@@ -0,0 +1,138 @@
+"""
+Waveform peaks drawn on the playback timeline.
+
+Peaks are min/max pairs of samples in buckets of `BASE_BUCKET` samples,
+quantized to int8. Coarser levels are built by merging `LEVEL_FACTOR` buckets,
+so drawing any width reads only a few thousand peaks. Every level is cached
+in its own `.npy` file, keyed by the digest of the audio file, and loaded
+with mmap when the audio is opened again. The least recently used peaks are
+removed when the cache takes more than `WaveformCache.max_bytes`.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .file import DEFAULT_PEAKS_KEEPER, file_digest, trim_directory
+from .pcm import read_blocks
+
+BASE_BUCKET = 256  # samples
+LEVEL_FACTOR = 4
+# the coarsest level has at least this many peaks
+MIN_PEAKS = 1024
+PEAK_SCALE = 127
+
+# decoding for waveforms runs one file at a time next to the UI thread
+WAVEFORM_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="waveform")
+
+
+def compute_peaks(
+    blocks: Iterable[np.ndarray], bucket: int = BASE_BUCKET
+) -> np.ndarray:
+    """Return (n, 2) array of quantized min/max peaks of the sample blocks."""
+    chunks = []
+    rest = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        if rest.size:
+            block = np.concatenate((rest, block))
+        usable = len(block) - len(block) % bucket
+        frames = block[:usable].reshape(-1, bucket)
+        chunks.append(np.stack((frames.min(axis=1), frames.max(axis=1)), axis=1))
+        rest = block[usable:]
+    if rest.size:
+        chunks.append(np.array([[rest.min(), rest.max()]], dtype=np.float32))
+    if not chunks:
+        return np.zeros((0, 2), dtype=np.int8)
+
+    peaks = np.concatenate(chunks) * PEAK_SCALE
+    return np.clip(np.round(peaks), -PEAK_SCALE, PEAK_SCALE).astype(np.int8)
+
+
+def reduce_peaks(peaks: np.ndarray, columns: int) -> np.ndarray:
+    """Merge the peaks into the given number of columns (or fewer)."""
+    if len(peaks) <= columns:
+        return np.asarray(peaks)
+    starts = np.unique(np.linspace(0, len(peaks), columns, endpoint=False).astype(int))
+    return np.stack(
+        (
+            np.minimum.reduceat(peaks[:, 0], starts),
+            np.maximum.reduceat(peaks[:, 1], starts),
+        ),
+        axis=1,
+    )
+
+
+@dataclass
+class WaveformPeaks:
+    # bucket size in samples -> peaks
+    levels: Dict[int, np.ndarray]
+
+    @classmethod
+    def from_base(cls, base: np.ndarray) -> "WaveformPeaks":
+        levels, bucket, peaks = {BASE_BUCKET: base}, BASE_BUCKET, base
+        while len(peaks) >= MIN_PEAKS * LEVEL_FACTOR:
+            peaks = reduce_peaks(peaks, -(-len(peaks) // LEVEL_FACTOR))
+            bucket *= LEVEL_FACTOR
+            levels[bucket] = peaks
+        return cls(levels)
+
+    def columns(self, width: int) -> np.ndarray:
+        """Return (width, 2) array of min/max peaks in range [-1, 1] to draw."""
+        if width <= 0:
+            return np.zeros((0, 2), dtype=np.float32)
+        # the coarsest level which still has a peak for every column
+        level = min(
+            (peaks for peaks in self.levels.values() if len(peaks) >= width),
+            key=len,
+            default=self.levels[BASE_BUCKET],
+        )
+        return reduce_peaks(level, width).astype(np.float32) / PEAK_SCALE
+
+
+class WaveformCache:
+    def __init__(
+        self, directory: Path = DEFAULT_PEAKS_KEEPER, max_bytes: int = 64 * 1024**2
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, digest: str, bucket: int) -> Path:
+        return self.directory / f"{digest}.{bucket}.npy"
+
+    def load(self, digest: str) -> Optional[WaveformPeaks]:
+        levels, bucket = {}, BASE_BUCKET
+        while (path := self._path(digest, bucket)).is_file():
+            levels[bucket] = np.load(path, mmap_mode="r")
+            os.utime(path)
+            bucket *= LEVEL_FACTOR
+        return WaveformPeaks(levels) if levels else None
+
+    def store(self, digest: str, peaks: WaveformPeaks) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # the base level is written last, so a partly written cache isn't loaded
+        paths = set()
+        for bucket, level in sorted(peaks.levels.items(), reverse=True):
+            path = self._path(digest, bucket)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as file:
+                np.save(file, level)
+            os.replace(tmp_path, path)
+            paths.add(path)
+        trim_directory(self.directory, self.max_bytes, ["*.npy"], keep=paths)
+
+
+def load_peaks(
+    file_path: Path, digest: Optional[str] = None, cache: Optional[WaveformCache] = None
+) -> WaveformPeaks:
+    """Load the peaks from the cache or decode the file and cache its peaks."""
+    cache = cache or WaveformCache()
+    digest = digest or file_digest(file_path)
+    peaks = cache.load(digest)
+    if peaks is None:
+        _, blocks = read_blocks(file_path)
+        peaks = WaveformPeaks.from_base(compute_peaks(blocks))
+        cache.store(digest, peaks)
+    return peaks